@@ -10,6 +10,9 @@ from PyQt5.QtCore import QTimer, pyqtSignal, QObject
 from PyQt5.QtGui import QKeyEvent
 from PyQt5.QtCore import Qt
 
+from mp3_frames import probe_mp3
+from misc_func import ContentHasher
+
 
 @dataclass
 class AudioState:
@@ -19,6 +22,13 @@ class AudioState:
     current_audio_length: float = 0.0
     current_audio_position: float = 0.0
     volume: float = 1.0
+    #流式预览
+    is_streaming: bool = False
+    stream_complete: bool = False
+    buffered_length: float = 0.0
+    loaded_length: float = 0.0
+    is_generating: bool = False  # 预览还在合成，停止播放不影响
+    stream_stopped: bool = False  # 用户停止了本次流式预览，后续进度不再显示
 
 
 class KeyboardControlScheme:
@@ -99,6 +109,10 @@ class PygameManager:
             pass
     
     def get_audio_length(self, file_path: str) -> float:
+        # 先只读MP3帧头取时长；不是MP3时才交给pygame完整解码
+        info = probe_mp3(file_path)
+        if info is not None:
+            return info.duration_ms / 1000.0
         try:
             import pygame
             sound = pygame.mixer.Sound(file_path)
@@ -176,13 +190,12 @@ class AudioCacheManager:
     def __init__(self, parent_window):
         self.parent_window = parent_window
     
+    # 与生成页使用同一套键，编辑器记录的文本摘要可以直接复用
     def get_cache_key(self, config) -> str:
-        return f"{config.content}_{config.voice}_{config.speed}_{config.pitch}_{config.volume}_{config.stretch_factor}"
+        return ContentHasher.get_cache_key(config)
     
     def get_content_hash(self, config) -> str:
-        import hashlib
-        content = f"{config.content}_{config.voice}_{config.speed}_{config.pitch}_{config.volume}_{config.stretch_factor}"
-        return hashlib.md5(content.encode('utf-8')).hexdigest()
+        return ContentHasher.get_content_hash(config)
     
     def is_content_unchanged(self, config) -> bool:
         current_hash = self.get_content_hash(config)
@@ -236,6 +249,9 @@ class AudioSignals(QObject):
 
 
 class AudioPreview:
+    # 流式预览续播前至少要多缓冲这么多秒
+    STREAM_RESUME_MARGIN = 1.0
+
     def __init__(self, parent_window):
         self.parent_window = parent_window
         
@@ -333,7 +349,7 @@ class AudioPreview:
         if not self.state.is_playing or self.state.current_audio_length <= 0:
             return
             
-        current_pos = self.pygame_manager.get_current_position()
+        current_pos = self._get_playback_position()
         new_pos = max(0, min(current_pos + seconds, self.state.current_audio_length))
         
         self.seek_to_position(new_pos)
@@ -354,6 +370,7 @@ class AudioPreview:
             )
 
     def play_preview(self):
+        self.parent_window.generation_page.text_edit_section.flush_pending()
         cache_key = self.cache_manager.get_cache_key(self.parent_window.config)
         if (cache_key not in self.parent_window.audio_cache or 
             not os.path.exists(self.parent_window.audio_cache[cache_key])):
@@ -372,9 +389,78 @@ class AudioPreview:
         self.parent_window.generation_page.preview_control.preview_progress.setValue(0)
         
         self.parent_window.current_audio_path = self.parent_window.audio_cache[cache_key]
+        self.state.is_streaming = False
         self._play_audio_file(self.parent_window.current_audio_path)
 
-    def _play_audio_file(self, file_path: str):
+    def play_streaming_preview(self, file_path: str):
+        if self.state.is_playing:
+            self.stop_audio()
+
+        self.state.is_streaming = True
+        self.state.stream_complete = False
+        self.state.loaded_length = self.state.buffered_length
+        self.parent_window.current_audio_path = file_path
+        self.parent_window.generation_page.preview_control.preview_progress.setValue(0)
+        self._play_audio_file(file_path, self._estimate_stream_length())
+
+    def begin_stream_generation(self):
+        self.state.is_generating = True
+        self.state.stream_stopped = False
+        self.state.stream_complete = False
+        self.state.buffered_length = 0.0
+        self._stream_fraction = 0.0
+
+    def end_stream_generation(self):
+        self.state.is_generating = False
+
+    def update_stream_buffer(self, buffered_seconds: float, arrived_fraction: float):
+        self.state.buffered_length = buffered_seconds
+        self._stream_fraction = arrived_fraction
+        if self.state.is_streaming:
+            self.state.current_audio_length = self._estimate_stream_length()
+
+    def finish_stream(self):
+        self.state.stream_complete = True
+        if self.state.is_streaming:
+            self.state.current_audio_length = self.state.buffered_length
+
+    # 按已到达的文本比例估算预览总时长
+    def _estimate_stream_length(self) -> float:
+        fraction = getattr(self, '_stream_fraction', 0.0)
+        if self.state.stream_complete or fraction <= 0:
+            return self.state.buffered_length
+        return self.state.buffered_length / fraction
+
+    # 播放追上了缓冲区末尾：重新加载已增长的文件并从断点继续
+    def _resume_stream(self):
+        if not self.state.is_playing or not self.state.is_streaming:
+            return
+
+        resume_position = self.state.loaded_length
+        if self.state.stream_complete and self.state.buffered_length <= resume_position:
+            self.state.is_streaming = False
+            self._on_playback_finished()
+            return
+
+        if self.state.buffered_length - resume_position < self.STREAM_RESUME_MARGIN and not self.state.stream_complete:
+            #新数据还不够，稍后再试
+            QTimer.singleShot(200, self._resume_stream)
+            return
+
+        self.state.loaded_length = self.state.buffered_length
+        if not self.pygame_manager.load_audio(self.parent_window.current_audio_path):
+            return
+        self.pygame_manager.play_audio(resume_position)
+        self.state.current_audio_position = resume_position
+
+        self.playback_monitor = PlaybackMonitor(
+            self.pygame_manager,
+            self.state,
+            self.audio_signals.playback_finished.emit
+        )
+        self.playback_monitor.start()
+
+    def _play_audio_file(self, file_path: str, audio_length: Optional[float] = None):
         try:
             if not self.pygame_manager._init_pygame():
                 return
@@ -387,7 +473,9 @@ class AudioPreview:
             if not self.pygame_manager.play_audio():
                 return
             
-            self.state.current_audio_length = self.pygame_manager.get_audio_length(file_path)
+            if audio_length is None:
+                audio_length = self.pygame_manager.get_audio_length(file_path)
+            self.state.current_audio_length = audio_length
             self.state.current_audio_position = 0
             
             self.state.is_playing = True
@@ -414,6 +502,10 @@ class AudioPreview:
             self.parent_window.notification_manager.show_message(f"播放音频时发生错误: {str(e)}", "E", 5000)
 
     def _on_playback_finished(self):
+        if self.state.is_streaming and self.state.is_playing:
+            self._resume_stream()
+            return
+
         self.state.is_playing = False
         self.state.is_paused = False
         self.state.is_seeking = False
@@ -434,6 +526,9 @@ class AudioPreview:
         
         time.sleep(0.1)
         
+        if self.state.is_generating:
+            self.state.stream_stopped = True
+        self.state.is_streaming = False
         self.state.is_playing = False
         self.state.is_paused = False
         self.state.is_seeking = False
@@ -472,13 +567,17 @@ class AudioPreview:
             not self.state.is_paused and 
             self.pygame_manager.pygame_initialized):
             
-            pos = self.pygame_manager.get_current_position()
+            pos = self._get_playback_position()
             
             if self.state.current_audio_length > 0:
                 progress = int((pos / self.state.current_audio_length) * 1000)
                 progress = max(0, min(progress, 1000))
                 self.parent_window.generation_page.preview_control.preview_progress.setValue(progress)
 
+    # 本次play()的起点 + 播放至今的时间
+    def _get_playback_position(self) -> float:
+        return self.state.current_audio_position + self.pygame_manager.get_current_position()
+
     def set_seeking(self, seeking: bool):
         self.state.is_seeking = seeking
 
@@ -487,8 +586,12 @@ class AudioPreview:
             self.state.current_audio_length > 0 and 
             self.pygame_manager.pygame_initialized):
             
-            position = max(0, min(position, self.state.current_audio_length))
-            
+            limit = self.state.current_audio_length
+            if self.state.is_streaming:
+                #流式预览只能跳到已加载的部分
+                limit = min(limit, self.state.loaded_length)
+            position = max(0, min(position, limit))
+
             self.pygame_manager.play_audio(position)
             self.state.current_audio_position = position
             self.state.is_paused = False
@@ -0,0 +1,223 @@
+"""
+源悦TTS 命令行批量转换
+
+不依赖PyQt5 / pygame / fitz，可以在没有显示器的服务器或计划任务里运行。
+
+用法示例:
+    python batch_cli.py "books/**/*.docx" notes/*.txt -o out --voice zh-CN-Xiaoxiao --speed 10 -j 2
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+import threading
+import contextlib
+from typing import List, Optional, Tuple
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from edge_audio_generator import AudioGenerator, GenerationConfig, ChunkedSynthesizer
+from docxfix import DocxStreamReader
+from import_sources import ChunkedTextReader
+from misc_func import VoiceConfig
+
+
+SUPPORTED_EXTENSIONS = ('.txt', '.docx')
+
+
+@dataclass
+class BatchJob:
+    """单个文件的转换任务"""
+    input_path: str
+    output_path: str
+
+
+@dataclass
+class BatchResult:
+    """单个文件的转换结果"""
+    job: BatchJob
+    success: bool
+    message: str
+    elapsed: float
+
+
+class BatchInputCollector:
+    """输入收集器 - 展开glob并为每个文件分配输出路径"""
+
+    @staticmethod
+    def expand_patterns(patterns: List[str]) -> List[str]:
+        """展开输入glob（支持**递归），去重并保持顺序"""
+        files = []
+        seen = set()
+        for pattern in patterns:
+            matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+            for path in matches:
+                if not os.path.isfile(path) or not path.lower().endswith(SUPPORTED_EXTENSIONS):
+                    continue
+                key = os.path.normcase(os.path.abspath(path))
+                if key not in seen:
+                    seen.add(key)
+                    files.append(path)
+        return files
+
+    @staticmethod
+    def build_jobs(files: List[str], output_dir: str) -> List[BatchJob]:
+        """输出文件名取输入文件名，重名时追加序号"""
+        jobs = []
+        used = set()
+        for path in files:
+            stem = os.path.splitext(os.path.basename(path))[0]
+            name = stem
+            index = 2
+            while name.lower() in used:
+                name = f"{stem}_{index}"
+                index += 1
+            used.add(name.lower())
+            jobs.append(BatchJob(path, os.path.join(output_dir, name + ".mp3")))
+        return jobs
+
+
+class BatchTextReader:
+    """读取txt/docx文本"""
+
+    @staticmethod
+    def read_text(file_path: str) -> str:
+        if file_path.lower().endswith('.docx'):
+            return DocxStreamReader.read_text(file_path, '\n')
+        return ChunkedTextReader.read_text(file_path)
+
+
+class BatchRunner:
+    """批量转换执行器 - 线程池并行处理文件，并汇总进度"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.generator = AudioGenerator()
+        self._print_lock = threading.Lock()
+        self._finished = 0
+
+    def run(self, jobs: List[BatchJob]) -> List[BatchResult]:
+        results = []
+        with ThreadPoolExecutor(max_workers=max(1, self.args.jobs)) as executor:
+            futures = [executor.submit(self._process, job) for job in jobs]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                self._report(result, len(jobs))
+        return results
+
+    def _process(self, job: BatchJob) -> BatchResult:
+        start = time.time()
+        if self.args.skip_existing and os.path.exists(job.output_path):
+            return BatchResult(job, True, "已存在，跳过", 0.0)
+        try:
+            content = BatchTextReader.read_text(job.input_path)
+            if not content.strip():
+                return BatchResult(job, False, "文件中没有文本", time.time() - start)
+
+            config = GenerationConfig(
+                content=content,
+                voice=self.args.voice,
+                speed=self.args.speed,
+                pitch=self.args.pitch,
+                volume=self.args.volume,
+                save_path=os.path.abspath(job.output_path),
+                stretch_factor=self.args.stretch,
+                stretch_enabled=self.args.stretch != 1.0,
+                max_concurrency=self.args.concurrency,
+            )
+            outcome = {}
+
+            def callback(success: bool, message: str):
+                outcome['success'] = success
+                outcome['message'] = message
+
+            self.generator.generate_audio(config, callback)
+            return BatchResult(job, outcome.get('success', False),
+                               outcome.get('message', ''), time.time() - start)
+        except Exception as e:
+            return BatchResult(job, False, str(e), time.time() - start)
+
+    def _report(self, result: BatchResult, total: int):
+        with self._print_lock:
+            self._finished += 1
+            status = "完成" if result.success else "失败"
+            print(f"[{self._finished}/{total}] {status} {result.job.input_path} -> "
+                  f"{result.job.output_path} ({result.elapsed:.1f}s) {result.message}",
+                  file=sys.stderr, flush=True)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="源悦TTS 命令行批量转换：把txt/docx文件批量转换为mp3"
+    )
+    parser.add_argument('inputs', nargs='*', help='输入文件或glob，如 "books/**/*.docx"')
+    parser.add_argument('-o', '--output-dir', help='输出目录')
+    parser.add_argument('-v', '--voice', default='zh-CN-Xiaoxiao', help='音色（默认 zh-CN-Xiaoxiao）')
+    parser.add_argument('--speed', type=int, default=0, help='语速，百分比（默认0）')
+    parser.add_argument('--pitch', type=int, default=0, help='音调，Hz（默认0）')
+    parser.add_argument('--volume', type=int, default=0, help='音量，百分比（默认0）')
+    parser.add_argument('--stretch', type=float, default=1.0, help='音频拉伸倍数，超出服务语速范围的部分需要FFmpeg（默认1.0不拉伸）')
+    parser.add_argument('-j', '--jobs', type=int, default=2, help='同时处理的文件数（默认2）')
+    parser.add_argument('--concurrency', type=int, default=ChunkedSynthesizer.DEFAULT_MAX_CONCURRENCY,
+                        help=f'每个文件的分段并发数（默认{ChunkedSynthesizer.DEFAULT_MAX_CONCURRENCY}）')
+    parser.add_argument('--skip-existing', action='store_true', help='输出文件已存在时跳过')
+    parser.add_argument('-q', '--quiet', action='store_true', help='只输出进度和汇总')
+    parser.add_argument('--list-voices', action='store_true', help='列出可用音色后退出')
+    args = parser.parse_args(argv)
+
+    if not args.list_voices:
+        if not args.inputs:
+            parser.error("需要至少一个输入文件或glob")
+        if not args.output_dir:
+            parser.error("需要指定输出目录 -o/--output-dir")
+        if not VoiceConfig.is_valid_voice(args.voice):
+            parser.error(f"未知音色: {args.voice}（用 --list-voices 查看）")
+    return args
+
+
+def summarize(results: List[BatchResult], elapsed: float) -> Tuple[int, int]:
+    """打印汇总，返回(成功数, 失败数)"""
+    succeeded = [r for r in results if r.success]
+    failed = [r for r in results if not r.success]
+    print(f"\n共 {len(results)} 个文件，成功 {len(succeeded)}，失败 {len(failed)}，"
+          f"耗时 {elapsed:.1f}s", file=sys.stderr)
+    for result in failed:
+        print(f"  失败: {result.job.input_path}: {result.message}", file=sys.stderr)
+    return len(succeeded), len(failed)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口，返回进程退出码"""
+    args = parse_args(argv)
+
+    if args.list_voices:
+        for category, voices in VoiceConfig.get_voice_categories().items():
+            print(f"{category}: {' '.join(voices)}")
+        return 0
+
+    files = BatchInputCollector.expand_patterns(args.inputs)
+    if not files:
+        print("没有找到可转换的txt/docx文件", file=sys.stderr)
+        return 1
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    jobs = BatchInputCollector.build_jobs(files, args.output_dir)
+    print(f"找到 {len(jobs)} 个文件，开始转换（{args.jobs} 个并行）", file=sys.stderr)
+
+    start = time.time()
+    runner = BatchRunner(args)
+    if args.quiet:
+        # 生成器的详细日志写在stdout上，安静模式下丢弃
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            results = runner.run(jobs)
+    else:
+        results = runner.run(jobs)
+
+    _, failed = summarize(results, time.time() - start)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -184,7 +184,7 @@ class KeyboardControlGroup(QGroupBox):
     
     def __init__(self, parent=None):
         super().__init__("键盘控制方案", parent)
-        self.settings_manager = SettingsManager()
+        self.settings_manager = SettingsManager.shared()
         self.wheel_filter = WheelEventFilter()
         self._init_ui()
         self._load_settings()
@@ -232,14 +232,11 @@ class KeyboardControlGroup(QGroupBox):
     def _on_scheme_changed(self, index):
         """键盘控制方案改变事件"""
         scheme_id = self.scheme_combo.currentData()
+        # 主窗口通过设置变化信号更新音频预览的键盘控制方案
         self.settings_manager.Custom.set_value("keyboard_scheme", str(scheme_id))
         
         # 更新方案说明
         self._update_scheme_description()
-        
-        # 更新音频预览的键盘控制方案
-        if hasattr(self.parent(), 'parent_window'):
-            self.parent().parent_window.audio_preview.set_keyboard_scheme(scheme_id)
     
     def _update_scheme_description(self):
         """更新方案说明"""
@@ -284,7 +281,7 @@ class WindowSizeGroup(QGroupBox):
     
     def __init__(self, parent=None):
         super().__init__("窗口尺寸设置", parent)
-        self.settings_manager = SettingsManager()
+        self.settings_manager = SettingsManager.shared()
         self.wheel_filter = WheelEventFilter()
         self._init_ui()
         self._load_settings()
@@ -346,7 +343,7 @@ class ColorSettingsGroup(QGroupBox):
     
     def __init__(self, parent=None):
         super().__init__("颜色设置", parent)
-        self.settings_manager = SettingsManager()
+        self.settings_manager = SettingsManager.shared()
         self._init_ui()
         self._load_settings()
     
@@ -419,7 +416,7 @@ class FontSettingsGroup(QGroupBox):
     
     def __init__(self, parent=None):
         super().__init__("字体设置", parent)
-        self.settings_manager = SettingsManager()
+        self.settings_manager = SettingsManager.shared()
         self.wheel_filter = WheelEventFilter()
         self._init_ui()
         self._load_settings()
@@ -512,7 +509,7 @@ class NotificationSettingsGroup(QGroupBox):
     
     def __init__(self, parent=None):
         super().__init__("通知设置", parent)
-        self.settings_manager = SettingsManager()
+        self.settings_manager = SettingsManager.shared()
         self.wheel_filter = WheelEventFilter()
         self._init_ui()
         self._load_settings()
@@ -756,7 +753,7 @@ class CustomPage(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent_window = parent
-        self.settings_manager = SettingsManager()
+        self.settings_manager = SettingsManager.shared()
         self.wheel_filter = WheelEventFilter()
         
         # 字体大小设置
@@ -0,0 +1,292 @@
+import os
+import json
+import time
+import atexit
+import hashlib
+import threading
+import unicodedata
+from typing import Dict, List, Optional
+
+
+class DiskCache:
+    """磁盘缓存 - 内容寻址，带索引文件、容量上限（LRU淘汰）和完整性校验
+
+    每个条目存成缓存目录下的一个文件，index.json记录大小、sha256和最近访问时间。
+    读取时校验sha256，不一致的条目直接丢弃，当作未命中。
+    索引只在flush()时落盘；异常退出留下的孤立文件会在下次加载时清掉。
+    """
+
+    INDEX_FILENAME = "index.json"
+    # 加载时不当作孤立文件清理的文件名
+    RESERVED_FILENAMES = (INDEX_FILENAME,)
+    DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+    FILE_SUFFIX = ".bin"
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, self.INDEX_FILENAME)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+        self._dirty = False
+        self._load_index()
+        atexit.register(self.flush)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取缓存，未命中或校验失败返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            try:
+                with open(self._entry_path(key), 'rb') as f:
+                    data = f.read()
+            except OSError:
+                self._remove_entry(key)
+                return None
+            if len(data) != entry["size"] or hashlib.sha256(data).hexdigest() != entry["sha256"]:
+                print(f"缓存条目校验失败，已丢弃: {key}")
+                self._remove_entry(key)
+                return None
+            entry["last_access"] = time.time()
+            self._dirty = True
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """写入缓存，超出容量时按最近访问时间淘汰"""
+        if not data or len(data) > self.max_bytes:
+            return
+        with self._lock:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                path = self._entry_path(key)
+                temp_path = path + ".tmp"
+                with open(temp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except OSError as e:
+                print(f"写入缓存失败: {e}")
+                return
+            self._entries[key] = {
+                "size": len(data),
+                "sha256": hashlib.sha256(data).hexdigest(),
+                "last_access": time.time(),
+            }
+            self._dirty = True
+            self._evict()
+
+    def flush(self) -> None:
+        """把内存中的索引写回磁盘 - 每次合成结束和程序退出时调用"""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def total_size(self) -> int:
+        with self._lock:
+            return sum(entry["size"] for entry in self._entries.values())
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            for key in list(self._entries):
+                self._remove_entry(key)
+            self._save_index()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.FILE_SUFFIX)
+
+    def _remove_entry(self, key: str) -> None:
+        self._entries.pop(key, None)
+        self._dirty = True
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        total = sum(entry["size"] for entry in self._entries.values())
+        if total <= self.max_bytes:
+            return
+        for key in sorted(self._entries, key=lambda k: self._entries[k]["last_access"]):
+            total -= self._entries[key]["size"]
+            self._remove_entry(key)
+            if total <= self.max_bytes:
+                break
+
+    def _load_index(self) -> None:
+        """加载索引，丢掉文件已不存在的条目和索引里没有的孤立文件"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            if not isinstance(entries, dict):
+                entries = {}
+        except (OSError, ValueError):
+            entries = {}
+
+        for key, entry in entries.items():
+            if (isinstance(entry, dict) and {"size", "sha256", "last_access"} <= entry.keys()
+                    and os.path.exists(self._entry_path(key))):
+                self._entries[key] = entry
+            else:
+                self._dirty = True
+
+        for filename in os.listdir(self.cache_dir):
+            if filename in self.RESERVED_FILENAMES:
+                continue
+            key, ext = os.path.splitext(filename)
+            if ext != self.FILE_SUFFIX or key not in self._entries:
+                try:
+                    os.remove(os.path.join(self.cache_dir, filename))
+                except OSError:
+                    pass
+
+    def _save_index(self) -> None:
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = self.index_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+            os.replace(temp_path, self.index_path)
+            self._dirty = False
+        except OSError as e:
+            print(f"保存缓存索引失败: {e}")
+
+
+class SegmentCache(DiskCache):
+    """合成片段缓存 - 按 规范化文本+音色+语速+音调+音量+输出格式 寻址"""
+
+    FILE_SUFFIX = ".mp3"
+    # Edge-TTS默认输出格式，格式变了缓存自然失效
+    OUTPUT_FORMAT = "audio-24khz-48kbitrate-mono-mp3"
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "SegmentCache":
+        """进程内共用一个实例，预览和生成线程共享同一份索引"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                program_dir = os.path.dirname(os.path.abspath(__file__))
+                cls._instance = cls(os.path.join(program_dir, "cache", "segments"))
+            return cls._instance
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """规范化文本：统一Unicode形式，合并空白"""
+        text = unicodedata.normalize('NFC', text)
+        return ' '.join(text.split())
+
+    @classmethod
+    def make_key(cls, text: str, voice: str, rate: str, pitch: str, volume: str) -> str:
+        payload = json.dumps(
+            [cls.normalize_text(text), voice, rate, pitch, volume, cls.OUTPUT_FORMAT],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ImportCache(DiskCache):
+    """导入结果缓存 - 保存从docx/txt/图片/PDF页提取出的文本
+
+    键由 提取类型 + 源文件内容指纹 + 提取参数（提示词、模型、页码、提取内容等）组成，
+    重复导入同一个文件不再重新解析，也不再重复调用收费的OCR接口。
+    文件指纹是内容的sha256；路径、大小和修改时间都没变时直接用记下的指纹，不重新读文件。
+    """
+
+    FILE_SUFFIX = ".txt"
+    FINGERPRINT_FILENAME = "fingerprints.json"
+    RESERVED_FILENAMES = (DiskCache.INDEX_FILENAME, FINGERPRINT_FILENAME)
+    DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+    MAX_FINGERPRINTS = 2000
+    HASH_BLOCK = 1024 * 1024
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.fingerprint_path = os.path.join(cache_dir, self.FINGERPRINT_FILENAME)
+        self._fingerprints: Dict[str, List] = {}
+        self._fingerprints_dirty = False
+        super().__init__(cache_dir, max_bytes)
+        self._load_fingerprints()
+
+    @classmethod
+    def shared(cls) -> "ImportCache":
+        """进程内共用一个实例，各个导入入口共享同一份索引"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                program_dir = os.path.dirname(os.path.abspath(__file__))
+                cls._instance = cls(os.path.join(program_dir, "cache", "imports"))
+            return cls._instance
+
+    def fingerprint(self, file_path: str) -> str:
+        """源文件内容的sha256，大小和修改时间没变时走快速路径"""
+        path = os.path.normcase(os.path.abspath(file_path))
+        stat = os.stat(path)
+        with self._lock:
+            known = self._fingerprints.get(path)
+            if known is not None and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+                return known[2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(self.HASH_BLOCK), b''):
+                digest.update(block)
+        fingerprint = digest.hexdigest()
+
+        with self._lock:
+            self._fingerprints.pop(path, None)
+            self._fingerprints[path] = [stat.st_size, stat.st_mtime_ns, fingerprint]
+            # 只保留最近的一批，字典按插入顺序淘汰最早的
+            while len(self._fingerprints) > self.MAX_FINGERPRINTS:
+                del self._fingerprints[next(iter(self._fingerprints))]
+            self._fingerprints_dirty = True
+        return fingerprint
+
+    @staticmethod
+    def make_key(kind: str, fingerprint: str, **params) -> str:
+        payload = json.dumps([kind, fingerprint, params], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def key_for_file(self, file_path: str, kind: str, **params) -> str:
+        """按文件内容和提取参数生成缓存键"""
+        return self.make_key(kind, self.fingerprint(file_path), **params)
+
+    def get_text(self, key: str) -> Optional[str]:
+        data = self.get(key)
+        return data.decode('utf-8') if data is not None else None
+
+    def put_text(self, key: str, text: str) -> None:
+        self.put(key, text.encode('utf-8'))
+
+    def flush(self) -> None:
+        super().flush()
+        with self._lock:
+            if self._fingerprints_dirty:
+                self._save_fingerprints()
+
+    def _load_fingerprints(self) -> None:
+        try:
+            with open(self.fingerprint_path, 'r', encoding='utf-8') as f:
+                fingerprints = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(fingerprints, dict):
+            self._fingerprints = {
+                path: value for path, value in fingerprints.items()
+                if isinstance(value, list) and len(value) == 3
+            }
+
+    def _save_fingerprints(self) -> None:
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = self.fingerprint_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._fingerprints, f, ensure_ascii=False)
+            os.replace(temp_path, self.fingerprint_path)
+            self._fingerprints_dirty = False
+        except OSError as e:
+            print(f"保存文件指纹失败: {e}")
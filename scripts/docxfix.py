@@ -20,8 +20,12 @@ I don't even know what DS did to the code, but it just worked。 ;)
 '''
 
 import os
+import sys
+import time
 import zipfile
-from typing import List, Optional
+import tempfile
+import tracemalloc
+from typing import Callable, Iterator, List, Optional
 from lxml import etree
 
 
@@ -51,6 +55,36 @@ class DocxNamespaceManager:
         return f'{{{namespace}}}{tag_name}' if namespace else tag_name
 
 
+class DocxTags:
+    """常用标签的完整名称，预先拼好，避免逐个元素查命名空间"""
+    
+    P = DocxNamespaceManager.get_tag_with_namespace('w', 'p')
+    T = DocxNamespaceManager.get_tag_with_namespace('w', 't')
+    TAB = DocxNamespaceManager.get_tag_with_namespace('w', 'tab')
+    BR = DocxNamespaceManager.get_tag_with_namespace('w', 'br')
+    
+    # 段落文本只由这几种元素构成
+    TEXT_TAGS = (T, TAB, BR)
+    
+    @classmethod
+    def element_text(cls, element: etree._Element) -> str:
+        """提取段落元素（含嵌套元素）中的文本"""
+        parts = []
+        for child in element.iter(cls.TEXT_TAGS):
+            tag = child.tag
+            if tag == cls.T:
+                # 文本元素
+                if child.text:
+                    parts.append(child.text)
+            elif tag == cls.TAB:
+                # 制表符
+                parts.append('\t')
+            else:
+                # 换行符
+                parts.append('\n')
+        return ''.join(parts)
+
+
 class DocxFileHandler:
     """DOCX文件处理器"""
     
@@ -83,6 +117,82 @@ class DocxFileHandler:
             raise etree.XMLSyntaxError(f"XML解析错误: {file_path}") from e
 
 
+class DocxStreamReader:
+    """DOCX流式读取器
+    
+    用lxml iterparse边解析边产出段落文本，处理完的元素立即清除，
+    内存占用与文档大小无关，适合很大的试卷和教材。
+    输出与Document.get_text完全一致（嵌套段落同样按文档顺序产出）。
+    """
+    
+    PROGRESS_STEP = 256 * 1024  # 每解析这么多字节的XML报告一次进度
+    
+    @staticmethod
+    def iter_paragraphs(file_path: str,
+                        progress: Optional[Callable[[int, int], None]] = None) -> Iterator[str]:
+        """
+        逐个产出段落文本
+        
+        Args:
+            file_path: DOCX文件路径
+            progress: 进度回调，参数为(已解析的XML字节数, XML总字节数)
+            
+        Raises:
+            FileNotFoundError: 文件不存在
+            zipfile.BadZipFile: 不是有效的ZIP文件
+            etree.XMLSyntaxError: XML解析错误
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"文件不存在: {file_path}")
+        
+        try:
+            docx_zip = zipfile.ZipFile(file_path)
+        except zipfile.BadZipFile as e:
+            raise zipfile.BadZipFile(f"不是有效的DOCX文件: {file_path}") from e
+        
+        with docx_zip, docx_zip.open('word/document.xml') as xml_file:
+            total_bytes = docx_zip.getinfo('word/document.xml').file_size
+            reported = 0
+            
+            # 文本框等处的段落会嵌套在外层段落里，按开始顺序占位，最外层段落结束时一起产出
+            pending: List[Optional[str]] = []
+            open_slots: List[int] = []
+            
+            for event, element in etree.iterparse(xml_file, events=('start', 'end'), tag=DocxTags.P):
+                if event == 'start':
+                    open_slots.append(len(pending))
+                    pending.append(None)
+                    continue
+                
+                pending[open_slots.pop()] = DocxTags.element_text(element)
+                if open_slots:
+                    continue
+                
+                yield from pending
+                pending.clear()
+                
+                if progress is not None:
+                    position = xml_file.tell()
+                    if position - reported >= DocxStreamReader.PROGRESS_STEP:
+                        reported = position
+                        progress(position, total_bytes)
+                
+                # 清掉已处理的段落和它前面的兄弟节点
+                element.clear(keep_tail=True)
+                parent = element.getparent()
+                if parent is not None:
+                    while element.getprevious() is not None:
+                        del parent[0]
+            
+            if progress is not None:
+                progress(total_bytes, total_bytes)
+    
+    @staticmethod
+    def read_text(file_path: str, separator: str = '\n') -> str:
+        """流式读取文档的全部文本，结果与Document(file_path).get_text(separator)相同"""
+        return separator.join(DocxStreamReader.iter_paragraphs(file_path))
+
+
 class Paragraph:
     """段落类，表示docx中的一个段落"""
     
@@ -98,23 +208,7 @@ class Paragraph:
     
     def _extract_text_from_element(self) -> str:
         """从XML元素中提取文本内容"""
-        paragraph_text = ''
-        
-        for element in self.element.iter():
-            tag = element.tag
-            
-            if tag == DocxNamespaceManager.get_tag_with_namespace('w', 't'):
-                # 文本元素
-                if element.text:
-                    paragraph_text += element.text
-            elif tag == DocxNamespaceManager.get_tag_with_namespace('w', 'tab'):
-                # 制表符
-                paragraph_text += '\t'
-            elif tag == DocxNamespaceManager.get_tag_with_namespace('w', 'br'):
-                # 换行符
-                paragraph_text += '\n'
-        
-        return paragraph_text
+        return DocxTags.element_text(self.element)
     
     @property
     def text(self) -> str:
@@ -156,13 +250,7 @@ class Document:
         if self._document_element is None:
             return
         
-        self._paragraphs = []
-        paragraph_tag = DocxNamespaceManager.get_tag_with_namespace('w', 'p')
-        
-        for element in self._document_element.iter():
-            if element.tag == paragraph_tag:
-                paragraph = Paragraph(element)
-                self._paragraphs.append(paragraph)
+        self._paragraphs = [Paragraph(element) for element in self._document_element.iter(DocxTags.P)]
     
     @property
     def paragraphs(self) -> List[Paragraph]:
@@ -216,5 +304,53 @@ def opendocx(file_path: str) -> etree._Element:
     return DocxFileHandler.open_docx(file_path)
 
 
+def _write_sample_docx(file_path: str, paragraph_count: int) -> None:
+    """生成用于基准测试的docx（只含document.xml）"""
+    w_ns = DocxNamespaceManager.get_namespace('w')
+    with zipfile.ZipFile(file_path, 'w', zipfile.ZIP_DEFLATED) as docx_zip:
+        with docx_zip.open('word/document.xml', 'w') as xml_file:
+            xml_file.write(f'<w:document xmlns:w="{w_ns}"><w:body>'.encode('utf-8'))
+            for i in range(paragraph_count):
+                xml_file.write(
+                    f'<w:p><w:pPr><w:jc w:val="left"/></w:pPr>'
+                    f'<w:r><w:rPr><w:b/></w:rPr><w:t>第{i}题</w:t></w:r>'
+                    f'<w:r><w:tab/><w:t xml:space="preserve">阅读下面的文字，完成各小题。</w:t><w:br/></w:r>'
+                    f'<w:r><w:t>这是用于测试的段落内容，</w:t><w:t>重复出现多次。</w:t></w:r></w:p>'.encode('utf-8')
+                )
+            xml_file.write(b'</w:body></w:document>')
+
+
+def benchmark(file_path: str) -> None:
+    """对比Document.get_text与流式读取的耗时和峰值内存
+    
+    耗时和内存分开测，tracemalloc本身会拖慢解析。
+    tracemalloc只统计Python堆，libxml2的树节点不在其中，完整建树的实际内存比显示的更大。
+    """
+    def measure(func):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return result, elapsed, peak
+    
+    tree_text, tree_time, tree_peak = measure(lambda: Document(file_path).get_text('\n'))
+    stream_text, stream_time, stream_peak = measure(lambda: DocxStreamReader.read_text(file_path, '\n'))
+    
+    print(f"{os.path.basename(file_path)}: {len(tree_text)} 字符, 结果{'一致' if tree_text == stream_text else '不一致'}")
+    print(f"  Document.get_text     : {tree_time:.3f}s, Python堆峰值 {tree_peak / 1024 / 1024:.1f} MB")
+    print(f"  DocxStreamReader      : {stream_time:.3f}s, Python堆峰值 {stream_peak / 1024 / 1024:.1f} MB")
+
+
 if __name__ == "__main__":
-    print(0)
\ No newline at end of file
+    # 用法: python docxfix.py [file.docx ...]，不给文件时生成一个样例文档
+    if len(sys.argv) > 1:
+        for path in sys.argv[1:]:
+            benchmark(path)
+    else:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            sample_path = os.path.join(temp_dir, 'sample.docx')
+            _write_sample_docx(sample_path, 50000)
+            benchmark(sample_path)
\ No newline at end of file
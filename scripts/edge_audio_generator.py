@@ -1,14 +1,21 @@
 import re
 import os
+import math
+import queue
+import asyncio
 import traceback
+import threading
 import subprocess
 import tempfile
-import shutil
-from typing import Callable, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
 import edge_tts
 
+from disk_cache import SegmentCache
+from mp3_frames import Mp3FrameStitcher
+from tts_service import TTSService
+
 
 @dataclass
 class GenerationConfig:
@@ -21,6 +28,7 @@ class GenerationConfig:
     save_path: str
     stretch_factor: float = 1.0
     stretch_enabled: bool = False
+    max_concurrency: int = 4
 
 
 class AudioParameterFormatter:
@@ -55,6 +63,271 @@ class AudioParameterFormatter:
         return re.sub(r'\n', '，', text)
 
 
+class TextSegmenter:
+    """文本分段器 - 把长文本切成句子大小的片段"""
+
+    # 句末标点（含换行），切分后标点留在句尾
+    SENTENCE_PATTERN = re.compile(r'[^。！？!?；;…\n]*(?:[。！？!?；;…\n]+|$)')
+    # 句内停顿标点，超长句子在这里二次切分
+    CLAUSE_PATTERN = re.compile(r'[^，,、：:]*(?:[，,、：:]+|$)')
+    # 能念出声的字符，全是标点的片段会让Edge返回空音频
+    SPEAKABLE_PATTERN = re.compile(r'\w')
+
+    DEFAULT_MAX_CHARS = 300
+
+    @classmethod
+    def split(cls, text: str, max_chars: int = DEFAULT_MAX_CHARS) -> List[str]:
+        """按句切分文本，相邻短句合并到不超过max_chars"""
+        segments = []
+        current = ""
+
+        for piece in cls._split_pieces(text, max_chars):
+            if current and len(current) + len(piece) > max_chars:
+                segments.append(current)
+                current = ""
+            current += piece
+        if current:
+            segments.append(current)
+
+        return cls._merge_unspeakable(segments)
+
+    @classmethod
+    def _split_pieces(cls, text: str, max_chars: int) -> List[str]:
+        """切出句子，超长句子再按分句/硬长度切开"""
+        pieces = []
+        for sentence in cls.SENTENCE_PATTERN.findall(text):
+            if not sentence:
+                continue
+            if len(sentence) <= max_chars:
+                pieces.append(sentence)
+                continue
+            for clause in cls.CLAUSE_PATTERN.findall(sentence):
+                while len(clause) > max_chars:
+                    pieces.append(clause[:max_chars])
+                    clause = clause[max_chars:]
+                if clause:
+                    pieces.append(clause)
+        return pieces
+
+    @classmethod
+    def _merge_unspeakable(cls, segments: List[str]) -> List[str]:
+        """把只有标点/空白的片段并入前一段"""
+        merged = []
+        for segment in segments:
+            if not cls.SPEAKABLE_PATTERN.search(segment):
+                if merged:
+                    merged[-1] += segment
+                continue
+            merged.append(segment)
+        return merged
+
+
+class ChunkedSynthesizer:
+    """分段并发合成器 - 限制并发数同时合成多个片段，按原顺序写出"""
+
+    DEFAULT_MAX_CONCURRENCY = 4
+    DEFAULT_MAX_RETRIES = 3
+    RETRY_DELAY = 1.0  # 秒，每次重试递增
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 cache: Optional[SegmentCache] = None,
+                 connector=None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(1, max_retries)
+        self.cache = cache
+        #合成服务的共享连接器；为None时edge-tts每次自建连接
+        self.connector = connector
+
+    def create_communicate(self, text: str, voice: str, rate: str,
+                           pitch: str, volume: str) -> edge_tts.Communicate:
+        return edge_tts.Communicate(
+            text=text,
+            voice=voice,
+            rate=rate,
+            pitch=pitch,
+            volume=volume,
+            connector=self.connector
+        )
+
+    def get_cached(self, text: str, voice: str, rate: str,
+                   pitch: str, volume: str) -> Optional[bytes]:
+        """查片段缓存，未启用缓存或未命中返回None"""
+        if self.cache is None:
+            return None
+        return self.cache.get(SegmentCache.make_key(text, voice, rate, pitch, volume))
+
+    def store_cached(self, text: str, voice: str, rate: str,
+                     pitch: str, volume: str, audio: bytes) -> None:
+        if self.cache is not None:
+            self.cache.put(SegmentCache.make_key(text, voice, rate, pitch, volume), audio)
+
+    async def synthesize_segment(self, text: str, voice: str, rate: str,
+                                 pitch: str, volume: str) -> bytes:
+        """合成单个片段，先查缓存；失败时只重试这一段"""
+        cached = self.get_cached(text, voice, rate, pitch, volume)
+        if cached is not None:
+            return cached
+
+        last_error = None
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                communicate = self.create_communicate(text, voice, rate, pitch, volume)
+                audio = bytearray()
+                async for chunk in communicate.stream():
+                    if chunk["type"] == "audio":
+                        audio.extend(chunk["data"])
+                if not audio:
+                    raise Exception("没有收到音频数据")
+                self.store_cached(text, voice, rate, pitch, volume, bytes(audio))
+                return bytes(audio)
+            except Exception as e:
+                last_error = e
+                print(f"片段合成失败（第{attempt}次）: {e}")
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self.RETRY_DELAY * attempt)
+        raise Exception(f"片段合成失败: {last_error}")
+
+    async def synthesize_to_file(self, segments: List[str], voice: str, rate: str,
+                                 pitch: str, volume: str, output_path: str) -> None:
+        """并发合成所有片段，按原顺序帧级拼接写入output_path，并写入总时长信息帧"""
+        with open(output_path, 'wb') as output_file:
+            stitcher = Mp3FrameStitcher(output_file)
+            await self.synthesize_to_stream(segments, voice, rate, pitch, volume, stitcher)
+            stitcher.finish()
+
+    async def synthesize_to_stream(self, segments: List[str], voice: str, rate: str,
+                                   pitch: str, volume: str, output_file) -> None:
+        """并发合成所有片段，并按原顺序写入output_file（任何有write方法的对象，每次写入一整段）
+
+        Edge-TTS返回的是不带ID3头的裸MP3帧，按顺序直接拼接即为合法MP3。
+        先完成的片段暂存在内存里，等前面的片段到齐后再写出。
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(index: int, segment: str) -> Tuple[int, bytes]:
+            async with semaphore:
+                audio = await self.synthesize_segment(segment, voice, rate, pitch, volume)
+                print(f"片段 {index + 1}/{len(segments)} 合成完成")
+                return index, audio
+
+        tasks = [asyncio.ensure_future(run(i, seg)) for i, seg in enumerate(segments)]
+        finished: Dict[int, bytes] = {}
+        next_index = 0
+        try:
+            for future in asyncio.as_completed(tasks):
+                index, audio = await future
+                finished[index] = audio
+                while next_index in finished:
+                    output_file.write(finished.pop(next_index))
+                    next_index += 1
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+
+class StreamingPreviewSynthesizer:
+    """流式预览合成器 - 边合成边写入预览文件，让播放器在第一句到达时就开始播放
+
+    第一段通过Communicate.stream()逐块写盘；其余片段同时预取，按顺序追加。
+    """
+
+    # Edge-TTS默认输出 audio-24khz-48kbitrate-mono-mp3，即每秒6000字节
+    BYTES_PER_SECOND = 6000
+    # 缓冲到这么多秒音频就通知播放器开始
+    START_THRESHOLD_SECONDS = 1.0
+
+    def __init__(self, synthesizer: ChunkedSynthesizer):
+        self.synthesizer = synthesizer
+
+    async def stream_to_file(self, segments: List[str], voice: str, rate: str,
+                             pitch: str, volume: str, output_path: str,
+                             started_callback: Callable[[str], None],
+                             progress_callback: Callable[[float, float], None]) -> None:
+        """流式写入预览文件
+
+        progress_callback(已到达秒数, 已到达文本比例) 在每次追加后调用；
+        started_callback(path) 在首批音频落盘后调用一次（紧跟在对应的进度回调之后）。
+        """
+        total_chars = sum(len(segment) for segment in segments) or 1
+        semaphore = asyncio.Semaphore(self.synthesizer.max_concurrency)
+
+        async def prefetch(segment: str) -> bytes:
+            async with semaphore:
+                return await self.synthesizer.synthesize_segment(segment, voice, rate, pitch, volume)
+
+        #第一段之外的片段提前并发合成
+        prefetch_tasks = [asyncio.ensure_future(prefetch(segment)) for segment in segments[1:]]
+        done_chars = 0
+        started = False
+
+        def report(fraction_chars: float):
+            nonlocal started
+            written_bytes = output_file.tell()
+            seconds = written_bytes / self.BYTES_PER_SECOND
+            progress_callback(seconds, min(1.0, fraction_chars / total_chars))
+            if not started and written_bytes:
+                started = True
+                started_callback(output_path)
+
+        try:
+            with open(output_path, 'wb') as output_file:
+                #第一段：命中缓存直接写入，否则逐块写入
+                first = segments[0]
+                cached = self.synthesizer.get_cached(first, voice, rate, pitch, volume)
+                if cached is not None:
+                    output_file.write(cached)
+                    output_file.flush()
+                else:
+                    await self._stream_first_segment(first, voice, rate, pitch, volume,
+                                                     output_file, report)
+                done_chars = len(first)
+                report(done_chars)
+
+                #其余片段：按顺序等预取结果
+                for segment, task in zip(segments[1:], prefetch_tasks):
+                    audio = await task
+                    output_file.write(audio)
+                    output_file.flush()
+                    done_chars += len(segment)
+                    report(done_chars)
+        except Exception:
+            for task in prefetch_tasks:
+                task.cancel()
+            await asyncio.gather(*prefetch_tasks, return_exceptions=True)
+            raise
+
+    async def _stream_first_segment(self, text: str, voice: str, rate: str,
+                                    pitch: str, volume: str, output_file,
+                                    report: Callable[[float], None]) -> None:
+        """逐块写入第一段，完整收到后存入缓存"""
+        audio = bytearray()
+        spoken_chars = 0
+        try:
+            communicate = self.synthesizer.create_communicate(text, voice, rate, pitch, volume)
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    output_file.write(chunk["data"])
+                    output_file.flush()
+                    audio.extend(chunk["data"])
+                    if len(audio) >= self.START_THRESHOLD_SECONDS * self.BYTES_PER_SECOND:
+                        report(spoken_chars)
+                elif chunk["type"] == "SentenceBoundary":
+                    spoken_chars = min(len(text), spoken_chars + len(chunk.get("text", "")))
+        except Exception as e:
+            #还没写出任何音频时可以整段重试，否则只能放弃
+            if audio:
+                raise
+            print(f"流式合成第一段失败，改为整段重试: {e}")
+            output_file.write(await self.synthesizer.synthesize_segment(text, voice, rate, pitch, volume))
+            output_file.flush()
+            return
+        if audio:
+            self.synthesizer.store_cached(text, voice, rate, pitch, volume, bytes(audio))
+
+
 class FilePathManager:
     """文件路径管理器"""
     
@@ -73,9 +346,9 @@ class FilePathManager:
         return True
     
     @staticmethod
-    def create_temp_file(suffix: str = '.mp3') -> str:
-        """创建临时文件"""
-        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
+    def create_temp_file(suffix: str = '.mp3', directory: Optional[str] = None) -> str:
+        """创建临时文件（指定directory时建在该目录下，之后可以直接改名到位）"""
+        with tempfile.NamedTemporaryFile(suffix=suffix, dir=directory, delete=False) as temp_file:
             return temp_file.name
     
     @staticmethod
@@ -86,49 +359,182 @@ class FilePathManager:
         return f"tmp_{now.strftime('%m%d%H%M%S')}.mp3"
 
 
+@dataclass
+class StretchPlan:
+    """拉伸方案"""
+    path: str
+    rate: int  # 发给服务的语速（百分比）
+    ffmpeg_factor: float = 1.0  # 仍需FFmpeg处理的倍数，1.0表示不需要
+    ffmpeg_failed: bool = False  # FFmpeg不可用或失败，输出的是未经FFmpeg拉伸的音频
+
+    @property
+    def needs_ffmpeg(self) -> bool:
+        return self.ffmpeg_factor != 1.0
+
+    def describe(self) -> str:
+        if self.ffmpeg_failed:
+            return f"语速{self.rate:+d}%，FFmpeg拉伸失败，剩余{self.ffmpeg_factor:.3f}倍未拉伸"
+        if self.path == StretchPlanner.RATE_ONLY:
+            return f"拉伸已折算进语速({self.rate:+d}%)，跳过FFmpeg"
+        if self.path == StretchPlanner.FFMPEG_ONLY:
+            return f"语速已到服务端上下限，FFmpeg拉伸{self.ffmpeg_factor:.3f}倍"
+        if self.path == StretchPlanner.BOTH:
+            return f"语速调整为{self.rate:+d}%，剩余{self.ffmpeg_factor:.3f}倍由FFmpeg拉伸"
+        return "未拉伸"
+
+
+class StretchPlanner:
+    """拉伸规划器 - 把拉伸倍数折算进服务端语速，尽量不跑FFmpeg
+
+    总速度 = (1 + 语速/100) × 拉伸倍数。落在服务支持的语速范围内时只改语速；
+    超出范围时语速取边界值，剩下的倍数交给FFmpeg。服务端语速和atempo一样不改变音调。
+    """
+
+    NONE = "none"
+    RATE_ONLY = "rate"
+    FFMPEG_ONLY = "ffmpeg"
+    BOTH = "rate+ffmpeg"
+
+    # Edge-TTS语速可用范围（百分比）
+    MIN_RATE = -50
+    MAX_RATE = 100
+    # 语速只能取整数百分比，剩余误差小于这个值时不再交给FFmpeg
+    TOLERANCE = 0.01
+
+    @classmethod
+    def plan(cls, speed: int, stretch_factor: float, stretch_enabled: bool) -> StretchPlan:
+        if not stretch_enabled or stretch_factor <= 0 or stretch_factor == 1.0:
+            return StretchPlan(cls.NONE, speed)
+
+        target = (1 + speed / 100) * stretch_factor
+        rate = max(cls.MIN_RATE, min(cls.MAX_RATE, math.floor((target - 1) * 100 + 0.5)))
+        residual = target / (1 + rate / 100)
+
+        if abs(residual - 1.0) < cls.TOLERANCE:
+            return StretchPlan(cls.RATE_ONLY, rate)
+        if rate == speed:
+            return StretchPlan(cls.FFMPEG_ONLY, speed, stretch_factor)
+        return StretchPlan(cls.BOTH, rate, round(residual, 4))
+
+
+class StretchPipeError(Exception):
+    """管道拉伸失败"""
+
+
+class StretchPipe:
+    """管道拉伸 - 合成数据写进FFmpeg的stdin，拉伸结果从stdout直接写入目标文件
+
+    边合成边拉伸，中间不落临时文件。stdout/stderr各由一个线程读取，避免管道写满卡死。
+    stdin也由一个线程写入：write()只把数据放进队列，FFmpeg处理慢时不会卡住调用它的
+    合成服务事件循环（同一个循环里还有别的合成和预览任务）。
+    """
+
+    def __init__(self, command: List[str], output_path: str):
+        self.output_file = open(output_path, 'wb')
+        try:
+            self.process = subprocess.Popen(
+                command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+        except OSError as e:
+            self.output_file.close()
+            raise StretchPipeError(f"无法启动FFmpeg: {e}")
+        self._stderr = bytearray()
+        self._input: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._write_error: Optional[OSError] = None
+        self._threads = [
+            threading.Thread(target=self._feed_stdin, daemon=True),
+            threading.Thread(target=self._drain_stdout, daemon=True),
+            threading.Thread(target=self._drain_stderr, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def write(self, data: bytes) -> None:
+        """把数据交给写入线程，不等待FFmpeg读取"""
+        if self._write_error is not None:
+            raise StretchPipeError(f"FFmpeg提前退出: {self._error_text() or self._write_error}")
+        self._input.put(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        """结束输入并等待FFmpeg写完，失败时抛出StretchPipeError"""
+        self._input.put(None)
+        returncode = self.process.wait()
+        for thread in self._threads:
+            thread.join()
+        self.output_file.close()
+        if returncode != 0:
+            raise StretchPipeError(f"FFmpeg拉伸失败: {self._error_text()}")
+        if self._write_error is not None:
+            raise StretchPipeError(f"FFmpeg提前退出: {self._write_error}")
+
+    def abort(self) -> None:
+        """合成出错时终止FFmpeg"""
+        self.process.kill()
+        self._input.put(None)
+        self.process.wait()
+        for thread in self._threads:
+            thread.join()
+        self.output_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _feed_stdin(self):
+        """按顺序把队列里的数据写进FFmpeg，收到None时关闭stdin；写入失败后丢弃剩余数据"""
+        try:
+            for data in iter(self._input.get, None):
+                if self._write_error is None:
+                    try:
+                        self.process.stdin.write(data)
+                    except OSError as e:
+                        self._write_error = e
+        finally:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+
+    def _drain_stdout(self):
+        for chunk in iter(lambda: self.process.stdout.read(65536), b''):
+            self.output_file.write(chunk)
+
+    def _drain_stderr(self):
+        for chunk in iter(lambda: self.process.stderr.read(4096), b''):
+            self._stderr.extend(chunk)
+
+    def _error_text(self) -> str:
+        return self._stderr.decode('utf-8', errors='replace').strip()
+
+
 class AudioStretcher:
     """音频拉伸处理器"""
     
     @staticmethod
-    def apply_audio_stretch(input_path: str, stretch_factor: float) -> str:
-        """应用音频拉伸（变速不变调）- 使用FFmpeg"""
-        try:
-            print(f"应用音频拉伸: {stretch_factor}倍")
-            
-            # 创建输出文件路径
-            base, ext = os.path.splitext(input_path)
-            output_path = f"{base}_stretched{ext}"
-            
-            # 构建FFmpeg命令
-            cmd = AudioStretcher._build_ffmpeg_command(input_path, output_path, stretch_factor)
-            
-            # 执行命令
-            print(f"执行FFmpeg命令: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                print(f"FFmpeg拉伸失败: {result.stderr}")
-                print(f"FFmpeg标准输出: {result.stdout}")
-                return input_path
-            
-            print(f"音频拉伸成功: {input_path} -> {output_path}")
-            return output_path
-            
-        except Exception as e:
-            # 如果拉伸失败，返回原文件
-            print(f"音频拉伸失败: {e}")
-            traceback.print_exc()
-            return input_path
+    def open_stretch_pipe(output_path: str, stretch_factor: float) -> StretchPipe:
+        """打开管道拉伸（变速不变调）- 使用FFmpeg，写入的MP3数据拉伸后存到output_path"""
+        print(f"应用音频拉伸: {stretch_factor}倍")
+        cmd = AudioStretcher._build_ffmpeg_command(stretch_factor)
+        print(f"执行FFmpeg命令: {' '.join(cmd)}")
+        return StretchPipe(cmd, output_path)
     
     @staticmethod
-    def _build_ffmpeg_command(input_path: str, output_path: str, stretch_factor: float) -> list:
-        """构建FFmpeg命令"""
-        if 0.5 <= stretch_factor <= 2.0:
-            return ['ffmpeg', '-i', input_path,'-filter:a', f'atempo={stretch_factor}','-y',output_path]
-        else:      
-            factors = AudioStretcher._calculate_tempo_factors(stretch_factor)
-            filter_chain = ''.join([f'atempo={f},' for f in factors])[:-1] 
-            return ['ffmpeg', '-i', input_path,'-filter:a', filter_chain,'-y',output_path]
+    def _build_ffmpeg_command(stretch_factor: float) -> list:
+        """构建FFmpeg命令 - 从stdin读MP3，向stdout写MP3"""
+        factors = AudioStretcher._calculate_tempo_factors(stretch_factor)
+        filter_chain = ','.join(f'atempo={f}' for f in factors)
+        return ['ffmpeg', '-hide_banner', '-loglevel', 'error',
+                '-f', 'mp3', '-i', 'pipe:0',
+                '-filter:a', filter_chain,
+                '-f', 'mp3', 'pipe:1']
     
     @staticmethod
     def _calculate_tempo_factors(stretch_factor: float) -> list:
@@ -190,29 +596,45 @@ class EdgeTTSGenerator:
     
     def __init__(self):
         self.parameter_formatter = AudioParameterFormatter()
-    
-    def generate_audio(self, config: GenerationConfig, temp_path: str) -> bool:
-        """生成音频文件"""
+        self.segmenter = TextSegmenter()
+
+    def generate_audio(self, config: GenerationConfig, temp_path: str,
+                       plan: Optional[StretchPlan] = None) -> bool:
+        """生成音频文件 - 按句分段并发合成
+
+        给出拉伸方案时用方案里的语速代替config.speed，需要FFmpeg时经管道边合成边拉伸。
+        """
         try:
-            #预处理文本和参数
-            text = self.parameter_formatter.preprocess_text(config.content)
-            rate = self.parameter_formatter.format_speed(config.speed)
+            #预处理参数并分段
+            segments = [self.parameter_formatter.preprocess_text(segment)
+                        for segment in self.segmenter.split(config.content)]
+            rate = self.parameter_formatter.format_speed(config.speed if plan is None else plan.rate)
             pitch = self.parameter_formatter.format_pitch(config.pitch)
             volume = self.parameter_formatter.format_volume(config.volume)
-            
+            max_concurrency = getattr(config, 'max_concurrency', ChunkedSynthesizer.DEFAULT_MAX_CONCURRENCY)
+
             print(f"开始生成音频... 参数: 语速={rate}, 音调={pitch}, 音量={volume}")
+            print(f"分段数={len(segments)}, 并发数={max_concurrency}")
             print(f"音频拉伸设置: 启用={config.stretch_enabled}, 拉伸因子={config.stretch_factor}")
-            
-            #生成音频
-            communicate = edge_tts.Communicate(
-                text=text, 
-                voice=config.voice + "Neural", 
-                rate=rate, 
-                pitch=pitch, 
-                volume=volume
-            )
-            
-            communicate.save_sync(temp_path)
+
+            if not segments:
+                raise Exception("没有可朗读的文本")
+
+            #生成音频，已缓存的片段不再请求服务；合成在常驻的服务循环里进行
+            cache = SegmentCache.shared()
+            service = TTSService.shared()
+            synthesizer = ChunkedSynthesizer(max_concurrency, cache=cache, connector=service.connector)
+            voice = config.voice + "Neural"
+            try:
+                if plan is not None and plan.needs_ffmpeg:
+                    self._synthesize_stretched(service, synthesizer, segments, voice,
+                                               rate, pitch, volume, temp_path, plan)
+                else:
+                    service.run(synthesizer.synthesize_to_file(
+                        segments, voice, rate, pitch, volume, temp_path
+                    ))
+            finally:
+                cache.flush()
             print("音频生成成功")
             return True
             
@@ -221,6 +643,26 @@ class EdgeTTSGenerator:
             traceback.print_exc()
             return False
 
+    def _synthesize_stretched(self, service: TTSService, synthesizer: ChunkedSynthesizer,
+                              segments: List[str], voice: str, rate: str, pitch: str,
+                              volume: str, output_path: str, plan: StretchPlan) -> None:
+        """合成并通过FFmpeg管道拉伸；FFmpeg不可用或失败时输出未拉伸的音频
+
+        回退时片段都已在缓存里，重新拼接不会再请求服务。
+        """
+        try:
+            with AudioStretcher.open_stretch_pipe(output_path, plan.ffmpeg_factor) as pipe:
+                service.run(synthesizer.synthesize_to_stream(
+                    segments, voice, rate, pitch, volume, pipe
+                ))
+            print("音频拉伸成功")
+        except StretchPipeError as e:
+            print(f"音频拉伸失败，使用原始音频: {e}")
+            plan.ffmpeg_failed = True
+            service.run(synthesizer.synthesize_to_file(
+                segments, voice, rate, pitch, volume, output_path
+            ))
+
 
 class AudioGenerator:
     """音频生成器，负责数值合规性检测和音频生成"""
@@ -229,6 +671,7 @@ class AudioGenerator:
         self.validator = InputValidator()
         self.file_manager = FilePathManager()
         self.stretcher = AudioStretcher()
+        self.planner = StretchPlanner()
         self.tts_generator = EdgeTTSGenerator()
         
     def generate_audio(self, config: GenerationConfig, callback: Optional[Callable] = None) -> bool:
@@ -242,9 +685,12 @@ class AudioGenerator:
             return False
         
         try:
-            self._prepare_and_generate_audio(config)
+            plan = self._prepare_and_generate_audio(config)
             if callback:
-                callback(True, "生成成功")
+                message = "生成成功"
+                if plan.path != StretchPlanner.NONE:
+                    message += f"（{plan.describe()}）"
+                callback(True, message)
             return True
         except Exception as e:
             error_msg = f"生成音频时发生错误: {str(e)}"
@@ -269,47 +715,16 @@ class AudioGenerator:
             program_dir = os.path.dirname(os.path.abspath(__file__))
             temp_path = os.path.join(program_dir, temp_filename)
             
-            #预处理文本
-            text = AudioParameterFormatter.preprocess_text(config.content)
-            rate = AudioParameterFormatter.format_speed(config.speed)
-            pitch = AudioParameterFormatter.format_pitch(config.pitch)
-            volume = AudioParameterFormatter.format_volume(config.volume)
-            
             print("开始生成预览音频...")
             print(f"音频拉伸设置: 启用={config.stretch_enabled}, 拉伸因子={config.stretch_factor}")
             
-            #生成预览
-            communicate = edge_tts.Communicate(
-                text=text, 
-                voice=config.voice + "Neural", 
-                rate=rate, 
-                pitch=pitch, 
-                volume=volume
-            )
-            
-            communicate.save_sync(temp_path)
+            plan = self._plan_stretch(config)
+
+            #生成预览（与最终生成共用分段合成、片段缓存和管道拉伸）
+            if not self.tts_generator.generate_audio(config, temp_path, plan):
+                raise Exception("Edge-TTS生成预览音频失败")
             print(f"预览音频已生成: {temp_path}")
             
-            #应用音频拉伸
-            if (hasattr(config, 'stretch_enabled') and config.stretch_enabled and 
-                hasattr(config, 'stretch_factor') and config.stretch_factor != 1.0):
-                print(f"应用音频拉伸到预览音频: 拉伸因子={config.stretch_factor}")
-                stretched_path = self.stretcher.apply_audio_stretch(temp_path, config.stretch_factor)
-                
-                #拉伸成功
-                if stretched_path != temp_path and os.path.exists(stretched_path):
-                    # 删除原始文件
-                    try:
-                        os.unlink(temp_path)
-                    except:
-                        pass
-                    temp_path = stretched_path
-                    print(f"使用拉伸后的预览音频: {temp_path}")
-                else:
-                    print("音频拉伸失败或未生成新文件，使用原始音频")
-            else:
-                print("音频拉伸未启用或拉伸因子为1.0，跳过拉伸")
-            
             print("预览音频处理完成")
             
             success_callback(temp_path)
@@ -319,8 +734,78 @@ class AudioGenerator:
             traceback.print_exc()
             error_callback(str(e))
 
-    def _prepare_and_generate_audio(self, config: GenerationConfig):
-        """准备并生成音频"""
+    def generate_streaming_preview(self, config: GenerationConfig,
+                                   started_callback: Callable,
+                                   progress_callback: Callable,
+                                   success_callback: Callable,
+                                   error_callback: Callable):
+        """流式生成预览音频 - 首批音频到达即回调started_callback开始播放
+
+        拉伸无法完全折算进语速时需要完整文件才能交给FFmpeg，退回generate_preview。
+        """
+        plan = self._plan_stretch(config)
+        if plan.needs_ffmpeg:
+            print("预览需要FFmpeg拉伸，使用非流式预览")
+            self.generate_preview(config, success_callback, error_callback)
+            return
+
+        try:
+            success, message = self.validator.validate_preview_inputs(config)
+            if not success:
+                error_callback(message)
+                return
+
+            #临时文件名
+            temp_filename = self.file_manager.generate_preview_filename()
+            program_dir = os.path.dirname(os.path.abspath(__file__))
+            temp_path = os.path.join(program_dir, temp_filename)
+
+            segments = [AudioParameterFormatter.preprocess_text(segment)
+                        for segment in TextSegmenter.split(config.content)]
+            if not segments:
+                error_callback("没有可朗读的文本")
+                return
+            rate = AudioParameterFormatter.format_speed(plan.rate)
+            pitch = AudioParameterFormatter.format_pitch(config.pitch)
+            volume = AudioParameterFormatter.format_volume(config.volume)
+            max_concurrency = getattr(config, 'max_concurrency', ChunkedSynthesizer.DEFAULT_MAX_CONCURRENCY)
+
+            print(f"开始流式生成预览音频... 分段数={len(segments)}")
+
+            cache = SegmentCache.shared()
+            service = TTSService.shared()
+            streamer = StreamingPreviewSynthesizer(
+                ChunkedSynthesizer(max_concurrency, cache=cache, connector=service.connector)
+            )
+            try:
+                service.run(streamer.stream_to_file(
+                    segments, config.voice + "Neural", rate, pitch, volume, temp_path,
+                    started_callback, progress_callback
+                ))
+            finally:
+                cache.flush()
+
+            print(f"预览音频已生成: {temp_path}")
+            success_callback(temp_path)
+
+        except Exception as e:
+            print(f"生成预览音频时发生错误: {e}")
+            traceback.print_exc()
+            error_callback(str(e))
+
+    def _plan_stretch(self, config: GenerationConfig) -> StretchPlan:
+        """根据语速和拉伸设置选择拉伸路径"""
+        plan = self.planner.plan(
+            config.speed,
+            getattr(config, 'stretch_factor', 1.0),
+            getattr(config, 'stretch_enabled', False)
+        )
+        if plan.path != StretchPlanner.NONE:
+            print(f"拉伸方案: {plan.path}，{plan.describe()}")
+        return plan
+
+    def _prepare_and_generate_audio(self, config: GenerationConfig) -> StretchPlan:
+        """准备并生成音频，返回实际采用的拉伸方案"""
         print(f"音色: {config.voice}")
         print(f"参数: 语速={config.speed}, 音调={config.pitch}, "
               f"音量={config.volume}, 语音={config.voice}, "
@@ -330,38 +815,25 @@ class AudioGenerator:
         self.file_manager.ensure_save_directory_exists(config.save_path)
         
         
-        temp_path = self.file_manager.create_temp_file()
+        # 临时文件建在保存目录下，完成后原地改名
+        temp_path = self.file_manager.create_temp_file(
+            directory=os.path.dirname(os.path.abspath(config.save_path))
+        )
+        plan = self._plan_stretch(config)
         
-        #生成音频
-        if not self.tts_generator.generate_audio(config, temp_path):
+        #生成音频，需要拉伸时经FFmpeg管道边合成边拉伸
+        if not self.tts_generator.generate_audio(config, temp_path, plan):
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
             raise Exception("Edge-TTS生成音频失败")
         
-        # 应用音频拉伸
-        final_path = temp_path
-        if (hasattr(config, 'stretch_enabled') and config.stretch_enabled and 
-            hasattr(config, 'stretch_factor') and config.stretch_factor != 1.0):
-            print(f"应用音频拉伸到最终音频: 拉伸因子={config.stretch_factor}")
-            stretched_path = self.stretcher.apply_audio_stretch(temp_path, config.stretch_factor)
-            
-            # 拉伸成功
-            if stretched_path != temp_path and os.path.exists(stretched_path):
-                # 删除临时文件
-                try:
-                    os.unlink(temp_path)
-                except:
-                    pass
-                final_path = stretched_path
-                print(f"使用拉伸后的最终音频: {final_path}")
-            else:
-                print("音频拉伸失败或未生成新文件，使用原始音频")
-        else:
-            print("音频拉伸未启用或拉伸因子为1.0，跳过拉伸")
-        
         # 重命名
-        if final_path != config.save_path:
-            shutil.move(final_path, config.save_path)
+        os.replace(temp_path, config.save_path)
         
         print(f"音频已生成并保存到: {config.save_path}")
+        return plan
 
     def _handle_generation_error(self, error: Exception):
         """处理生成错误"""
@@ -1,11 +1,12 @@
-import threading
 from typing import Dict, List, Callable, Any
-from PyQt5.QtWidgets import (QWidget, QPushButton, QSlider, QTextEdit, QCheckBox, QComboBox, QLabel)
-from PyQt5.QtCore import Qt, pyqtSignal, QObject, pyqtSlot
-from PyQt5.QtGui import QFont
+from PyQt5.QtWidgets import (QWidget, QPushButton, QSlider, QCheckBox, QComboBox, QLabel)
+from PyQt5.QtCore import Qt, pyqtSignal, QObject, pyqtSlot, QTimer
+from PyQt5.QtGui import QFont, QTextDocument
 
-from misc_func import AudioConfig, VoiceConfig, ContentHasher, AudioFileManager, InputValidator
+from misc_func import AudioConfig, VoiceConfig, ContentHasher, AudioFileManager, InputValidator, BlockDigestIndex
 from iw_text_import import show_text_import_dialog
+from large_text_edit import LargeTextEdit
+from tts_service import TTSService
 
 '''
 本段代码在SimeonTest Re1时使用 DeepSeek 重构，
@@ -22,6 +23,8 @@ class GenerationSignals(QObject):
     generation_complete = pyqtSignal(bool, str)
     preview_generated = pyqtSignal(str)
     preview_error = pyqtSignal(str)
+    preview_stream_started = pyqtSignal(str)
+    preview_stream_progress = pyqtSignal(float, float)
     update_button_state = pyqtSignal(bool, str)
 
 
@@ -200,6 +203,80 @@ class VoiceSelection:
         """
 
 
+class TextChangeTracker(QObject):
+    """文本改动跟踪器
+
+    监听QTextDocument.contentsChange给出的改动位置，只重算受影响文本块的摘要；
+    输入停顿DEBOUNCE_MS毫秒后才发出content_settled，由接收方复制全文、校验输入和判断预览是否失效。
+    这样每次按键的开销只和改动的段落有关，与文档长度无关。
+    """
+
+    DEBOUNCE_MS = 300
+
+    content_settled = pyqtSignal()
+
+    def __init__(self, document: QTextDocument, parent=None):
+        super().__init__(parent)
+        self.document = document
+        self.index = BlockDigestIndex()
+        self._pending = False
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.DEBOUNCE_MS)
+        self._timer.timeout.connect(self.flush)
+
+        self.document.contentsChange.connect(self._on_contents_change)
+        self.rebuild()
+
+    def rebuild(self):
+        """重新计算所有文本块的摘要"""
+        self.index.reset(self._block_texts(self.document.firstBlock(), self.document.lastBlock()))
+
+    def digest(self) -> str:
+        return self.index.digest()
+
+    def flush(self) -> bool:
+        """立即结算尚未发出的改动，有改动时返回True"""
+        self._timer.stop()
+        if not self._pending:
+            return False
+        self._pending = False
+        self.content_settled.emit()
+        return True
+
+    def _on_contents_change(self, position: int, removed: int, added: int):
+        new_count = self.document.blockCount()
+        first = self.document.findBlock(position)
+        last = self.document.findBlock(position + added)
+        if not last.isValid():
+            last = self.document.lastBlock()
+
+        if first.isValid():
+            start = first.blockNumber()
+            end = last.blockNumber()
+            # 改动之后的块编号不变，改动范围内旧块数 = 新块数 - 块数变化
+            old_end = end - (new_count - len(self.index))
+            if start <= old_end + 1 and old_end < len(self.index):
+                self.index.replace(start, old_end - start + 1, self._block_texts(first, last))
+            else:
+                self.rebuild()
+        else:
+            self.rebuild()
+
+        self._pending = True
+        self._timer.start()
+
+    @staticmethod
+    def _block_texts(first, last):
+        block = first
+        while block.isValid():
+            yield block.text()
+            if block == last:
+                break
+            block = block.next()
+
+
 class TextEditSection:
     """文本编辑区域类"""
     
@@ -207,14 +284,19 @@ class TextEditSection:
         self.parent = parent
         self.text_edit = None
         self.overlay_button = None
+        self.change_tracker = None
+        # 已经把完整文本取进config时的内容版本，还有未加载的块时用来判断是否需要重新取
+        self._resolved_version = None
         
         self._create_controls()
     
     def _create_controls(self):
         """创建文本编辑控件"""
-        self.text_edit = QTextEdit(self.parent)
-        self.text_edit.textChanged.connect(self._update_content)
-        self.text_edit.setStyleSheet("QTextEdit { background-color: white; color: black; border: 3px solid gray; border-radius: 10px; }")
+        self.text_edit = LargeTextEdit(self.parent)
+        # 按键只记录改动位置，停顿后再统一更新内容和按钮状态
+        self.change_tracker = TextChangeTracker(self.text_edit.document(), self.text_edit)
+        self.change_tracker.content_settled.connect(self._update_content)
+        self.text_edit.setStyleSheet("QPlainTextEdit { background-color: white; color: black; border: 3px solid gray; border-radius: 10px; }")
         
         # 文本框文字固定为16点字号
         text_edit_font = QFont("微软雅黑", 9)
@@ -228,7 +310,16 @@ class TextEditSection:
     def _update_content(self):
         """更新文本内容"""
         if hasattr(self.parent, 'config'):
-            self.parent.config.content = self.text_edit.toPlainText()
+            if self.text_edit.is_fully_loaded():
+                content = self.text_edit.toPlainText()
+                self.parent.config.content = content
+                self.parent.config.content_digest = (content, self.change_tracker.digest())
+            elif self.text_edit.content_version() != self._resolved_version:
+                # 还有未加载的块时不读剩余部分，先用已加载的部分判断内容是否改变，
+                # 预览和生成前再由flush_pending()取完整文本
+                self.parent.config.content = self.text_edit.toPlainText()
+                self.parent.config.content_digest = None
+            # 否则只是懒加载了更多的块，config里已经是完整文本
         if hasattr(self.parent, '_check_inputs_and_update_button'):
             self.parent._check_inputs_and_update_button()
         if hasattr(self.parent, '_check_content_changed'):
@@ -243,23 +334,33 @@ class TextEditSection:
             window_rect = main_window.geometry()
             
             # 获取当前文本框的内容
-            current_text = self.text_edit.toPlainText()
+            current_text = self.text_edit.full_text()
             
             # 调用文本导入对话框，传入当前文本内容
             imported_text = show_text_import_dialog(self.parent, window_rect, current_text)
             
             # 如果用户确认了导入，更新文本框内容
             if imported_text is not None:  # 明确检查是否为None
-                self.text_edit.setPlainText(imported_text)
-                self._update_content()  # 触发内容更新
+                self.set_text(imported_text)
+    
+    def flush_pending(self):
+        """立即应用尚在防抖等待中的改动，并把完整文本取进config，预览和生成前调用"""
+        self.change_tracker.flush()
+        if (hasattr(self.parent, 'config') and not self.text_edit.is_fully_loaded()
+                and self.text_edit.content_version() != self._resolved_version):
+            content = self.text_edit.full_text()
+            self.parent.config.content = content
+            self.parent.config.content_digest = (content, BlockDigestIndex.digest_text(content))
+            self._resolved_version = self.text_edit.content_version()
     
     def set_text(self, text: str):
         """设置文本内容"""
-        self.text_edit.setPlainText(text)
+        self.text_edit.set_large_text(text)
+        self.flush_pending()
     
     def get_text(self) -> str:
         """获取文本内容"""
-        return self.text_edit.toPlainText()
+        return self.text_edit.full_text()
 
 
 class PreviewControl:
@@ -382,17 +483,24 @@ class PreviewControl:
     
     def update_preview_button_state(self, has_preview: bool, content_unchanged: bool):
         """更新预览按钮状态"""
-        if has_preview and content_unchanged:
+        if self._is_preview_generating():
+            self.preview_button.setText("生成中...")
+        elif has_preview and content_unchanged:
             self.preview_button.setText("播放预览")
         else:
             self.preview_button.setText("生成预览")
     
     def set_playback_controls_enabled(self, playing: bool):
         """设置播放控制按钮状态"""
-        self.preview_button.setEnabled(not playing)
+        self.preview_button.setEnabled(not playing and not self._is_preview_generating())
         self.pause_button.setEnabled(playing)
         self.stop_button.setEnabled(playing)
     
+    def _is_preview_generating(self) -> bool:
+        """预览是否还在合成（停止播放后合成仍在继续，预览按钮要等合成结束才能再用）"""
+        return (hasattr(self.parent, 'parent_window') and
+                self.parent.parent_window.audio_preview.state.is_generating)
+    
     def update_pause_button_text(self, paused: bool):
         """更新暂停按钮文本"""
         self.pause_button.setText("继续" if paused else "暂停")
@@ -575,6 +683,8 @@ class GenerationPage(QWidget):
         self.signals.generation_complete.connect(self._on_generation_complete_safe)
         self.signals.preview_generated.connect(self._on_preview_generated_safe)
         self.signals.preview_error.connect(self._handle_preview_error_safe)
+        self.signals.preview_stream_started.connect(self._on_preview_stream_started_safe)
+        self.signals.preview_stream_progress.connect(self._on_preview_stream_progress_safe)
         self.signals.update_button_state.connect(self._update_button_state_safe)
         
     def resizeEvent(self, event):
@@ -782,6 +892,7 @@ class GenerationPage(QWidget):
     def _generate_preview_audio(self):
         """生成预览音频"""
         print("开始生成预览音频")
+        self.text_edit_section.flush_pending()
         
         # 修复问题①：如果文本框没有文本，使用默认文本
         if not self.config.content.strip():
@@ -795,14 +906,40 @@ class GenerationPage(QWidget):
         if not self._validate_preview_inputs():
             return
             
+        self.parent_window.audio_preview.begin_stream_generation()
         self.preview_control.preview_button.setEnabled(False)
         self.preview_control.preview_button.setText("生成中...")
         
-        threading.Thread(
-            target=self.parent_window.audio_generator.generate_preview,
-            args=(self.config, self._on_preview_generated_thread, self._handle_preview_error_thread),
-            daemon=True
-        ).start()
+        TTSService.shared().submit_call(
+            self.parent_window.audio_generator.generate_streaming_preview,
+            self.config, self._on_preview_stream_started_thread,
+            self._on_preview_stream_progress_thread,
+            self._on_preview_generated_thread, self._handle_preview_error_thread
+        )
+
+    def _on_preview_stream_started_thread(self, file_path: str):
+        """流式预览首批音频到达 - 线程版本"""
+        self.signals.preview_stream_started.emit(file_path)
+
+    @pyqtSlot(str)
+    def _on_preview_stream_started_safe(self, file_path: str):
+        """流式预览首批音频到达 - 线程安全版本，立即开始播放"""
+        if self.parent_window.audio_preview.state.stream_stopped:
+            return
+        self.parent_window.audio_preview.play_streaming_preview(file_path)
+
+    def _on_preview_stream_progress_thread(self, buffered_seconds: float, arrived_fraction: float):
+        """流式预览缓冲进度 - 线程版本"""
+        self.signals.preview_stream_progress.emit(buffered_seconds, arrived_fraction)
+
+    @pyqtSlot(float, float)
+    def _on_preview_stream_progress_safe(self, buffered_seconds: float, arrived_fraction: float):
+        """流式预览缓冲进度 - 线程安全版本"""
+        if self.parent_window.audio_preview.state.stream_stopped:
+            return
+        self.parent_window.audio_preview.update_stream_buffer(buffered_seconds, arrived_fraction)
+        if arrived_fraction < 1.0:
+            self.preview_control.preview_button.setText(f"缓冲中 {int(arrived_fraction * 100)}%")
 
     def _on_preview_generated_thread(self, file_path: str):
         """预览音频生成完成处理 - 线程版本"""
@@ -811,7 +948,10 @@ class GenerationPage(QWidget):
     @pyqtSlot(str)
     def _on_preview_generated_safe(self, file_path: str):
         """预览音频生成完成处理 - 线程安全版本"""
-        self.preview_control.preview_button.setEnabled(True)
+        self.parent_window.audio_preview.end_stream_generation()
+        self.parent_window.audio_preview.finish_stream()
+        # 流式预览正在播放时，预览按钮保持禁用
+        self.preview_control.preview_button.setEnabled(not self.parent_window.audio_preview.state.is_playing)
         self.preview_control.update_preview_button_state(True, True)
         
         cache_key = ContentHasher.get_cache_key(self.config)
@@ -834,7 +974,9 @@ class GenerationPage(QWidget):
     def _handle_preview_error_safe(self, error: str):
         """处理预览错误 - 线程安全版本"""
         print(f"生成预览音频时发生错误: {error}")
-        self.preview_control.preview_button.setEnabled(True)
+        self.parent_window.audio_preview.end_stream_generation()
+        self.parent_window.audio_preview.finish_stream()
+        self.preview_control.preview_button.setEnabled(not self.parent_window.audio_preview.state.is_playing)
         self.preview_control.update_preview_button_state(False, False)
         self.parent_window.has_preview = False
         
@@ -845,6 +987,7 @@ class GenerationPage(QWidget):
     def _generate_audio(self):
         """生成音频文件 - 异步版本"""
         print("开始生成音频")
+        self.text_edit_section.flush_pending()
         
         if not self._validate_inputs():
             return
@@ -859,11 +1002,10 @@ class GenerationPage(QWidget):
         self.generation_control.set_enabled(False)
         self.generation_control.set_button_state(False, "生成中...")
         
-        threading.Thread(
-            target=self.parent_window.audio_generator.generate_audio,
-            args=(self.config, self._on_generation_complete_thread),
-            daemon=True
-        ).start()
+        TTSService.shared().submit_call(
+            self.parent_window.audio_generator.generate_audio,
+            self.config, self._on_generation_complete_thread
+        )
 
     def _on_generation_complete_thread(self, success: bool, message: str):
         """音频生成完成回调 - 线程版本"""
@@ -932,6 +1074,7 @@ class GenerationPage(QWidget):
 
     def _is_content_unchanged(self) -> bool:
         """检查内容是否未改变"""
+        self.text_edit_section.flush_pending()
         current_hash = ContentHasher.get_content_hash(self.config)
         return (self.parent_window.last_content_hash is not None and 
                 current_hash == self.parent_window.last_content_hash)
@@ -0,0 +1,52 @@
+import threading
+from typing import Dict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HttpSessionPool:
+    """按主机复用的requests会话 - api.github.com、raw.githubusercontent.com、ghfast.top等各用一个
+
+    同一主机的请求共用连接池，目录刷新、分段下载、图片加载都不再各自新建连接，
+    TLS握手只在第一次请求时发生。会话本身线程安全地创建，可以在多个后台线程里同时使用。
+    """
+
+    POOL_MAXSIZE = 8  # 每个主机保留的空闲连接数，要不小于分段下载的并发连接数
+    USER_AGENT = "YuanYue-TTS"
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "HttpSessionPool":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def session_for(self, url: str) -> requests.Session:
+        """返回url所在主机的会话，没有时创建"""
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}".lower()
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_maxsize=self.POOL_MAXSIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['User-Agent'] = self.USER_AGENT
+                self._sessions[host] = session
+            return session
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
@@ -0,0 +1,209 @@
+import os
+import re
+import codecs
+from typing import Callable, Iterator, List, Optional
+
+from docxfix import DocxStreamReader
+
+
+SUPPORTED_EXTENSIONS = ('.txt', '.docx')
+
+
+class TextEncodingDetector:
+    """文本编码探测器 - 只看文件开头一段有限长度的样本
+
+    判断顺序：BOM → 无BOM的UTF-16（大量0字节）→ UTF-8能否完整解码 →
+    无BOM的纯中文UTF-16（几乎没有0字节，按能否解码和汉字比例判断）→ GB18030/Big5启发式。
+    GB18030兼容GBK和GB2312，中文Windows上保存的txt基本都能覆盖。
+    """
+
+    SAMPLE_BYTES = 64 * 1024
+    DEFAULT_ENCODING = 'gb18030'
+    # 导入缓存键带上这个版本，修改探测规则时加一，按旧规则解码错的缓存就不会再命中
+    VERSION = 2
+
+    # 按顺序匹配，UTF-32的BOM以UTF-16的BOM开头，必须先判断
+    BOMS = (
+        (codecs.BOM_UTF32_LE, 'utf-32'),
+        (codecs.BOM_UTF32_BE, 'utf-32'),
+        (codecs.BOM_UTF8, 'utf-8-sig'),
+        (codecs.BOM_UTF16_LE, 'utf-16'),
+        (codecs.BOM_UTF16_BE, 'utf-16'),
+    )
+
+    # 中文候选编码，样本里的非ASCII字符要有这么大比例是常用汉字或中文标点才算通过
+    CJK_CANDIDATES = ('gb18030', 'big5')
+    MIN_CJK_RATIO = 0.6
+
+    @classmethod
+    def detect_file(cls, file_path: str) -> str:
+        with open(file_path, 'rb') as file:
+            return cls.detect(file.read(cls.SAMPLE_BYTES))
+
+    @classmethod
+    def detect(cls, sample: bytes) -> str:
+        """根据样本返回Python编解码器名称"""
+        for bom, encoding in cls.BOMS:
+            if sample.startswith(bom):
+                return encoding
+
+        utf16 = cls._guess_utf16_without_bom(sample)
+        if utf16:
+            return utf16
+
+        if cls._decodes(sample, 'utf-8') is not None:
+            return 'utf-8'
+
+        # 纯中文的UTF-16没有ASCII字符留下的0字节，GB18030也常能解码（得到一半ASCII的乱码），
+        # 所以先按UTF-16解码看汉字比例；要放在UTF-8之后，纯ASCII按UTF-16解码也像汉字
+        for encoding in ('utf-16-le', 'utf-16-be'):
+            text = cls._decodes(sample, encoding)
+            if text is not None and cls._cjk_ratio(text, include_ascii=True) >= cls.MIN_CJK_RATIO:
+                return encoding
+
+        for encoding in cls.CJK_CANDIDATES:
+            text = cls._decodes(sample, encoding)
+            if text is not None and cls._cjk_ratio(text) >= cls.MIN_CJK_RATIO:
+                return encoding
+        return cls.DEFAULT_ENCODING
+
+    @staticmethod
+    def _decodes(sample: bytes, encoding: str) -> Optional[str]:
+        """样本能否按该编码解码；样本末尾被截断的多字节字符不算错误"""
+        try:
+            return codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        except UnicodeDecodeError:
+            return None
+
+    @classmethod
+    def _guess_utf16_without_bom(cls, sample: bytes) -> Optional[str]:
+        # 正常文本里几乎没有0字节；UTF-16里的ASCII字符（标点、换行、数字）会留下0字节。
+        # 但U+4E00"一"这类低字节为0的汉字也会在另一侧留下0字节，纯中文时比例不低，
+        # 所以0字节只用来判断是不是UTF-16，字节序按两种解码结果哪个更像正常文本来定
+        if len(sample) < 4:
+            return None
+        half = len(sample) // 2
+        if max(sample[0::2].count(0), sample[1::2].count(0)) <= half * 0.05:
+            return None
+        best, best_ratio = None, 0.0
+        for encoding in ('utf-16-le', 'utf-16-be'):
+            text = cls._decodes(sample, encoding)
+            ratio = cls._readable_ratio(text) if text is not None else 0.0
+            if ratio > best_ratio:
+                best, best_ratio = encoding, ratio
+        return best if best_ratio >= cls.MIN_CJK_RATIO else None
+
+    @staticmethod
+    def _readable_ratio(text: str) -> float:
+        """非空白字符里ASCII可见字符、常用汉字和中文标点的比例"""
+        counted = 0
+        readable = 0
+        for char in text:
+            if char.isspace():
+                continue
+            counted += 1
+            code = ord(char)
+            if (0x20 < code < 0x7F or 0x4E00 <= code <= 0x9FFF or 0x3000 <= code <= 0x303F
+                    or 0xFF00 <= code <= 0xFFEF):
+                readable += 1
+        return readable / counted if counted else 0.0
+
+    @staticmethod
+    def _cjk_ratio(text: str, include_ascii: bool = False) -> float:
+        """常用汉字和中文标点的比例；默认只在非ASCII字符里算，include_ascii时在所有非空白字符里算"""
+        counted = 0
+        cjk = 0
+        for char in text:
+            code = ord(char)
+            if code < 0x80 and (not include_ascii or char.isspace()):
+                continue
+            counted += 1
+            if (0x4E00 <= code <= 0x9FFF or 0x3000 <= code <= 0x303F
+                    or 0xFF00 <= code <= 0xFFEF):
+                cjk += 1
+        if not counted:
+            return 0.0 if include_ascii else 1.0
+        return cjk / counted
+
+
+class ChunkedTextReader:
+    """分块读取txt - 先探测编码，再用增量解码器逐块解码
+
+    内存占用只和块大小有关；换行统一为\\n（与文本模式open的行为一致）。
+    探测只看开头的样本，后面个别无法解码的字节替换为U+FFFD，不让整个导入失败。
+    """
+
+    CHUNK_BYTES = 256 * 1024
+
+    @classmethod
+    def iter_chunks(cls, file_path: str, encoding: Optional[str] = None,
+                    progress: Optional[Callable[[int, int], None]] = None,
+                    chunk_bytes: int = CHUNK_BYTES) -> Iterator[str]:
+        """
+        逐块产出解码后的文本
+
+        Args:
+            file_path: 文件路径
+            encoding: 指定编码，为None时自动探测
+            progress: 进度回调，参数为(已读取字节数, 文件总字节数)
+            chunk_bytes: 每次读取的字节数
+        """
+        total = os.path.getsize(file_path)
+        with open(file_path, 'rb') as file:
+            if encoding is None:
+                encoding = TextEncodingDetector.detect(file.read(TextEncodingDetector.SAMPLE_BYTES))
+                file.seek(0)
+            decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+
+            # 块末尾的\r要等下一块，才知道是不是\r\n
+            carry = ''
+            while True:
+                data = file.read(chunk_bytes)
+                if not data:
+                    break
+                text = carry + decoder.decode(data)
+                carry = ''
+                if text.endswith('\r'):
+                    carry = '\r'
+                    text = text[:-1]
+                if progress is not None:
+                    progress(file.tell(), total)
+                if text:
+                    yield cls._normalize_newlines(text)
+
+            text = carry + decoder.decode(b'', final=True)
+            if text:
+                yield cls._normalize_newlines(text)
+        if progress is not None:
+            progress(total, total)
+
+    @classmethod
+    def read_text(cls, file_path: str, encoding: Optional[str] = None) -> str:
+        """读取整个文件"""
+        return ''.join(cls.iter_chunks(file_path, encoding))
+
+    @staticmethod
+    def _normalize_newlines(text: str) -> str:
+        return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def extract_file_text(file_path: str) -> str:
+    """提取单个txt/docx文件的全部文本 - 模块级函数，可以交给进程池执行"""
+    if file_path.lower().endswith('.docx'):
+        return DocxStreamReader.read_text(file_path)
+    return ChunkedTextReader.read_text(file_path)
+
+
+def natural_sort_key(name: str):
+    """按自然顺序排序，"讲义2"排在"讲义10"前面"""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', name)]
+
+
+def collect_import_files(folder: str) -> List[str]:
+    """列出文件夹里（不含子文件夹）可导入的txt/docx文件，按文件名自然顺序排列"""
+    files = [
+        os.path.join(folder, name) for name in os.listdir(folder)
+        if name.lower().endswith(SUPPORTED_EXTENSIONS) and not name.startswith('~$')
+        and os.path.isfile(os.path.join(folder, name))
+    ]
+    return sorted(files, key=lambda path: natural_sort_key(os.path.basename(path)))
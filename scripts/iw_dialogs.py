@@ -6,7 +6,7 @@ from PyQt5.QtWidgets import (
     QApplication, QWidget, QPushButton, QTextEdit, QFileDialog, 
     QMessageBox, QVBoxLayout, QHBoxLayout, QDialog, QLabel, 
     QInputDialog, QComboBox, QLineEdit, QFormLayout, QTreeWidget, 
-    QTreeWidgetItem, QCheckBox
+    QTreeWidgetItem, QCheckBox, QProgressBar
 )
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer, QRect
 from PyQt5.QtGui import QPainter, QColor, QPen, QFont
@@ -71,6 +71,24 @@ class DialogStyleManager:
             QLabel {font-family: "微软雅黑"; font-size: 16px; color: #333333;}
         """
     
+    @staticmethod
+    def get_import_progress_dialog_style() -> str:
+        """获取导入进度对话框样式"""
+        return """
+            QDialog {background-color: #D2D4D3;}
+            QLabel {font-family: "微软雅黑"; font-size: 14px; color: #333333;}
+            QPushButton {
+                font-family: "微软雅黑"; background-color: white; color: black;
+                border: 2px solid gray; border-radius: 5px; font-weight: bold; padding: 5px;
+            }
+            QPushButton:hover {background-color: #f0f0f0;}
+            QProgressBar {
+                border: 2px solid gray; border-radius: 5px; background-color: white;
+                text-align: center; font-family: "微软雅黑";
+            }
+            QProgressBar::chunk {background-color: rgb(139, 196, 234);}
+        """
+    
     @staticmethod
     def get_page_offset_dialog_style() -> str:
         """获取页码偏移对话框样式"""
@@ -164,6 +182,89 @@ class LoadingDialog(QDialog):
         self.timer.stop()
 
 
+class ImportProgressDialog(QDialog):
+    """导入进度对话框 - 显示已读取（或已下载）的数据量，可以取消"""
+    
+    cancel_requested = pyqtSignal()
+    
+    def __init__(self, parent: Optional[QWidget] = None, file_name: str = "",
+                 action: str = "导入"):
+        super().__init__(parent)
+        self.file_name = file_name
+        self.action = action
+        self._init_ui()
+        
+    def _init_ui(self) -> None:
+        """初始化UI"""
+        self.setWindowTitle(f"{self.action}中...")
+        self.setFixedSize(360, 160)
+        self.setModal(True)
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowCloseButtonHint)
+        self.setStyleSheet(DialogStyleManager.get_import_progress_dialog_style())
+        
+        layout = QVBoxLayout()
+        self.text_label = QLabel(f"正在{self.action} {self.file_name}")
+        self.text_label.setAlignment(Qt.AlignCenter)
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setRange(0, 0)  # 拿到总量之前显示忙碌状态
+        self.cancel_button = QPushButton("取消", self)
+        self.cancel_button.clicked.connect(self._on_cancel_clicked)
+        
+        layout.addWidget(self.text_label)
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.cancel_button, 0, Qt.AlignCenter)
+        self.setLayout(layout)
+    
+    def update_progress(self, done: int, total: int) -> None:
+        """更新进度，单位为字节"""
+        if total > 0:
+            self.progress_bar.setRange(0, 1000)
+            self.progress_bar.setValue(int(min(done, total) * 1000 / total))
+            self.text_label.setText(
+                f"正在{self.action} {self.file_name}\n{done / 1048576:.1f} / {total / 1048576:.1f} MB"
+            )
+    
+    def update_count(self, done: int, total: int) -> None:
+        """更新进度，单位为文件数"""
+        if total > 0:
+            self.progress_bar.setRange(0, total)
+            self.progress_bar.setValue(min(done, total))
+            self.text_label.setText(f"正在{self.action} {self.file_name}\n{done} / {total} 个文件")
+    
+    def update_transfer(self, done: int, total: int, speed: float, eta: float) -> None:
+        """更新下载进度，附带速度和剩余时间；总量未知时进度条保持忙碌状态"""
+        if total > 0:
+            self.progress_bar.setRange(0, 1000)
+            self.progress_bar.setValue(int(min(done, total) * 1000 / total))
+        self.text_label.setText(f"正在{self.action} {self.file_name}\n{self._format_transfer(done, total, speed, eta)}")
+    
+    @staticmethod
+    def _format_transfer(done: int, total: int, speed: float, eta: float) -> str:
+        """格式化为"12.3 / 45.6 MB  1.2 MB/s  剩余 28 秒"这样的文字"""
+        text = f"{done / 1048576:.1f} / {total / 1048576:.1f} MB" if total > 0 else f"{done / 1048576:.1f} MB"
+        if speed > 0:
+            text += f"  {speed / 1048576:.1f} MB/s"
+        if eta >= 0:
+            minutes, seconds = divmod(int(eta + 0.5), 60)
+            text += f"  剩余 {minutes} 分 {seconds} 秒" if minutes else f"  剩余 {seconds} 秒"
+        return text
+    
+    def finish(self) -> None:
+        """导入结束（完成、失败或已取消）后关闭对话框"""
+        self.done(QDialog.Accepted)
+    
+    def _on_cancel_clicked(self) -> None:
+        """取消按钮点击处理"""
+        self.cancel_button.setEnabled(False)
+        self.text_label.setText("正在取消...")
+        self.cancel_requested.emit()
+    
+    def reject(self) -> None:
+        """Esc键同样视为取消，对话框由导入结束时关闭"""
+        if self.cancel_button.isEnabled():
+            self._on_cancel_clicked()
+
+
 class PageOffsetDialog(QDialog):
     """页码偏移量询问对话框"""
     
@@ -371,6 +472,12 @@ class DialogFactory:
         """创建加载对话框"""
         return LoadingDialog(parent)
     
+    @staticmethod
+    def create_import_progress_dialog(parent: Optional[QWidget] = None,
+                                      file_name: str = "", action: str = "导入") -> ImportProgressDialog:
+        """创建导入进度对话框"""
+        return ImportProgressDialog(parent, file_name, action)
+    
     @staticmethod
     def create_page_offset_dialog(parent: Optional[QWidget] = None, 
                                  pdf_name: str = "", user_page: str = "", 
@@ -0,0 +1,217 @@
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from docxfix import DocxStreamReader
+from import_sources import ChunkedTextReader, TextEncodingDetector, extract_file_text
+from disk_cache import ImportCache
+
+
+class FileImportWorker(QThread):
+    """文件导入线程 - 在后台读取并解析txt/docx，按块发出文本
+
+    chunk_signal发出的各块依次拼接就是完整文本；progress_signal的单位是字节
+    （txt为文件字节，docx为document.xml解压后的字节）。
+    cancel()后在下一块之前停止，并发出cancelled_signal而不是finished_signal。
+    解析结果存进ImportCache，同一个文件再次导入时直接从缓存发出。
+    """
+
+    chunk_signal = pyqtSignal(str)
+    progress_signal = pyqtSignal(int, int)  # 已处理字节, 总字节
+    finished_signal = pyqtSignal()
+    error_signal = pyqtSignal(str)
+    cancelled_signal = pyqtSignal()
+
+    CHUNK_CHARS = 64 * 1024
+    # 超过这个长度的结果不缓存，免得为了缓存把整篇文本留在内存里
+    CACHE_MAX_CHARS = 16 * 1024 * 1024
+
+    def __init__(self, file_path: str, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self._cancelled = False
+
+    def cancel(self) -> None:
+        self._cancelled = True
+
+    def run(self):
+        pieces = None
+        try:
+            cache = ImportCache.shared()
+            cache_key = self.cache_key(cache, self.file_path)
+            cached = cache.get_text(cache_key)
+            if cached is not None:
+                print(f"导入缓存命中: {self.file_path}")
+                size = os.path.getsize(self.file_path)
+                self.progress_signal.emit(size, size)
+                pieces = self._split(cached)
+                collected: Optional[List[str]] = None
+            else:
+                pieces = self._iter_pieces()
+                collected = []
+                collected_chars = 0
+
+            buffer: List[str] = []
+            buffered = 0
+            for piece in pieces:
+                if self._cancelled:
+                    self.cancelled_signal.emit()
+                    return
+                buffer.append(piece)
+                buffered += len(piece)
+                if collected is not None:
+                    collected.append(piece)
+                    collected_chars += len(piece)
+                    if collected_chars > self.CACHE_MAX_CHARS:
+                        collected = None
+                if buffered >= self.CHUNK_CHARS:
+                    self.chunk_signal.emit(''.join(buffer))
+                    buffer.clear()
+                    buffered = 0
+            if self._cancelled:
+                self.cancelled_signal.emit()
+                return
+            if buffer:
+                self.chunk_signal.emit(''.join(buffer))
+            if collected is not None:
+                cache.put_text(cache_key, ''.join(collected))
+                cache.flush()
+            self.finished_signal.emit()
+        except Exception as e:
+            self.error_signal.emit(str(e))
+        finally:
+            if pieces is not None:
+                pieces.close()
+
+    @staticmethod
+    def kind_of(file_path: str) -> str:
+        """缓存里区分解析方式用的类型名"""
+        return 'docx' if file_path.lower().endswith('.docx') else 'txt'
+
+    @classmethod
+    def cache_key(cls, cache: ImportCache, file_path: str) -> str:
+        """导入缓存键，txt的键带上编码探测规则的版本"""
+        kind = cls.kind_of(file_path)
+        if kind == 'txt':
+            return cache.key_for_file(file_path, kind, detector=TextEncodingDetector.VERSION)
+        return cache.key_for_file(file_path, kind)
+
+    def _kind(self) -> str:
+        return self.kind_of(self.file_path)
+
+    def _iter_pieces(self) -> Iterator[str]:
+        if self._kind() == 'docx':
+            return self._iter_docx()
+        return self._iter_txt()
+
+    def _split(self, text: str) -> Iterator[str]:
+        for start in range(0, len(text), self.CHUNK_CHARS):
+            yield text[start:start + self.CHUNK_CHARS]
+
+    def _iter_docx(self) -> Iterator[str]:
+        separator = ''
+        for paragraph in DocxStreamReader.iter_paragraphs(self.file_path, self.progress_signal.emit):
+            yield separator + paragraph
+            separator = '\n'
+
+    def _iter_txt(self) -> Iterator[str]:
+        # 编码自动探测，GBK/GB18030的txt也能正确导入
+        return ChunkedTextReader.iter_chunks(self.file_path, progress=self.progress_signal.emit)
+
+
+class BatchImportWorker(QThread):
+    """多文件导入线程 - 用进程池并行解析txt/docx，按选择的顺序合并
+
+    缓存命中的文件直接取结果，其余文件交给进程池，解析速度随CPU核数增加。
+    某个文件解析完成、且它之前的文件都已发出时，就立即发出它的文本，
+    所以编辑框里的内容始终是按顺序拼接的。progress_signal的单位是文件数；
+    解析失败的文件跳过，记录在failures里。
+    """
+
+    chunk_signal = pyqtSignal(str)
+    progress_signal = pyqtSignal(int, int)  # 已完成文件数, 文件总数
+    finished_signal = pyqtSignal()
+    error_signal = pyqtSignal(str)
+    cancelled_signal = pyqtSignal()
+
+    SEPARATOR = "\n\n"
+    POLL_SECONDS = 0.2  # 等待结果时检查取消的间隔
+
+    def __init__(self, file_paths: List[str], max_workers: Optional[int] = None, parent=None):
+        super().__init__(parent)
+        self.file_paths = list(file_paths)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.failures: List[Tuple[str, str]] = []
+        self._cancelled = False
+        self._results: Dict[int, Tuple[bool, str]] = {}
+        self._next_index = 0
+        self._emitted_text = False
+
+    def cancel(self) -> None:
+        self._cancelled = True
+
+    def run(self):
+        try:
+            cache = ImportCache.shared()
+            keys: Dict[int, str] = {}
+            misses = []
+            for index, path in enumerate(self.file_paths):
+                try:
+                    keys[index] = FileImportWorker.cache_key(cache, path)
+                except OSError as e:
+                    self._results[index] = (False, str(e))
+                    continue
+                cached = cache.get_text(keys[index])
+                if cached is not None:
+                    self._results[index] = (True, cached)
+                else:
+                    misses.append(index)
+            self._emit_ready()
+
+            if misses:
+                workers = min(self.max_workers, len(misses))
+                executor = ProcessPoolExecutor(max_workers=workers)
+                pending = {}
+                try:
+                    for index in misses:
+                        pending[executor.submit(extract_file_text, self.file_paths[index])] = index
+                    while pending and not self._cancelled:
+                        done, _ = wait(pending, timeout=self.POLL_SECONDS, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            index = pending.pop(future)
+                            try:
+                                text = future.result()
+                            except Exception as e:
+                                self._results[index] = (False, str(e))
+                                continue
+                            self._results[index] = (True, text)
+                            if len(text) <= FileImportWorker.CACHE_MAX_CHARS:
+                                cache.put_text(keys[index], text)
+                        self._emit_ready()
+                finally:
+                    # 取消时不等正在解析的文件（大文件可能要很久），已经解析完的照样存进缓存
+                    executor.shutdown(wait=not pending, cancel_futures=True)
+                    cache.flush()
+
+            if self._cancelled:
+                self.cancelled_signal.emit()
+                return
+            self.finished_signal.emit()
+        except Exception as e:
+            self.error_signal.emit(str(e))
+
+    def _emit_ready(self) -> None:
+        """按顺序发出已经就绪的文件"""
+        while self._next_index in self._results and not self._cancelled:
+            success, text = self._results.pop(self._next_index)
+            path = self.file_paths[self._next_index]
+            if not success:
+                self.failures.append((path, text))
+            elif text:
+                self.chunk_signal.emit(self.SEPARATOR + text if self._emitted_text else text)
+                self._emitted_text = True
+            self._next_index += 1
+            self.progress_signal.emit(self._next_index, len(self.file_paths))
+
@@ -1,13 +1,11 @@
 import sys
 import os
-import re
 import time
 import datetime
 import base64
 import io
 import json
 import tempfile
-import requests
 from multiprocessing import Process, Queue, Event
 
 from PyQt5.QtWidgets import (QApplication, QWidget, QPushButton, QTextEdit, QFileDialog, 
@@ -18,7 +16,6 @@ from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer, QRect
 from PyQt5.QtGui import QPainter, QColor, QPen, QFont
 
 from PIL import Image, ImageDraw, ImageFont
-import certifi
 import fitz  # PyMuPDF
 PYTMUPDF_AVAILABLE = True #沟槽的我VS沟槽的之前的我 lol
 
@@ -28,7 +25,12 @@ try:
 except ImportError:
     SETTINGS_AVAILABLE = False
 
-from iw_dialogs import LoadingDialog, PageOffsetDialog
+from iw_dialogs import LoadingDialog, PageOffsetDialog, ImportProgressDialog
+from network_service import NetworkService
+from textbook_catalog import TextbookCatalog
+from pdf_library import PdfLibrary
+from pdf_text_layer import PdfTextLayer
+from disk_cache import ImportCache
 
 #AI线程
 class AIOCRWorker(QThread):
@@ -36,14 +38,39 @@ class AIOCRWorker(QThread):
     error_signal = pyqtSignal(str)
     debug_signal = pyqtSignal(str, str)  #类型, 内容
     
-    def __init__(self, api_key, image_path, prompt):
+    MODEL = "glm-4v-flash"
+    
+    def __init__(self, api_key, image_path, prompt, cache_key=None, source_pdf=None, page_number=None):
         super().__init__()
         self.api_key = api_key
         self.image_path = image_path
         self.prompt = prompt
+        self.cache_key = cache_key  #不传时按来源PDF的页或图片内容+提示词+模型生成
+        self.source_pdf = source_pdf
+        self.page_number = page_number
+    
+    @classmethod
+    def page_cache_key(cls, fingerprint, page_number, prompt):
+        """PDF某一页识别结果的缓存键，fingerprint是PDF内容的指纹"""
+        return ImportCache.make_key('pdf_page_ocr', fingerprint, page=page_number, prompt=prompt, model=cls.MODEL)
     
     def run(self):
         try:
+            #识别过的图片直接用缓存结果，不再调用收费接口
+            cache = ImportCache.shared()
+            cache_key = self.cache_key
+            if not cache_key and self.source_pdf and self.page_number is not None:
+                #整本PDF的指纹可能要读完整个文件，放在后台线程里算
+                cache_key = self.page_cache_key(cache.fingerprint(self.source_pdf), self.page_number, self.prompt)
+            if not cache_key:
+                cache_key = cache.key_for_file(self.image_path, 'image_ocr', prompt=self.prompt, model=self.MODEL)
+            cached = cache.get_text(cache_key)
+            if cached is not None:
+                self.debug_signal.emit("prompt", self.prompt)
+                self.debug_signal.emit("response", cached)
+                self.finished_signal.emit(cached)
+                return
+            
             from openai import OpenAI
             
             client = OpenAI(
@@ -61,7 +88,7 @@ class AIOCRWorker(QThread):
             self.debug_signal.emit("prompt", self.prompt)
             
             response = client.chat.completions.create(
-                model="glm-4v-flash",
+                model=self.MODEL,
                 messages=[
                     {
                         "role": "user",
@@ -74,6 +101,9 @@ class AIOCRWorker(QThread):
                 max_tokens=1000
             )
             result = response.choices[0].message.content
+            if result:
+                cache.put_text(cache_key, result)
+                cache.flush()
             self.debug_signal.emit("response", result)
             self.finished_signal.emit(result)
             
@@ -81,19 +111,25 @@ class AIOCRWorker(QThread):
             self.error_signal.emit(f"ChatGLM识别失败: {str(e)}")
 #在线导入对话框
 class OnlineImportDialog(QDialog):
+    DEFAULT_EXTRACT_TYPE = "所有文字"
+    
     def __init__(self, parent=None, window_size=None):
         super().__init__(parent)
         self.window_size = window_size
         self.selected_pdf_url = None
         self.selected_pdf_name = None
-        self.settings_manager = SettingsManager() if SETTINGS_AVAILABLE else None
+        self.settings_manager = SettingsManager.shared() if SETTINGS_AVAILABLE else None
         self.current_path = ""  #当前浏览的路径
         self.path_history = []  #路径历史记录，用于返回上一级
         self.debug_prompt = ""  #存储调试信息
         self.debug_response = ""  #也存储调试信息
         self.parent_window = parent
+        self.catalog = TextbookCatalog.shared()
+        self.library = PdfLibrary.shared()
         self.init_ui()
         self.load_root_directory()
+        if not self.catalog.is_empty() and self.catalog.is_stale():
+            self._refresh_catalog()
 
     def init_ui(self):
         self.setWindowTitle("从教科书中导入 - 选择一本教科书并指定内容：")
@@ -241,17 +277,16 @@ class OnlineImportDialog(QDialog):
         self.load_directory_contents("")
 
     def load_directory_contents(self, path):
-        """加载指定路径的目录内容"""
-        self.status_label.setText("正在加载目录内容...")
+        """从本地教材目录快照加载指定路径的内容"""
         self.tree_widget.clear()
+        if self.catalog.is_empty():
+            #第一次使用，先在后台下载整个目录
+            self.status_label.setText("正在下载教材目录（只需下载一次）...")
+            self._refresh_catalog()
+            return
         
         try:
-            # 目录查询始终使用GitHub官方API
-            url = f"https://api.github.com/repos/TapXWorld/ChinaTextbook/contents/{path}"
-            
-            response = requests.get(url, verify=certifi.where(), timeout=15)
-            response.raise_for_status()
-            contents = response.json()
+            contents = self.catalog.list_dir(path)
             
             #添加目录项
             for item in contents:
@@ -285,14 +320,9 @@ class OnlineImportDialog(QDialog):
             self.status_label.setText(f"加载失败: {str(e)}")
             QMessageBox.critical(self, "错误", f"无法加载目录内容: {str(e)}")
 
-    def _get_download_url(self, original_url):
-        """根据加速选项获取下载URL"""
-        github_acceleration = self.settings_manager.get_github_acceleration() if self.settings_manager else 0
-        
-        if github_acceleration == 1:  # ghfast镜像
-            return f"https://ghfast.top/{original_url}"
-        else:  # 默认直接从GitHub获取
-            return original_url
+    def _get_github_acceleration(self):
+        """GitHub下载加速设置，0为直接获取，1为ghfast，2为自动选择"""
+        return self.settings_manager.get_github_acceleration() if self.settings_manager else 0
 
     def format_file_size(self, size_bytes):
         """格式化文件大小"""
@@ -338,8 +368,32 @@ class OnlineImportDialog(QDialog):
                 self.back_button.setEnabled(False)
 
     def refresh_current_directory(self):
-        """刷新当前目录"""
-        self.load_directory_contents(self.current_path)
+        """检查教材目录有没有更新，有更新时重新加载当前目录"""
+        self.status_label.setText("正在检查目录更新...")
+        self._refresh_catalog(force=True)
+
+    def _refresh_catalog(self, force=False):
+        """在后台同步教材目录"""
+        catalog = self.catalog
+        #两个对话框共用同一次刷新，已经在刷新时不重复请求
+        reply = NetworkService.shared().submit(lambda _: catalog.refresh(force), key="catalog_refresh")
+        reply.finished_signal.connect(self._on_catalog_refreshed)
+        reply.error_signal.connect(self._on_catalog_refresh_error)
+
+    def _on_catalog_refreshed(self, changed):
+        """目录同步完成"""
+        if changed or not self.tree_widget.topLevelItemCount():
+            self.load_directory_contents(self.current_path)
+        else:
+            self.status_label.setText("目录已是最新")
+
+    def _on_catalog_refresh_error(self, error_message):
+        """目录同步失败，已有本地目录时继续使用"""
+        if self.catalog.is_empty():
+            self.status_label.setText(f"加载失败: {error_message}")
+            QMessageBox.critical(self, "错误", f"无法加载目录内容: {error_message}")
+        else:
+            self.status_label.setText(f"检查更新失败，显示的是本地保存的目录: {error_message}")
 
     def process_selection(self):
         """处理选择的文件"""
@@ -357,7 +411,7 @@ class OnlineImportDialog(QDialog):
         # 获取提取内容
         extract_type = self.extract_input.text().strip()
         if not extract_type:
-            extract_type = "所有文字"
+            extract_type = self.DEFAULT_EXTRACT_TYPE
         
         # 使用AI OCR处理
         self.process_with_ai_ocr(page_number, extract_type)
@@ -384,57 +438,73 @@ class OnlineImportDialog(QDialog):
             QMessageBox.critical(self, "错误", f"处理失败: {str(e)}")
 
     def _check_local_pdf(self, pdf_name):
-        """检查本地是否有同名PDF"""
+        """检查本地教材库里是否有同名PDF"""
         try:
-            downloads_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "downloaded_pdfs")
-            if not os.path.exists(downloads_dir):
-                return None
-            safe_name = re.sub(r'[^\w\-_.]', '_', pdf_name)
-            
-            #查找PDF文件
-            for filename in os.listdir(downloads_dir):
-                local_safe_name = re.sub(r'[^\w\-_.]', '_', filename)
-                if filename.endswith('.pdf') and safe_name == local_safe_name:
-                    return os.path.join(downloads_dir, filename)
-            
-            return None
+            return self.library.find(pdf_name)
         except Exception as e:
             print(f"检查本地PDF失败: {e}")
             return None
 
     def _download_pdf_and_process(self, user_page, extract_type, loading_dialog):
-        """下载PDF并处理"""
+        """在后台下载PDF，完成后询问页码并处理"""
         try:
             #获取下载URL
             pdf_url = self._get_pdf_download_url(self.selected_file_info)
             
-            # 根据GitHub下载加速设置构建最终下载URL
-            final_download_url = self._get_download_url(pdf_url)
-            
-            response = requests.get(final_download_url, stream=True, verify=certifi.where(), timeout=30)
-            response.raise_for_status()
-            
-            pdf_data = b""
-            for chunk in response.iter_content(chunk_size=8192):
-                pdf_data += chunk
-                QApplication.processEvents()
-            
-            #保存PDF文件
             pdf_name = self.selected_file_info.get('name', 'unknown.pdf')
-            saved_pdf_path = self._save_pdf_to_directory(pdf_data, pdf_name)
-            
-            loading_dialog.close()
-            
-            if saved_pdf_path:
-                self.status_label.setText(f"PDF已保存到: {saved_pdf_path}")
-                #询问实际页码
-                self.ask_for_page_offset(saved_pdf_path, user_page, extract_type)
-            else:
-                QMessageBox.critical(self, "错误", "PDF文件保存失败")
-                
+            save_path = self.library.path_for(pdf_name)
         except Exception as e:
             loading_dialog.close()
             QMessageBox.critical(self, "错误", f"下载失败: {str(e)}")
+            return
+        loading_dialog.close()
+        
+        if os.path.exists(save_path):
+            self.status_label.setText(f"PDF已保存到: {save_path}")
+            self.ask_for_page_offset(save_path, user_page, extract_type)
+            return
+        
+        #边下载边写入.part文件，中断后从断点继续，完成并校验后才出现在downloaded_pdfs里
+        progress_dialog = ImportProgressDialog(self, pdf_name, action="下载")
+        #根据GitHub下载加速设置选择线路，自动选择时会测速并在失败时切换线路
+        self.download_reply = NetworkService.shared().download(
+            pdf_url, save_path,
+            self.selected_file_info.get('size'), self.selected_file_info.get('sha'),
+            acceleration=self._get_github_acceleration()
+        )
+        self.download_reply.progress_signal.connect(progress_dialog.update_transfer)
+        self.download_reply.finished_signal.connect(
+            lambda path: self._on_pdf_downloaded(path, user_page, extract_type, progress_dialog)
+        )
+        self.download_reply.error_signal.connect(
+            lambda error: self._on_pdf_download_failed(f"下载失败: {error}", progress_dialog)
+        )
+        self.download_reply.cancelled_signal.connect(
+            lambda: self._on_pdf_download_failed("", progress_dialog)
+        )
+        progress_dialog.cancel_requested.connect(self.download_reply.cancel)
+        progress_dialog.show()
+
+    def _on_pdf_downloaded(self, pdf_path, user_page, extract_type, progress_dialog):
+        """PDF下载完成"""
+        progress_dialog.finish()
+        self.status_label.setText(f"PDF已保存到: {pdf_path}")
+        #登记到教材库，超出配额时清理最久没用的书
+        try:
+            self.library.add(pdf_path, self.selected_file_info.get('sha'), self.selected_file_info.get('path', ''))
+        except Exception as e:
+            print(f"登记教材失败: {e}")
+        #询问实际页码
+        self.ask_for_page_offset(pdf_path, user_page, extract_type)
+
+    def _on_pdf_download_failed(self, error_message, progress_dialog):
+        """PDF下载失败或已取消，error_message为空表示取消"""
+        progress_dialog.finish()
+        if error_message:
+            self.status_label.setText(error_message)
+            QMessageBox.critical(self, "错误", error_message)
+        else:
+            self.status_label.setText("下载已取消，下次下载同一本书时会从断点继续")
 
     def ask_for_page_offset(self, pdf_path, user_page, extract_type):
         """询问用户页码偏移量"""
@@ -449,23 +519,25 @@ class OnlineImportDialog(QDialog):
             self.process_single_page(pdf_path, actual_page - 1, extract_type)
 
     def _save_page_offset(self, pdf_name, offset):
-        """保存页码偏移量到设置文件"""
+        """保存页码偏移量到教材库"""
         try:
-            if self.settings_manager:
-                setting_name = f"pdfOffset_{pdf_name}"
-                self.settings_manager.set_offset_value(setting_name, str(offset))
+            self.library.set_page_offset(pdf_name, offset)
         except Exception as e:
             print(f"保存页码偏移量失败: {e}")
 
     def _get_page_offset(self, pdf_name):
-        """从设置文件获取页码偏移量"""
+        """从教材库获取页码偏移量（可以为负）
+
+        库里没有时读取settings.ini里旧版本保存的pdfOffset_键，并迁移到库里
+        """
         try:
-            if self.settings_manager:
-                setting_name = f"pdfOffset_{pdf_name}"
-                offset_str = self.settings_manager.get_offset_value(setting_name, "")
-                if offset_str and offset_str.isdigit():
-                    return int(offset_str)
-            return None
+            offset = self.library.get_page_offset(pdf_name)
+            if offset is None and self.settings_manager:
+                offset_str = self.settings_manager.get_offset_value(f"pdfOffset_{pdf_name}", "")
+                if offset_str and offset_str.strip().lstrip('-').isdigit():
+                    offset = int(offset_str)
+                    self.library.set_page_offset(pdf_name, offset)
+            return offset
         except Exception as e:
             print(f"获取页码偏移量失败: {e}")
             return None
@@ -473,8 +545,14 @@ class OnlineImportDialog(QDialog):
     def process_pdf_with_offset(self, pdf_path, user_page, extract_type):
         """使用偏移量处理PDF"""
         pdf_name = os.path.basename(pdf_path)
-        offset = self._get_page_offset(pdf_name)
+        #PDF自带页码标签时每次都按标签找书上印的页码；标签不一定是线性的
+        #（罗马数字的前言、各章重新编号），不能换算成固定的偏移量保存
+        page_index = self.library.page_index_for_label(pdf_name, str(user_page))
+        if page_index is not None:
+            self.process_single_page(pdf_path, page_index, extract_type)
+            return
         
+        offset = self._get_page_offset(pdf_name)
         if offset is not None:
             #有偏移量，直接算页码
             actual_page = user_page + offset
@@ -498,6 +576,27 @@ class OnlineImportDialog(QDialog):
 
     def process_single_page(self, pdf_path, page_number, extract_type):
         """处理单页PDF"""
+        #提取整页文字时先读PDF自带的文字层，质量合格就不用AI识别；只提取部分内容（如注释）仍交给AI挑选
+        if extract_type == self.DEFAULT_EXTRACT_TYPE:
+            text = PdfTextLayer.extract_usable(pdf_path, page_number)
+            if text:
+                self.result_text = text
+                self.accept()
+                return
+        
+        #同一本书同一页、同样的提取内容识别过就直接用缓存。教材库里记着下载时校验过的blob SHA，
+        #直接用它当指纹；没有记录时由识别线程计算整本PDF的指纹，不在界面线程里读几百MB的文件
+        cache_key = None
+        sha = self.library.get_sha(os.path.basename(pdf_path))
+        if sha:
+            cache_key = AIOCRWorker.page_cache_key(f"git-blob:{sha}", page_number,
+                                                   self._build_ocr_prompt(extract_type))
+            cached = ImportCache.shared().get_text(cache_key)
+            if cached:
+                self.result_text = cached
+                self.accept()
+                return
+        
         loading_dialog = LoadingDialog(self)
         loading_dialog.text_label.setText(f"正在转换第{page_number+1}页为图片...")
         loading_dialog.show()
@@ -508,7 +607,7 @@ class OnlineImportDialog(QDialog):
             loading_dialog.close()
             
             if image_path:
-                self.process_image_with_ai(image_path, extract_type, pdf_path)
+                self.process_image_with_ai(image_path, extract_type, pdf_path, cache_key, page_number)
             else:
                 QMessageBox.critical(self, "错误", "PDF页面转换失败")
                 
@@ -562,33 +661,29 @@ class OnlineImportDialog(QDialog):
         except Exception as e:
             raise Exception(f"无法获取PDF下载URL: {str(e)}")
 
-    @staticmethod
-    def _save_pdf_to_directory(pdf_data, pdf_name):
-        """保存PDF文件到程序目录"""
-        try:
-            downloads_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "downloaded_pdfs")
-            if not os.path.exists(downloads_dir):
-                os.makedirs(downloads_dir)
-            safe_name = re.sub(r'[^\w\-_.]', '_', pdf_name)
-            filepath = os.path.join(downloads_dir, safe_name)
-            if os.path.exists(filepath):
-                return filepath
-            
-            with open(filepath, 'wb') as f:
-                f.write(pdf_data)
-            
-            return filepath
-        except Exception as e:
-            print(f"保存PDF失败: {str(e)}")
-            return ""
-
-    def process_image_with_ai(self, image_path, extract_type, pdf_path=""):
+    def process_image_with_ai(self, image_path, extract_type, pdf_path="", cache_key=None, page_number=None):
         """使用AI处理图像"""
         api_key = self.settings_manager.get_api_key("api_key_ChatGLM") if self.settings_manager else ""
         if not api_key:
             QMessageBox.warning(self, "API Key未设置", "请在设置界面中配置ChatGLM API Key")
             return
-        prompt = f"""
+        prompt = self._build_ocr_prompt(extract_type)
+        
+        loading_dialog = LoadingDialog(self)
+        loading_dialog.text_label.setText(f"AI正在识别图片中的{extract_type}...")
+        loading_dialog.show()
+        QApplication.processEvents()
+        
+        self.ai_worker = AIOCRWorker(api_key, image_path, prompt, cache_key,
+                                     source_pdf=pdf_path or None, page_number=page_number)
+        self.ai_worker.finished_signal.connect(lambda text: self.on_ai_finished(text, loading_dialog, image_path))
+        self.ai_worker.error_signal.connect(lambda err: self.on_ai_error(err, loading_dialog, image_path))
+        self.ai_worker.start()
+
+    @staticmethod
+    def _build_ocr_prompt(extract_type):
+        """生成识别教材页面的提示词"""
+        return f"""
 请仔细识别这张图片中的所有文字内容。
 要求：
 1. 准确识别所有文字，包括标题、正文、注释等
@@ -601,16 +696,6 @@ class OnlineImportDialog(QDialog):
     傅里叶正变换公式→"F 括号 ω 等于，从负无穷到正无穷的积分，被积函数是 f 括号 t 乘以 e 的负 jωt 次方，最后乘以 dt"
 7. 若不是中文，将所有的句号、逗号（或二者在其他语言中的等效物）转换为中文的"句号""逗号"二字
 请提取{extract_type}："""
-        
-        loading_dialog = LoadingDialog(self)
-        loading_dialog.text_label.setText(f"AI正在识别图片中的{extract_type}...")
-        loading_dialog.show()
-        QApplication.processEvents()
-        
-        self.ai_worker = AIOCRWorker(api_key, image_path, prompt)
-        self.ai_worker.finished_signal.connect(lambda text: self.on_ai_finished(text, loading_dialog, image_path))
-        self.ai_worker.error_signal.connect(lambda err: self.on_ai_error(err, loading_dialog, image_path))
-        self.ai_worker.start()
 
     def on_ai_finished(self, text, loading_dialog, image_path):
         """AI处理完成"""
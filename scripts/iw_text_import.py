@@ -1,15 +1,17 @@
 import sys
 import os
-from typing import Optional, Callable
+from typing import List, Optional, Callable
 from PyQt5.QtWidgets import (
-    QApplication, QWidget, QPushButton, QTextEdit, QFileDialog, 
+    QApplication, QWidget, QPushButton, QFileDialog, 
     QMessageBox, QVBoxLayout, QHBoxLayout, QDialog, QLabel
 )
 from PyQt5.QtCore import Qt, QRect
 
-from docxfix import Document
 from iw_dialogs import LoadingDialog, ClearConfirmationDialog, DialogFactory
+from iw_import_worker import FileImportWorker, BatchImportWorker
+from import_sources import collect_import_files
 from iw_online_import import OnlineImportDialog, AIOCRWorker
+from large_text_edit import LargeTextEdit
 try:
     from misc_func import SettingsManager
     SETTINGS_AVAILABLE = True
@@ -27,7 +29,7 @@ class TextImportConfig:
             border: 2px solid gray; border-radius: 5px; font-weight: bold; padding: 5px;
         }
         QPushButton:hover {background-color: #f0f0f0;}
-        QTextEdit {
+        QPlainTextEdit {
             background-color: white; color: black; border: 2px solid gray; 
             border-radius: 10px; font-family: "微软雅黑"; font-size: 14px;
         }
@@ -40,6 +42,8 @@ class TextImportConfig:
     BUTTON_TEXTS = {
         'txt': "从txt导入",
         'doc': "从docx导入", 
+        'batch': "多文件导入",
+        'folder': "文件夹导入",
         'online': "线上导入",
         'image': "从图片导入",
         'clear': "清空",
@@ -49,6 +53,7 @@ class TextImportConfig:
     SUPPORTED_IMAGE_FORMATS = "图片文件 (*.png *.jpg *.jpeg *.webp)"
     SUPPORTED_TEXT_FORMATS = "Text Files (*.txt)"
     SUPPORTED_DOC_FORMATS = "Word Documents (*.docx)"
+    SUPPORTED_BATCH_FORMATS = "文本和Word文档 (*.txt *.docx)"
 
 
 class TextImportManager:
@@ -57,38 +62,36 @@ class TextImportManager:
     def __init__(self, settings_manager: Optional[SettingsManager] = None):
         self.settings_manager = settings_manager
     
-    def import_from_txt(self, parent_dialog: QDialog) -> Optional[str]:
-        """从TXT文件导入文本"""
+    def choose_txt_file(self, parent_dialog: QDialog) -> Optional[str]:
+        """选择要导入的TXT文件，读取在后台线程进行"""
         file_path, _ = QFileDialog.getOpenFileName(
             parent_dialog, "选择文件", "", TextImportConfig.SUPPORTED_TEXT_FORMATS
         )
-        
-        if not file_path:
-            return None
-            
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read()
-        except Exception as e:
-            QMessageBox.critical(parent_dialog, "错误", f"读取失败: {str(e)}")
-            return None
+        return file_path or None
     
-    def import_from_docx(self, parent_dialog: QDialog) -> Optional[str]:
-        """从DOCX文件导入文本"""
+    def choose_docx_file(self, parent_dialog: QDialog) -> Optional[str]:
+        """选择要导入的DOCX文件，解析在后台线程进行"""
         file_path, _ = QFileDialog.getOpenFileName(
             parent_dialog, "选择文件", "", TextImportConfig.SUPPORTED_DOC_FORMATS
         )
-        
-        if not file_path:
-            return None
-            
-        try:
-            doc = Document(file_path)
-            content = '\n'.join([p.text for p in doc.paragraphs])
-            return content
-        except Exception as e:
-            QMessageBox.critical(parent_dialog, "错误", f"读取失败: {str(e)}")
-            return None
+        return file_path or None
+    
+    def choose_batch_files(self, parent_dialog: QDialog) -> List[str]:
+        """多选txt/docx文件，按选择对话框返回的顺序导入"""
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            parent_dialog, "选择文件（可多选）", "", TextImportConfig.SUPPORTED_BATCH_FORMATS
+        )
+        return file_paths
+    
+    def choose_import_folder(self, parent_dialog: QDialog) -> List[str]:
+        """选择文件夹，返回其中的txt/docx文件（按文件名自然顺序）"""
+        folder = QFileDialog.getExistingDirectory(parent_dialog, "选择文件夹")
+        if not folder:
+            return []
+        file_paths = collect_import_files(folder)
+        if not file_paths:
+            QMessageBox.warning(parent_dialog, "提示", "文件夹中没有txt或docx文件")
+        return file_paths
     
     def import_from_image(self, parent_dialog: QDialog) -> Optional[str]:
         """从图片导入文本"""
@@ -114,25 +117,28 @@ class TextImportManager:
 class TextEditController:
     """文本编辑控制器"""
     
-    def __init__(self, text_edit: QTextEdit):
+    def __init__(self, text_edit: LargeTextEdit):
         self.text_edit = text_edit
     
     def get_text(self) -> str:
         """获取文本内容"""
-        return self.text_edit.toPlainText()
+        return self.text_edit.full_text()
     
     def set_text(self, text: str) -> None:
         """设置文本内容"""
-        self.text_edit.setPlainText(text)
+        self.text_edit.set_large_text(text)
     
     def append_text(self, text: str, separator: str = "\n\n") -> None:
-        """追加文本内容"""
-        current_text = self.get_text()
-        if current_text:
-            new_text = current_text + separator + text
-        else:
-            new_text = text
-        self.set_text(new_text)
+        """追加文本内容 - 只在末尾插入新文本，不重建整个文档"""
+        self.text_edit.append_block(text, separator)
+    
+    def begin_stream(self) -> None:
+        """开始流式导入：清空当前内容，之后用append_chunk逐块追加"""
+        self.text_edit.clear()
+    
+    def append_chunk(self, text: str) -> None:
+        """流式追加一块文本，不加分隔符"""
+        self.text_edit.append_chunk(text)
     
     def clear_text(self) -> None:
         """清空文本内容"""
@@ -149,18 +155,99 @@ class ImportButtonHandler:
         self.import_manager = import_manager
         self.ai_worker = None
         self.loading_dialog = None
+        self.import_worker = None
+        self.progress_dialog = None
+        self._previous_text = ""
+        self._received_text = False
     
     def handle_txt_import(self) -> None:
         """处理TXT导入"""
-        content = self.import_manager.import_from_txt(self.parent_dialog)
-        if content:
-            self.text_controller.set_text(content)
+        file_path = self.import_manager.choose_txt_file(self.parent_dialog)
+        if file_path:
+            self._start_file_import(file_path)
     
     def handle_docx_import(self) -> None:
         """处理DOCX导入"""
-        content = self.import_manager.import_from_docx(self.parent_dialog)
-        if content:
-            self.text_controller.set_text(content)
+        file_path = self.import_manager.choose_docx_file(self.parent_dialog)
+        if file_path:
+            self._start_file_import(file_path)
+    
+    def handle_batch_import(self) -> None:
+        """处理多文件导入"""
+        file_paths = self.import_manager.choose_batch_files(self.parent_dialog)
+        if file_paths:
+            self._start_batch_import(file_paths)
+    
+    def handle_folder_import(self) -> None:
+        """处理文件夹导入"""
+        file_paths = self.import_manager.choose_import_folder(self.parent_dialog)
+        if file_paths:
+            self._start_batch_import(file_paths)
+    
+    def _start_file_import(self, file_path: str) -> None:
+        """在后台线程读取文件，文本逐块送进编辑框"""
+        if self.import_worker and self.import_worker.isRunning():
+            return
+        worker = FileImportWorker(file_path)
+        self._start_import(worker, os.path.basename(file_path))
+        worker.progress_signal.connect(self.progress_dialog.update_progress)
+        worker.start()
+    
+    def _start_batch_import(self, file_paths: List[str]) -> None:
+        """用进程池并行解析多个文件，按顺序合并进编辑框"""
+        if self.import_worker and self.import_worker.isRunning():
+            return
+        worker = BatchImportWorker(file_paths)
+        self._start_import(worker, f"{len(file_paths)} 个文件")
+        worker.progress_signal.connect(self.progress_dialog.update_count)
+        worker.start()
+    
+    def _start_import(self, worker, title: str) -> None:
+        """连接导入线程和进度对话框"""
+        # 取消、失败或没有读到文本时恢复原来的内容
+        self._previous_text = self.text_controller.get_text()
+        self._received_text = False
+        self.text_controller.begin_stream()
+        
+        self.import_worker = worker
+        self.progress_dialog = DialogFactory.create_import_progress_dialog(self.parent_dialog, title)
+        self.import_worker.chunk_signal.connect(self._on_import_chunk)
+        self.import_worker.finished_signal.connect(self._on_import_finished)
+        self.import_worker.cancelled_signal.connect(self._on_import_cancelled)
+        self.import_worker.error_signal.connect(self._on_import_error)
+        self.progress_dialog.cancel_requested.connect(self.import_worker.cancel)
+        self.progress_dialog.show()
+    
+    def _on_import_chunk(self, text: str) -> None:
+        """收到一块导入的文本"""
+        self._received_text = True
+        self.text_controller.append_chunk(text)
+    
+    def _on_import_finished(self) -> None:
+        """文件导入完成"""
+        self._end_file_import(restore=not self._received_text)
+        failures = getattr(self.import_worker, 'failures', [])
+        if failures:
+            details = "\n".join(f"{os.path.basename(path)}: {error}" for path, error in failures)
+            QMessageBox.warning(self.parent_dialog, "提示", f"以下文件导入失败:\n{details}")
+    
+    def _on_import_cancelled(self) -> None:
+        """文件导入已取消"""
+        self._end_file_import(restore=True)
+    
+    def _on_import_error(self, error: str) -> None:
+        """文件导入出错"""
+        self._end_file_import(restore=True)
+        QMessageBox.critical(self.parent_dialog, "错误", f"读取失败: {error}")
+    
+    def _end_file_import(self, restore: bool) -> None:
+        """关闭进度对话框，必要时恢复导入前的内容"""
+        if self.progress_dialog:
+            self.progress_dialog.finish()
+            self.progress_dialog = None
+        if restore:
+            self.text_controller.set_text(self._previous_text)
+        self._previous_text = ""
     
     def handle_online_import(self) -> None:
         """处理在线导入"""
@@ -216,6 +303,11 @@ class ImportButtonHandler:
         """清理资源"""
         if self.ai_worker and self.ai_worker.isRunning():
             self.ai_worker.terminate()
+        if self.import_worker and self.import_worker.isRunning():
+            self.import_worker.cancel()
+            self.import_worker.wait()
+        if self.progress_dialog:
+            self.progress_dialog.finish()
         if self.loading_dialog:
             self.loading_dialog.close()
 
@@ -232,7 +324,7 @@ class TextImportDialog(QDialog):
         self.initial_text = initial_text
         
         #初始化管理器
-        self.settings_manager = SettingsManager() if SETTINGS_AVAILABLE else None
+        self.settings_manager = SettingsManager.shared() if SETTINGS_AVAILABLE else None
         self.import_manager = TextImportManager(self.settings_manager)
         
         self._init_ui()
@@ -249,8 +341,8 @@ class TextImportDialog(QDialog):
         main_layout = QVBoxLayout()
         
         #创建文本编辑器
-        self.text_edit = QTextEdit(self)
-        self.text_edit.setPlainText(self.initial_text)
+        self.text_edit = LargeTextEdit(self)
+        self.text_edit.set_large_text(self.initial_text)
         main_layout.addWidget(self.text_edit)
         
         #创建按钮布局
@@ -266,6 +358,8 @@ class TextImportDialog(QDialog):
         
         self.txt_button = QPushButton(texts['txt'], self)
         self.doc_button = QPushButton(texts['doc'], self)
+        self.batch_button = QPushButton(texts['batch'], self)
+        self.folder_button = QPushButton(texts['folder'], self)
         self.online_button = QPushButton(texts['online'], self)
         self.image_button = QPushButton(texts['image'], self)
         self.clear_button = QPushButton(texts['clear'], self)
@@ -273,6 +367,8 @@ class TextImportDialog(QDialog):
         
         layout.addWidget(self.txt_button)
         layout.addWidget(self.doc_button)
+        layout.addWidget(self.batch_button)
+        layout.addWidget(self.folder_button)
         layout.addWidget(self.online_button)
         layout.addWidget(self.image_button)
         layout.addWidget(self.clear_button)
@@ -289,6 +385,8 @@ class TextImportDialog(QDialog):
         #连接按钮信号
         self.txt_button.clicked.connect(self.button_handler.handle_txt_import)
         self.doc_button.clicked.connect(self.button_handler.handle_docx_import)
+        self.batch_button.clicked.connect(self.button_handler.handle_batch_import)
+        self.folder_button.clicked.connect(self.button_handler.handle_folder_import)
         self.online_button.clicked.connect(self.button_handler.handle_online_import)
         self.image_button.clicked.connect(self.button_handler.handle_image_import)
         self.clear_button.clicked.connect(self.button_handler.handle_clear_text)
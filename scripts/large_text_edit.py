@@ -0,0 +1,221 @@
+from collections import deque
+from typing import Deque, Iterable, Iterator, Optional
+
+from PyQt5.QtWidgets import QPlainTextEdit
+from PyQt5.QtGui import QTextCursor, QKeySequence
+from PyQt5.QtCore import Qt, pyqtSignal
+
+from import_sources import ChunkedTextReader
+
+
+class LargeTextEdit(QPlainTextEdit):
+    """大文档编辑框 - 纯文本控件，适合整本教材这样的长文本
+
+    - 长文本按块懒加载：先显示第一块，滚动到接近末尾时再加载后面的块，
+      还没加载的部分只以字符串形式保存，不参与排版
+    - append_block()只在末尾插入新内容，开销与追加的长度成正比，不再重建整个文档
+    - append_chunk()供后台导入流式追加，视图填满后新到的块先排队，滚动时再加载
+    - full_text()返回包括未加载部分在内的完整文本，文件来源会因此全部读进内存，只在真正需要全文时调用
+    - content_version()在换内容或追加内容时改变，懒加载更多的块不改变它
+    - 用户第一次修改内容前先加载剩余的全部块，之后不再懒加载，撤销记录不会被加载清掉
+    """
+
+    CHUNK_CHARS = 64 * 1024
+    PREFETCH_PAGES = 2  # 距离末尾不足两屏时加载下一块
+    EDIT_KEYS = (Qt.Key_Backspace, Qt.Key_Delete, Qt.Key_Return, Qt.Key_Enter, Qt.Key_Tab)
+    EDIT_SHORTCUTS = (QKeySequence.Cut, QKeySequence.Paste, QKeySequence.Undo, QKeySequence.Redo,
+                      QKeySequence.DeleteStartOfWord, QKeySequence.DeleteEndOfWord,
+                      QKeySequence.DeleteEndOfLine, QKeySequence.DeleteCompleteLine)
+
+    fully_loaded = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # 待加载内容：先是已经到达的块，再是还没读取的来源
+        self._pending: Deque[str] = deque()
+        self._source: Optional[Iterator[str]] = None
+        self._loading = False
+        self._content_version = 0
+
+        scroll_bar = self.verticalScrollBar()
+        scroll_bar.valueChanged.connect(self._maybe_load_more)
+        scroll_bar.rangeChanged.connect(self._maybe_load_more)
+
+    # 内容读写
+    def is_fully_loaded(self) -> bool:
+        return not self._pending and self._source is None
+
+    def content_version(self) -> int:
+        return self._content_version
+
+    def set_large_text(self, text: str) -> None:
+        """设置文本内容，超过一块的部分滚动时再加载"""
+        self.load_chunks(self._split_text(text))
+
+    def load_file(self, file_path: str, encoding: Optional[str] = None) -> None:
+        """从文件按块加载文本，文件在全部加载完之前保持打开；不指定编码时自动探测"""
+        self.load_chunks(ChunkedTextReader.iter_chunks(file_path, encoding))
+
+    def load_chunks(self, chunks: Iterable[str]) -> None:
+        """用一系列文本块替换当前内容，立即显示第一块"""
+        self._discard_pending()
+        super().clear()
+        self._content_version += 1
+        self._source = iter(chunks)
+        self._load_next_chunk()
+        self._maybe_load_more()
+
+    def append_block(self, text: str, separator: str = "\n\n") -> None:
+        """在末尾追加一段文本，文档非空时先插入分隔符"""
+        self.load_all()
+        self._content_version += 1
+        if self.document().characterCount() > 1:
+            text = separator + text
+        self._insert_at_end(text)
+
+    def append_chunk(self, text: str) -> None:
+        """原样追加一块文本（不加分隔符）
+
+        视图还没填满时直接插入，否则排到待加载队列末尾，滚动到附近时再加载
+        """
+        if not text:
+            return
+        self._content_version += 1
+        if self.is_fully_loaded() and (self.document().isEmpty() or self._needs_more()):
+            self._insert_at_end(text, record_undo=False)
+            return
+        self._take_source()
+        self._pending.append(text)
+
+    def full_text(self) -> str:
+        """完整文本，包括尚未加载到控件里的部分"""
+        loaded = self.toPlainText()
+        if self.is_fully_loaded():
+            return loaded
+        self._take_source()
+        return loaded + "".join(self._pending)
+
+    def load_all(self) -> None:
+        """把剩余的块全部加载进控件"""
+        if self.is_fully_loaded():
+            return
+        self._take_source()
+        remainder = "".join(self._pending)
+        self._pending.clear()
+        if remainder:
+            self._insert_at_end(remainder, record_undo=False)
+        self.fully_loaded.emit()
+
+    def clear(self) -> None:
+        self._discard_pending()
+        super().clear()
+        self._content_version += 1
+
+    # 用户修改前加载全部内容
+    def keyPressEvent(self, event):
+        if self._is_edit_key(event):
+            self._load_all_before_edit()
+        super().keyPressEvent(event)
+
+    def inputMethodEvent(self, event):
+        if event.commitString() or event.preeditString():
+            self._load_all_before_edit()
+        super().inputMethodEvent(event)
+
+    def insertFromMimeData(self, source):
+        self._load_all_before_edit()
+        super().insertFromMimeData(source)
+
+    def contextMenuEvent(self, event):
+        # 右键菜单里的剪切、删除不经过按键事件
+        self._load_all_before_edit()
+        super().contextMenuEvent(event)
+
+    def _is_edit_key(self, event) -> bool:
+        if any(event.matches(shortcut) for shortcut in self.EDIT_SHORTCUTS):
+            return True
+        if event.modifiers() & (Qt.ControlModifier | Qt.AltModifier | Qt.MetaModifier):
+            return False
+        return event.key() in self.EDIT_KEYS or bool(event.text() and event.text().isprintable())
+
+    def _load_all_before_edit(self) -> None:
+        if not self.isReadOnly():
+            self.load_all()
+
+    # 懒加载
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._maybe_load_more()
+
+    def _needs_more(self) -> bool:
+        # 隐藏时滚动条没有意义，等显示出来再判断
+        if not self.isVisible():
+            return False
+        scroll_bar = self.verticalScrollBar()
+        page = max(scroll_bar.pageStep(), 1)
+        return scroll_bar.maximum() - scroll_bar.value() < page * self.PREFETCH_PAGES
+
+    def _maybe_load_more(self, *_):
+        if self.is_fully_loaded() or self._loading:
+            return
+        self._loading = True
+        try:
+            while not self.is_fully_loaded() and self._needs_more():
+                if not self._load_next_chunk():
+                    break
+        finally:
+            self._loading = False
+
+    def _load_next_chunk(self) -> bool:
+        chunk = None
+        if self._pending:
+            chunk = self._pending.popleft()
+        elif self._source is not None:
+            chunk = next(self._source, None)
+            if chunk is None:
+                self._source = None
+                self.fully_loaded.emit()
+        if chunk is None:
+            return False
+        self._insert_at_end(chunk, record_undo=False)
+        if self.is_fully_loaded():
+            self.fully_loaded.emit()
+        return True
+
+    def _insert_at_end(self, text: str, record_undo: bool = True) -> None:
+        """用独立光标在末尾插入，不移动用户的光标和滚动位置
+
+        record_undo为False时加载出来的内容不进撤销栈，否则撤销会把已加载的块删掉。
+        Qt只能靠关闭撤销来实现，而关闭撤销会清空撤销栈，所以只在还没有撤销记录时这样做；
+        用户修改前会先加载全部内容，懒加载不会走到有撤销记录的情况，
+        之后再流式追加的块作为一步撤销记录插入，不丢用户的修改记录。
+        """
+        document = self.document()
+        disable_undo = (not record_undo and document.isUndoRedoEnabled()
+                        and not document.isUndoAvailable() and not document.isRedoAvailable())
+        if disable_undo:
+            document.setUndoRedoEnabled(False)
+        try:
+            cursor = QTextCursor(document)
+            cursor.movePosition(QTextCursor.End)
+            cursor.insertText(text)
+        finally:
+            if disable_undo:
+                document.setUndoRedoEnabled(True)
+
+    def _take_source(self) -> None:
+        """把来源里剩下的块全部读进队列，文件来源也只读一遍"""
+        if self._source is not None:
+            self._pending.extend(self._source)
+            self._source = None
+
+    def _discard_pending(self) -> None:
+        if self._source is not None and hasattr(self._source, 'close'):
+            self._source.close()
+        self._source = None
+        self._pending.clear()
+
+    @classmethod
+    def _split_text(cls, text: str) -> Iterator[str]:
+        for start in range(0, len(text), cls.CHUNK_CHARS):
+            yield text[start:start + cls.CHUNK_CHARS]
@@ -1,6 +1,7 @@
 import sys
+import multiprocessing
 from PyQt5.QtWidgets import QApplication, QWidget, QPushButton, QStackedWidget
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QObject, pyqtSignal, pyqtSlot
 from PyQt5.QtGui import QFont
 
 from edge_audio_generator import AudioGenerator
@@ -9,6 +10,11 @@ from misc_func import AudioConfig, SettingsManager
 from notification import NotificationManager
 
 
+class SettingsSignals(QObject):
+    """设置变化信号 - 把SettingsManager的回调转成Qt信号，槽函数总在GUI线程执行"""
+    setting_changed = pyqtSignal(str, str, str)
+
+
 class FontManager:
     """字体管理器"""
     
@@ -196,7 +202,10 @@ class MainWindow(QWidget):
     def _init_core_components(self):
         """初始化核心组件"""
         self.config = AudioConfig()
-        self.settings_manager = SettingsManager()
+        self.settings_manager = SettingsManager.shared()
+        self.settings_signals = SettingsSignals()
+        self.settings_manager.add_listener(self.settings_signals.setting_changed.emit)
+        self.settings_signals.setting_changed.connect(self._on_setting_changed)
         self.audio_generator = AudioGenerator()
         self.audio_preview = AudioPreview(self)
         self.notification_manager = NotificationManager(self)
@@ -273,6 +282,15 @@ class MainWindow(QWidget):
         """加载设置"""
         self._load_stretch_setting()
         self._load_keyboard_scheme()
+    
+    @pyqtSlot(str, str, str)
+    def _on_setting_changed(self, section: str, key: str, value: str):
+        """设置变化时同步到运行中的配置，不用重新读文件"""
+        if key in ('stretch_factor', 'stretch_enabled'):
+            self._load_stretch_setting()
+        elif key == 'keyboard_scheme':
+            self._load_keyboard_scheme()
+    
     def _load_stretch_setting(self):
         """加载音频拉伸设置"""
         stretch_factor = self.settings_manager.get_stretch_factor()
@@ -323,4 +341,6 @@ def main():
 
 
 if __name__ == '__main__':
+    # 批量导入使用进程池，打包成exe后子进程需要这一步才能正常启动
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
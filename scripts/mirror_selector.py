@@ -0,0 +1,225 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+import requests
+import certifi
+
+from http_sessions import HttpSessionPool
+from pdf_download import SegmentedDownloader, DownloadCancelled, DownloadError, ProgressCallback
+
+
+class Mirror:
+    """一条下载线路：prefix为空表示直接访问GitHub，否则把原始地址拼在prefix后面（ghfast的用法）"""
+
+    def __init__(self, name: str, prefix: str = ""):
+        self.name = name
+        self.prefix = prefix
+
+    def url_for(self, original_url: str) -> str:
+        return f"{self.prefix}{original_url}" if self.prefix else original_url
+
+    def __repr__(self):
+        return f"Mirror({self.name!r})"
+
+
+class MirrorStats:
+    """一条线路的滚动统计 - 延迟和吞吐量都用指数加权平均，最近的测量权重大"""
+
+    EWMA_ALPHA = 0.3
+    FAILURE_COOLDOWN = 120.0  # 失败后暂停使用的秒数，连续失败时成倍增加
+
+    def __init__(self):
+        self.latency: Optional[float] = None  # 秒，收到响应头的时间
+        self.throughput: Optional[float] = None  # 字节/秒
+        self.failures = 0
+        self.last_failure = 0.0
+        self.updated = 0.0
+
+    def add_latency(self, seconds: float) -> None:
+        self.latency = self._ewma(self.latency, seconds)
+        self.updated = time.time()
+
+    def add_throughput(self, bytes_per_second: float) -> None:
+        self.throughput = self._ewma(self.throughput, bytes_per_second)
+        self.failures = 0
+        self.updated = time.time()
+
+    def add_failure(self) -> None:
+        self.failures += 1
+        self.last_failure = time.time()
+
+    def is_healthy(self) -> bool:
+        return not self.failures or time.time() - self.last_failure > self.FAILURE_COOLDOWN * self.failures
+
+    def expected_seconds(self, size: int) -> float:
+        """按当前统计估计下载size字节需要的时间，没有测量数据时返回无穷大"""
+        if not self.throughput:
+            return float('inf')
+        return (self.latency or 0.0) + size / self.throughput
+
+    def _ewma(self, current: Optional[float], sample: float) -> float:
+        if current is None:
+            return sample
+        return self.EWMA_ALPHA * sample + (1 - self.EWMA_ALPHA) * current
+
+
+class MirrorSelector:
+    """自动选择下载线路 - 按实测的延迟和吞吐量把下载交给最快的可用线路
+
+    - 统计过期或没有统计的线路，下载前用一个小的Range请求并发测速
+    - 每次下载结束后用实际速度更新统计，失败的线路暂停使用一段时间
+    - 下载中途当前线路失败时换下一条线路继续，.part文件和分段进度保留，
+      新线路从断点续传；不支持Range或文件大小对不上的线路直接跳过，不丢弃已下载的进度
+    """
+
+    MIRRORS = (
+        Mirror("github"),
+        Mirror("ghfast", "https://ghfast.top/"),
+    )
+    # GitHub下载加速设置的取值：0..len(MIRRORS)-1固定使用对应线路，AUTO为自动选择
+    AUTO = len(MIRRORS)
+
+    PROBE_BYTES = 64 * 1024
+    PROBE_TIMEOUT = (5, 10)
+    PROBE_MAX_AGE = 600.0  # 统计超过这个秒数就重新测速
+    DEFAULT_SIZE = 8 * 1024 * 1024  # 文件大小未知时按这个大小比较线路
+    FAILOVER_RETRIES = 1  # 有备用线路时，每条线路连续失败这么多次就切换
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, mirrors: Optional[Sequence[Mirror]] = None):
+        self.mirrors = list(mirrors or self.MIRRORS)
+        self._stats: Dict[str, MirrorStats] = {mirror.name: MirrorStats() for mirror in self.mirrors}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "MirrorSelector":
+        """进程内共用一个实例，统计在各次下载之间累积"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def stats(self, mirror: Mirror) -> MirrorStats:
+        return self._stats[mirror.name]
+
+    # 测速和排序
+    def probe(self, mirror: Mirror, original_url: str) -> bool:
+        """下载文件开头的PROBE_BYTES字节，记录延迟和吞吐量，返回线路是否可用"""
+        url = mirror.url_for(original_url)
+        start = time.monotonic()
+        received = 0
+        try:
+            with HttpSessionPool.shared().session_for(url).get(
+                    url, headers={'Range': f'bytes=0-{self.PROBE_BYTES - 1}'}, stream=True,
+                    verify=certifi.where(), timeout=self.PROBE_TIMEOUT) as response:
+                response.raise_for_status()
+                latency = time.monotonic() - start
+                # 不支持Range的服务器会返回整个文件，读够PROBE_BYTES就停
+                for chunk in response.iter_content(chunk_size=16 * 1024):
+                    received += len(chunk)
+                    if received >= self.PROBE_BYTES:
+                        break
+            transfer_time = time.monotonic() - start - latency
+        except requests.RequestException as e:
+            print(f"线路{mirror.name}测速失败: {e}")
+            self.record_failure(mirror)
+            return False
+
+        with self._lock:
+            stats = self._stats[mirror.name]
+            stats.add_latency(latency)
+            if received:
+                # 数据太少时传输时间接近0，用延迟兜底，避免得到不合理的高速度
+                stats.add_throughput(received / max(transfer_time, latency, 1e-3))
+        return True
+
+    def rank(self, original_url: str, size: Optional[int] = None) -> List[Mirror]:
+        """按预计下载时间排序所有线路，需要时先并发测速；暂停中的线路排在最后，作为最后的备选"""
+        now = time.time()
+        with self._lock:
+            stale = [mirror for mirror in self.mirrors
+                     if self._stats[mirror.name].is_healthy()
+                     and now - self._stats[mirror.name].updated > self.PROBE_MAX_AGE]
+        if stale:
+            with ThreadPoolExecutor(max_workers=len(stale)) as executor:
+                list(executor.map(lambda mirror: self.probe(mirror, original_url), stale))
+
+        size = size or self.DEFAULT_SIZE
+        with self._lock:
+            def sort_key(mirror: Mirror):
+                stats = self._stats[mirror.name]
+                return (not stats.is_healthy(), stats.expected_seconds(size), self.mirrors.index(mirror))
+            ranked = sorted(self.mirrors, key=sort_key)
+        print("下载线路排序: " + ", ".join(self._describe(mirror) for mirror in ranked))
+        return ranked
+
+    def record_transfer(self, mirror: Mirror, byte_count: int, seconds: float) -> None:
+        if byte_count > 0 and seconds > 0:
+            with self._lock:
+                self._stats[mirror.name].add_throughput(byte_count / seconds)
+
+    def record_failure(self, mirror: Mirror) -> None:
+        with self._lock:
+            self._stats[mirror.name].add_failure()
+
+    def _describe(self, mirror: Mirror) -> str:
+        stats = self._stats[mirror.name]
+        if not stats.is_healthy():
+            return f"{mirror.name}(暂停)"
+        if stats.throughput is None:
+            return f"{mirror.name}(未测)"
+        return f"{mirror.name}({(stats.latency or 0) * 1000:.0f}ms, {stats.throughput / 1048576:.1f}MB/s)"
+
+    # 下载
+    def candidates(self, original_url: str, acceleration: int, size: Optional[int] = None) -> List[Mirror]:
+        """按加速设置给出要尝试的线路：固定线路只用那一条，自动选择时按排序全部尝试"""
+        if 0 <= acceleration < len(self.mirrors):
+            return [self.mirrors[acceleration]]
+        return self.rank(original_url, size)
+
+    def download(self, original_url: str, dest_path: str, expected_size: Optional[int] = None,
+                 expected_sha: Optional[str] = None, progress: Optional[ProgressCallback] = None,
+                 is_cancelled: Optional[Callable[[], bool]] = None, acceleration: int = AUTO) -> str:
+        """按线路顺序下载，当前线路失败时换下一条从断点继续；参数同ResumableDownloader.download"""
+        mirrors = self.candidates(original_url, acceleration, expected_size)
+        failover = len(mirrors) > 1
+        max_retries = self.FAILOVER_RETRIES if failover else None
+        last_error: Optional[Exception] = None
+        for mirror in mirrors:
+            if is_cancelled is not None and is_cancelled():
+                raise DownloadCancelled()
+            # 本线路第一次和最近一次回调时的(已下载字节数, 时间)；
+            # 只统计传输期间，不把下载完成后的SHA校验算进吞吐量
+            received = []
+
+            def on_progress(done, total, speed, eta):
+                sample = (done, time.monotonic())
+                if not received:
+                    received.append(sample)
+                received[1:] = [sample]
+                if progress is not None:
+                    progress(done, total, speed, eta)
+
+            try:
+                path = SegmentedDownloader(max_retries=max_retries, keep_progress=failover).download(
+                    mirror.url_for(original_url), dest_path, expected_size, expected_sha,
+                    on_progress, is_cancelled
+                )
+            except DownloadCancelled:
+                raise
+            except (DownloadError, requests.RequestException) as e:
+                last_error = e
+                self.record_failure(mirror)
+                print(f"线路{mirror.name}下载失败: {e}")
+                continue
+            if received:
+                (first_done, first_time), (last_done, last_time) = received[0], received[-1]
+                self.record_transfer(mirror, last_done - first_done, last_time - first_time)
+            return path
+        if len(mirrors) == 1 and last_error is not None:
+            raise last_error
+        raise DownloadError(f"所有下载线路都失败了: {last_error}")
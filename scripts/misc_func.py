@@ -1,7 +1,10 @@
 import os
+import re
+import atexit
 import hashlib
 import datetime
-from typing import Optional, Dict, Any, List
+import threading
+from typing import Optional, Dict, Any, List, Callable, Tuple
 import configparser
 
 '''
@@ -96,10 +99,11 @@ class CustomConfig:
         "auto_close_time": "3000"
     }
     
-    # GitHub下载加速选项
+    # GitHub下载加速选项，顺序与MirrorSelector.MIRRORS一致，最后一项为自动选择
     GITHUB_ACCELERATION_OPTIONS = [
         "直接从github服务器获取（海外首选）",
-        "ghfast（国内首选）"
+        "ghfast（国内首选）",
+        "自动选择（测速后使用最快的线路）"
     ]
 
 
@@ -183,27 +187,33 @@ class StringConfigSection(ConfigSection):
     """字符串配置段落"""
     
     def get_value(self, key: str, default: str = "") -> str:
-        """获取字符串配置值"""
+        """获取字符串配置值（从内存读取，文件被外部修改时才重新加载）"""
         try:
-            self.settings_manager._load_config()
-            if self.section_name in self.settings_manager.config:
-                return self.settings_manager.config[self.section_name].get(key, default)
-            return default
+            with self.settings_manager.lock:
+                self.settings_manager._load_config()
+                if self.section_name in self.settings_manager.config:
+                    return self.settings_manager.config[self.section_name].get(key, default)
+                return default
         except Exception as e:
             print(f"读取配置失败 [{self.section_name}.{key}]: {e}")
             return default
     
     def set_value(self, key: str, value: str) -> bool:
-        """设置字符串配置值"""
+        """设置字符串配置值（延迟合并写盘），值有变化时通知监听者"""
         try:
-            self.settings_manager._load_config()
-            if self.section_name not in self.settings_manager.config:
-                self.settings_manager.config[self.section_name] = {}
-            self.settings_manager.config[self.section_name][key] = str(value)
-            return self.settings_manager._save_config()
+            with self.settings_manager.lock:
+                self.settings_manager._load_config()
+                if self.section_name not in self.settings_manager.config:
+                    self.settings_manager.config[self.section_name] = {}
+                if self.settings_manager.config[self.section_name].get(key) == str(value):
+                    return True
+                self.settings_manager.config[self.section_name][key] = str(value)
+                success = self.settings_manager._save_config()
         except Exception as e:
             print(f"设置配置失败 [{self.section_name}.{key}]: {e}")
             return False
+        self.settings_manager._notify(self.section_name, key, str(value))
+        return success
 
 
 class IntConfigSection(ConfigSection):
@@ -255,10 +265,20 @@ class BoolConfigSection(ConfigSection):
 
 
 class SettingsManager:
-    """设置管理器 - 使用ini文件保存配置"""
+    """设置管理器 - 使用ini文件保存配置
+
+    读取走内存缓存，只有settings.ini的修改时间变化时才重新解析；
+    写入先改内存，SAVE_DELAY秒内的多次修改合并成一次保存。
+    保存时先写临时文件再改名替换，中途崩溃不会留下半截的settings.ini。
+    """
     
     # 配置常量
     CONFIG_FILE = "settings.ini"
+    SAVE_DELAY = 0.5  # 秒
+    
+    # 进程内共享实例
+    _instance = None
+    _instance_lock = threading.Lock()
     
     # 段落名称常量
     SECTION_API_KEYS = 'API_Keys'
@@ -272,12 +292,64 @@ class SettingsManager:
         self.config_file = self.CONFIG_FILE
         self.config = configparser.ConfigParser()
         
+        # 缓存与延迟保存状态
+        self.lock = threading.RLock()
+        self._file_stamp = None
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+        self._listeners: List[Tuple[Callable[[str, str, str], None], Optional[str], Optional[str]]] = []
+        atexit.register(self.flush)
+        
         # 初始化配置段落管理器
         self._init_config_sections()
         
         # 确保配置文件存在
         self._ensure_config_file()
     
+    @classmethod
+    def shared(cls) -> "SettingsManager":
+        """获取进程内共享的设置管理器，所有页面用同一份配置"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+    
+    def add_listener(self, callback: Callable[[str, str, str], None],
+                     section: Optional[str] = None, key: Optional[str] = None):
+        """注册设置变化监听 callback(段落, 键, 新值)；section/key为None表示不限
+
+        回调在修改设置的线程里同步执行，需要操作界面时请转成Qt信号。
+        """
+        with self.lock:
+            self._listeners.append((callback, section, key))
+    
+    def remove_listener(self, callback: Callable[[str, str, str], None]):
+        """移除设置变化监听"""
+        with self.lock:
+            self._listeners = [item for item in self._listeners if item[0] != callback]
+    
+    def _notify(self, section: str, key: str, value: str):
+        """通知关心该键的监听者"""
+        with self.lock:
+            listeners = list(self._listeners)
+        for callback, watch_section, watch_key in listeners:
+            if watch_section not in (None, section) or watch_key not in (None, key):
+                continue
+            try:
+                callback(section, key, value)
+            except Exception as e:
+                print(f"设置变化回调失败 [{section}.{key}]: {e}")
+    
+    def _snapshot(self) -> Dict[str, Dict[str, str]]:
+        return {section: dict(self.config[section]) for section in self.config.sections()}
+    
+    def _notify_differences(self, old: Dict[str, Dict[str, str]]):
+        """对比新旧配置，逐个通知变化（或新增）的键"""
+        for section, values in self._snapshot().items():
+            for key, value in values.items():
+                if old.get(section, {}).get(key) != value:
+                    self._notify(section, key, value)
+    
     def _init_config_sections(self):
         """初始化配置段落管理器"""
         self.api_keys = StringConfigSection(self, self.SECTION_API_KEYS)
@@ -348,24 +420,73 @@ class SettingsManager:
             'github_acceleration': '0'  # 新增GitHub下载加速选项，默认0（直接从GitHub获取）
         }
         
-        self._save_config()
+        self._save_config(immediate=True)
     
-    def _load_config(self):
-        """从文件加载配置"""
+    def _get_file_stamp(self):
+        """配置文件的(修改时间, 大小)，文件不存在时为None"""
         try:
-            self.config.read(self.config_file, encoding='utf-8')
-        except Exception as e:
-            print(f"读取配置文件失败: {e}")
+            stat = os.stat(self.config_file)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
     
-    def _save_config(self) -> bool:
-        """保存配置到文件"""
-        try:
-            with open(self.config_file, 'w', encoding='utf-8') as configfile:
-                self.config.write(configfile)
+    def _load_config(self):
+        """从文件加载配置 - 文件自上次加载/保存后没变时直接使用内存中的配置"""
+        with self.lock:
+            stamp = self._get_file_stamp()
+            if stamp is None or stamp == self._file_stamp:
+                return
+            if self._dirty:
+                # 还有没写盘的修改时以内存为准，保存时会覆盖外部修改
+                return
+            try:
+                config = configparser.ConfigParser()
+                config.read(self.config_file, encoding='utf-8')
+                first_load = self._file_stamp is None
+                old = self._snapshot()
+                self.config = config
+                self._file_stamp = stamp
+            except Exception as e:
+                print(f"读取配置文件失败: {e}")
+                return
+            # 首次加载不算变化；之后文件被外部修改时通知监听者
+            if not first_load:
+                self._notify_differences(old)
+    
+    def _save_config(self, immediate: bool = False) -> bool:
+        """保存配置 - 默认延迟SAVE_DELAY秒合并写盘，immediate时立即写盘"""
+        with self.lock:
+            self._dirty = True
+            if immediate:
+                return self.flush()
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(self.SAVE_DELAY, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
             return True
-        except Exception as e:
-            print(f"保存配置文件失败: {e}")
-            return False
+    
+    def flush(self) -> bool:
+        """把未保存的修改原子写入配置文件（临时文件 + 改名）"""
+        with self.lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return True
+            temp_file = self.config_file + ".tmp"
+            try:
+                with open(temp_file, 'w', encoding='utf-8') as configfile:
+                    self.config.write(configfile)
+                    configfile.flush()
+                    os.fsync(configfile.fileno())
+                os.replace(temp_file, self.config_file)
+                self._dirty = False
+                self._file_stamp = self._get_file_stamp()
+                return True
+            except Exception as e:
+                print(f"保存配置文件失败: {e}")
+                return False
     
     # API Key 相关方法
     def get_api_key(self, key_name: str) -> str:
@@ -473,9 +594,17 @@ class SettingsManager:
     def reset_to_defaults(self) -> bool:
         """重置为默认设置"""
         try:
-            if os.path.exists(self.config_file):
-                os.remove(self.config_file)
-            self._create_default_config()
+            with self.lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                self._dirty = False
+                old = self._snapshot()
+                if os.path.exists(self.config_file):
+                    os.remove(self.config_file)
+                self.config = configparser.ConfigParser()
+                self._create_default_config()
+            self._notify_differences(old)
             return True
         except Exception as e:
             print(f"重置设置失败: {e}")
@@ -485,16 +614,28 @@ class SettingsManager:
 class ContentHasher:
     """内容哈希计算器"""
     
+    @staticmethod
+    def get_content_digest(config: AudioConfig) -> str:
+        """获取文本内容的摘要
+
+        编辑器会把(文本对象, 摘要)存到config.content_digest，只要config.content还是同一个对象就直接复用，
+        不必对整篇文本重新计算；没有缓存时按同样的分块方法计算，两种途径得到的摘要相同
+        """
+        cached = getattr(config, 'content_digest', None)
+        if cached is not None and cached[0] is config.content:
+            return cached[1]
+        return BlockDigestIndex.digest_text(config.content)
+
     @staticmethod
     def get_content_hash(config: AudioConfig) -> str:
         """获取配置内容的哈希值"""
-        content = f"{config.content}_{config.voice}_{config.speed}_{config.pitch}_{config.volume}_{config.stretch_factor}"
+        content = f"{ContentHasher.get_content_digest(config)}_{config.voice}_{config.speed}_{config.pitch}_{config.volume}_{config.stretch_factor}"
         return hashlib.md5(content.encode('utf-8')).hexdigest()
-    
+
     @staticmethod
     def get_cache_key(config: AudioConfig) -> str:
         """生成缓存键"""
-        return f"{config.content}_{config.voice}_{config.speed}_{config.pitch}_{config.volume}_{config.stretch_factor}"
+        return f"{ContentHasher.get_content_digest(config)}_{config.voice}_{config.speed}_{config.pitch}_{config.volume}_{config.stretch_factor}"
     
     @staticmethod
     def calculate_hash(*args) -> str:
@@ -503,6 +644,60 @@ class ContentHasher:
         return hashlib.md5(content.encode('utf-8')).hexdigest()
 
 
+class BlockDigestIndex:
+    """分块内容摘要 - 文本按段落（文本块）分别记录摘要，编辑时只重算受影响的块
+
+    整篇摘要由各块摘要依次拼接后再哈希得到，块的增删和顺序变化都会反映出来。
+    摘要按纯文本的行计算：跟踪QTextDocument文本块和直接对文本调用digest_text()结果相同。
+    """
+
+    DIGEST_SIZE = 16
+    # 文本块里的U+2028在纯文本里是换行，不换行空格是普通空格（与toPlainText()一致）
+    _PLAIN_TEXT_MAP = str.maketrans({'\u2028': '\n', '\u00a0': ' '})
+    # QTextDocument插入文本时当作分块的字符
+    _BLOCK_BREAK_RE = re.compile(r'\r\n|[\r\u2029\ufdd0\ufdd1]')
+
+    def __init__(self):
+        self._digests: List[bytes] = []
+        self._combined: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+    @classmethod
+    def hash_block(cls, text: str) -> bytes:
+        return b"".join(cls._hash_line(line) for line in text.translate(cls._PLAIN_TEXT_MAP).split('\n'))
+
+    @classmethod
+    def digest_text(cls, text: str) -> str:
+        """直接计算一段文本的整篇摘要"""
+        return cls._combine([cls.hash_block(block) for block in cls._BLOCK_BREAK_RE.sub('\n', text).split('\n')])
+
+    def reset(self, blocks) -> None:
+        """按给定的文本块重建全部摘要"""
+        self._digests = [self.hash_block(text) for text in blocks]
+        self._combined = None
+
+    def replace(self, start: int, old_count: int, blocks) -> None:
+        """用新的文本块替换从start开始的old_count个块"""
+        self._digests[start:start + old_count] = [self.hash_block(text) for text in blocks]
+        self._combined = None
+
+    def digest(self) -> str:
+        """整篇文本的摘要，块没有变化时直接返回上次结果"""
+        if self._combined is None:
+            self._combined = self._combine(self._digests)
+        return self._combined
+
+    @classmethod
+    def _hash_line(cls, line: str) -> bytes:
+        return hashlib.blake2b(line.encode('utf-8'), digest_size=cls.DIGEST_SIZE).digest()
+
+    @classmethod
+    def _combine(cls, digests) -> str:
+        return hashlib.blake2b(b"".join(digests), digest_size=cls.DIGEST_SIZE).hexdigest()
+
+
 class AudioFileManager:
     """音频文件管理器"""
     
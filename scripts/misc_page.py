@@ -2,7 +2,6 @@ import sys
 import os
 import base64
 import tempfile
-import requests
 from typing import Optional
 from PyQt5.QtWidgets import (
     QWidget, QPushButton, QGridLayout, QMessageBox, QApplication,
@@ -11,7 +10,6 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt, QRect, QThread, pyqtSignal, QUrl
 from PyQt5.QtGui import QFont, QPixmap, QDesktopServices
-import certifi
 
 
 
@@ -40,11 +38,25 @@ DEFAULT_HEIGHT = 720
 # ===== 常量定义结束 =====
 
 try:
-    from docxfix import Document
+    from iw_import_worker import FileImportWorker
     DOCX_AVAILABLE = True
 except ImportError:
     DOCX_AVAILABLE = False
 
+try:
+    from network_service import NetworkService
+    from textbook_catalog import TextbookCatalog
+    from pdf_library import PdfLibrary
+    DOWNLOAD_AVAILABLE = True
+except ImportError:
+    DOWNLOAD_AVAILABLE = False
+
+try:
+    from disk_cache import ImportCache
+    CACHE_AVAILABLE = True
+except ImportError:
+    CACHE_AVAILABLE = False
+
 try:
     from misc_func import SettingsManager
     SETTINGS_AVAILABLE = True
@@ -52,7 +64,7 @@ except ImportError:
     SETTINGS_AVAILABLE = False
 
 try:
-    from iw_dialogs import LoadingDialog
+    from iw_dialogs import LoadingDialog, ImportProgressDialog
     DIALOGS_AVAILABLE = True
 except ImportError:
     DIALOGS_AVAILABLE = False
@@ -62,6 +74,9 @@ class AIOCRWorker(QThread):
     finished_signal = pyqtSignal(str)
     error_signal = pyqtSignal(str)
     
+    MODEL = "glm-4v-flash"
+    PROMPT = "请提取这张图片中的所有文字内容，输出纯文字格式。"
+    
     def __init__(self, api_key, image_path):
         super().__init__()
         self.api_key = api_key
@@ -69,6 +84,16 @@ class AIOCRWorker(QThread):
     
     def run(self):
         try:
+            # 识别过的图片直接用缓存结果，不再调用收费接口
+            cache = ImportCache.shared() if CACHE_AVAILABLE else None
+            cache_key = None
+            if cache:
+                cache_key = cache.key_for_file(self.image_path, 'image_ocr', prompt=self.PROMPT, model=self.MODEL)
+                cached = cache.get_text(cache_key)
+                if cached is not None:
+                    self.finished_signal.emit(cached)
+                    return
+            
             from openai import OpenAI
             
             client = OpenAI(
@@ -82,10 +107,10 @@ class AIOCRWorker(QThread):
             
             base64_image = encode_image(self.image_path)
             
-            prompt = "请提取这张图片中的所有文字内容，输出纯文字格式。"
+            prompt = self.PROMPT
             
             response = client.chat.completions.create(
-                model="glm-4v-flash",
+                model=self.MODEL,
                 messages=[
                     {
                         "role": "user",
@@ -98,6 +123,9 @@ class AIOCRWorker(QThread):
                 max_tokens=1000
             )
             result = response.choices[0].message.content
+            if cache and result:
+                cache.put_text(cache_key, result)
+                cache.flush()
             self.finished_signal.emit(result)
             
         except Exception as e:
@@ -211,13 +239,16 @@ class PDFDownloadDialog(QDialog):
         self.window_size = window_size
         self.selected_file_info = None
         self.selected_pdf_name = None
-        self.settings_manager = SettingsManager() if SETTINGS_AVAILABLE else None
+        self.settings_manager = SettingsManager.shared() if SETTINGS_AVAILABLE else None
         self.current_path = ""
         self.path_history = []
+        self.catalog = TextbookCatalog.shared() if DOWNLOAD_AVAILABLE else None
         
         self.init_ui()
         self.load_root_directory()
         self._update_fonts()
+        if self.catalog and not self.catalog.is_empty() and self.catalog.is_stale():
+            self._refresh_catalog()
     
     def init_ui(self):
         self.setWindowTitle("PDF电子书下载")
@@ -344,12 +375,15 @@ class PDFDownloadDialog(QDialog):
     
     def load_directory_contents(self, path):
         self.tree_widget.clear()
+        if not self.catalog:
+            return
+        if self.catalog.is_empty():
+            self.path_label.setText("正在下载教材目录（只需下载一次）...")
+            self._refresh_catalog()
+            return
         
         try:
-            url = f"https://api.github.com/repos/TapXWorld/ChinaTextbook/contents/{path}"
-            response = requests.get(url, verify=certifi.where(), timeout=15)
-            response.raise_for_status()
-            contents = response.json()
+            contents = self.catalog.list_dir(path)
             
             for item in contents:
                 if item['name'] == '.cache':
@@ -410,7 +444,26 @@ class PDFDownloadDialog(QDialog):
                 self.back_button.setEnabled(False)
     
     def refresh_current_directory(self):
-        self.load_directory_contents(self.current_path)
+        if self.catalog:
+            self._refresh_catalog(force=True)
+    
+    def _refresh_catalog(self, force=False):
+        catalog = self.catalog
+        reply = NetworkService.shared().submit(lambda _: catalog.refresh(force), key="catalog_refresh")
+        reply.finished_signal.connect(self._on_catalog_refreshed)
+        reply.error_signal.connect(self._on_catalog_refresh_error)
+    
+    def _on_catalog_refreshed(self, changed):
+        if changed or not self.tree_widget.topLevelItemCount():
+            self.load_directory_contents(self.current_path)
+    
+    def _on_catalog_refresh_error(self, error_message):
+        """目录同步失败，已有本地目录时继续使用"""
+        if self.catalog.is_empty():
+            self.path_label.setText(f"加载失败: {error_message}")
+            QMessageBox.critical(self, "错误", f"无法加载目录内容: {error_message}")
+        else:
+            self.path_label.setText(f"检查更新失败，显示的是本地保存的目录: {error_message}")
     
     def browse_save_path(self):
         directory = QFileDialog.getExistingDirectory(self, "选择保存路径")
@@ -434,46 +487,70 @@ class PDFDownloadDialog(QDialog):
             QMessageBox.warning(self, "提示", "请选择保存路径")
             return
         
-        loading_dialog = LoadingDialog(self) if DIALOGS_AVAILABLE else None
-        if loading_dialog:
-            loading_dialog.text_label.setText(f"正在下载 {self.selected_pdf_name}...")
-            loading_dialog.show()
-            QApplication.processEvents()
+        if not DOWNLOAD_AVAILABLE:
+            QMessageBox.warning(self, "提示", "下载功能不可用")
+            return
         
         try:
             pdf_url = self.get_pdf_download_url(self.selected_file_info)
-            
-            response = requests.get(pdf_url, stream=True, verify=certifi.where(), timeout=30)
-            response.raise_for_status()
-            
-            if not save_path.endswith('.pdf'):
-                save_path += '.pdf'
-            
-            os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            
-            with open(save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-                    QApplication.processEvents()
-            
-            if loading_dialog:
-                loading_dialog.close()
-            
-            QMessageBox.information(self, "下载完成", f"PDF文件已保存到:\n{save_path}")
-            self.accept()
-            
         except Exception as e:
-            if loading_dialog:
-                loading_dialog.close()
             QMessageBox.critical(self, "错误", f"下载失败: {str(e)}")
+            return
+        
+        if not save_path.endswith('.pdf'):
+            save_path += '.pdf'
+        
+        progress_dialog = ImportProgressDialog(self, self.selected_pdf_name, action="下载") if DIALOGS_AVAILABLE else None
+        self.download_reply = NetworkService.shared().download(
+            pdf_url, save_path,
+            self.selected_file_info.get('size'), self.selected_file_info.get('sha'),
+            acceleration=self._get_github_acceleration()
+        )
+        self.download_reply.finished_signal.connect(
+            lambda path: self._on_download_finished(path, progress_dialog)
+        )
+        self.download_reply.error_signal.connect(
+            lambda error: self._on_download_failed(f"下载失败: {error}", progress_dialog)
+        )
+        self.download_reply.cancelled_signal.connect(
+            lambda: self._on_download_failed("", progress_dialog)
+        )
+        if progress_dialog:
+            self.download_reply.progress_signal.connect(progress_dialog.update_transfer)
+            progress_dialog.cancel_requested.connect(self.download_reply.cancel)
+            progress_dialog.show()
+        self.download_button.setEnabled(False)
+    
+    def _on_download_finished(self, save_path, progress_dialog):
+        if progress_dialog:
+            progress_dialog.finish()
+        #保存在教材库目录里的书登记到索引，在线导入时可以直接使用
+        library = PdfLibrary.shared()
+        if library.contains_path(save_path):
+            try:
+                library.add(save_path, self.selected_file_info.get('sha'), self.selected_file_info.get('path', ''))
+            except Exception as e:
+                print(f"登记教材失败: {e}")
+        QMessageBox.information(self, "下载完成", f"PDF文件已保存到:\n{save_path}")
+        self.accept()
+    
+    def _on_download_failed(self, error_message, progress_dialog):
+        """下载失败或已取消，error_message为空表示取消；已下载的部分保留，下次继续"""
+        if progress_dialog:
+            progress_dialog.finish()
+        self.download_button.setEnabled(True)
+        if error_message:
+            QMessageBox.critical(self, "错误", error_message)
     
     def get_default_save_path(self):
-        if self.selected_pdf_name:
-            downloads_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "downloaded_pdfs")
-            os.makedirs(downloads_dir, exist_ok=True)
-            return os.path.join(downloads_dir, self.selected_pdf_name)
+        if self.selected_pdf_name and DOWNLOAD_AVAILABLE:
+            return PdfLibrary.shared().path_for(self.selected_pdf_name)
         return ""
     
+    def _get_github_acceleration(self):
+        """GitHub下载加速设置，与在线导入一致"""
+        return self.settings_manager.get_github_acceleration() if self.settings_manager else 0
+    
     def get_pdf_download_url(self, file_info):
         try:
             if 'download_url' in file_info and file_info['download_url']:
@@ -631,6 +708,8 @@ class AboutDialog(QDialog):
         super().resizeEvent(event)
     
     def load_images(self):
+        self.image_replies = []
+        self._closed = False
         cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
         os.makedirs(cache_dir, exist_ok=True)
         
@@ -647,21 +726,39 @@ class AboutDialog(QDialog):
                     self.image_labels[i].setPixmap(pixmap.scaled(150, 150, Qt.KeepAspectRatio, Qt.SmoothTransformation))
                     continue
             
-            try:
-                response = requests.get(url, timeout=10)
-                if response.status_code == 200:
-                    pixmap = QPixmap()
-                    pixmap.loadFromData(response.content)
-                    if not pixmap.isNull():
-                        self.image_labels[i].setPixmap(pixmap.scaled(150, 150, Qt.KeepAspectRatio, Qt.SmoothTransformation))
-                        pixmap.save(cache_path, "PNG")
-                    else:
-                        self.image_labels[i].setText("获取错误")
-                else:
-                    self.image_labels[i].setText("获取错误")
-            except Exception as e:
-                print(f"加载图片失败: {e}")
+            if not DOWNLOAD_AVAILABLE:
                 self.image_labels[i].setText("获取错误")
+                continue
+            
+            #后台下载，对话框先显示出来
+            self.image_labels[i].setText("加载中...")
+            reply = NetworkService.shared().get(url, timeout=10)
+            reply.finished_signal.connect(lambda data, idx=i, path=cache_path: self._on_image_loaded(idx, path, data))
+            reply.error_signal.connect(lambda error, idx=i: self._on_image_error(idx, error))
+            self.image_replies.append(reply)
+    
+    def _on_image_loaded(self, index, cache_path, data):
+        if self._closed:
+            return
+        pixmap = QPixmap()
+        pixmap.loadFromData(data)
+        if not pixmap.isNull():
+            self.image_labels[index].setPixmap(pixmap.scaled(150, 150, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+            pixmap.save(cache_path, "PNG")
+        else:
+            self.image_labels[index].setText("获取错误")
+    
+    def _on_image_error(self, index, error):
+        print(f"加载图片失败: {error}")
+        if not self._closed:
+            self.image_labels[index].setText("获取错误")
+    
+    def done(self, result):
+        #关闭后不再更新控件，没下完的图片也不必再下
+        self._closed = True
+        for reply in self.image_replies:
+            reply.cancel()
+        super().done(result)
     
     def open_url(self, index):
         if index < len(ABOUT_BUTTON_URLS) and ABOUT_BUTTON_URLS[index]:
@@ -764,7 +861,7 @@ class MiscPage(QWidget):
             QMessageBox.warning(self, "错误", "设置管理器不可用")
             return
         
-        settings_manager = SettingsManager()
+        settings_manager = SettingsManager.shared()
         api_key = settings_manager.get_api_key("api_key_ChatGLM")
         if not api_key:
             QMessageBox.warning(self, "提示", "请先在设置中配置ChatGLM API Key")
@@ -825,15 +922,43 @@ class MiscPage(QWidget):
         if not file_path:
             return
         
-        try:
-            doc = Document(file_path)
-            content = '\n'.join([p.text for p in doc.paragraphs])
-            
-            dialog = TextResultDialog(self, "DOCX文本提取结果", content)
-            dialog.exec_()
-                
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"文档提取失败: {str(e)}")
+        docx_worker = getattr(self, 'docx_worker', None)
+        if docx_worker and docx_worker.isRunning():
+            return
+        
+        # 在后台线程解析，避免大文档卡住界面
+        chunks = []
+        progress_dialog = ImportProgressDialog(self, os.path.basename(file_path)) if DIALOGS_AVAILABLE else None
+        
+        self.docx_worker = FileImportWorker(file_path)
+        self.docx_worker.chunk_signal.connect(chunks.append)
+        self.docx_worker.finished_signal.connect(
+            lambda: self._on_docx_extracted(''.join(chunks), progress_dialog)
+        )
+        self.docx_worker.cancelled_signal.connect(
+            lambda: self._close_progress_dialog(progress_dialog)
+        )
+        self.docx_worker.error_signal.connect(
+            lambda error: self._on_docx_extraction_error(error, progress_dialog)
+        )
+        if progress_dialog:
+            self.docx_worker.progress_signal.connect(progress_dialog.update_progress)
+            progress_dialog.cancel_requested.connect(self.docx_worker.cancel)
+            progress_dialog.show()
+        self.docx_worker.start()
+    
+    def _on_docx_extracted(self, content, progress_dialog):
+        self._close_progress_dialog(progress_dialog)
+        dialog = TextResultDialog(self, "DOCX文本提取结果", content)
+        dialog.exec_()
+    
+    def _on_docx_extraction_error(self, error, progress_dialog):
+        self._close_progress_dialog(progress_dialog)
+        QMessageBox.critical(self, "错误", f"文档提取失败: {error}")
+    
+    def _close_progress_dialog(self, progress_dialog):
+        if progress_dialog:
+            progress_dialog.finish()
     
     def _on_about(self):
         dialog = AboutDialog(self)
@@ -0,0 +1,449 @@
+import io
+import os
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+
+# 比特率表(kbps)，按 (MPEG版本是否为1, 层) 索引；下标为头部中的比特率索引
+_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# 采样率表，按头部中的版本位索引：3=MPEG1, 2=MPEG2, 0=MPEG2.5
+_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    0: [11025, 12000, 8000],
+}
+
+XING_FLAG_FRAMES = 0x1
+XING_FLAG_BYTES = 0x2
+XING_FLAG_TOC = 0x4
+XING_FLAG_QUALITY = 0x8
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class FrameHeader:
+    """MPEG音频帧头"""
+    version_bits: int  # 3=MPEG1, 2=MPEG2, 0=MPEG2.5
+    layer: int
+    protected: bool
+    bitrate_index: int
+    bitrate: int  # bps
+    sample_rate: int
+    padding: int
+    channel_mode: int  # 3为单声道
+    raw: bytes
+
+    @classmethod
+    def parse(cls, data: bytes) -> Optional["FrameHeader"]:
+        """解析4字节帧头，不是合法帧头时返回None"""
+        if len(data) < 4 or data[0] != 0xFF or (data[1] & 0xE0) != 0xE0:
+            return None
+        version_bits = (data[1] >> 3) & 0x3
+        layer_bits = (data[1] >> 1) & 0x3
+        bitrate_index = data[2] >> 4
+        sample_rate_index = (data[2] >> 2) & 0x3
+        if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+            return None
+        layer = 4 - layer_bits
+        bitrate = _BITRATES[(version_bits == 3, layer)][bitrate_index] * 1000
+        return cls(
+            version_bits=version_bits,
+            layer=layer,
+            protected=not (data[1] & 0x1),
+            bitrate_index=bitrate_index,
+            bitrate=bitrate,
+            sample_rate=_SAMPLE_RATES[version_bits][sample_rate_index],
+            padding=(data[2] >> 1) & 0x1,
+            channel_mode=data[3] >> 6,
+            raw=bytes(data[:4]),
+        )
+
+    @property
+    def is_mpeg1(self) -> bool:
+        return self.version_bits == 3
+
+    @property
+    def samples_per_frame(self) -> int:
+        if self.layer == 1:
+            return 384
+        if self.layer == 3 and not self.is_mpeg1:
+            return 576
+        return 1152
+
+    @property
+    def frame_length(self) -> int:
+        if self.layer == 1:
+            return (12 * self.bitrate // self.sample_rate + self.padding) * 4
+        return self.samples_per_frame // 8 * self.bitrate // self.sample_rate + self.padding
+
+    @property
+    def duration(self) -> float:
+        return self.samples_per_frame / self.sample_rate
+
+    @property
+    def side_info_length(self) -> int:
+        """Layer III边信息长度，Xing/Info标签紧跟其后"""
+        mono = self.channel_mode == 3
+        if self.is_mpeg1:
+            return 17 if mono else 32
+        return 9 if mono else 17
+
+    @property
+    def xing_offset(self) -> int:
+        return 4 + (2 if self.protected else 0) + self.side_info_length
+
+
+def id3v2_length(head: bytes) -> int:
+    """开头ID3v2标签的总长度，没有标签返回0"""
+    if len(head) < 10 or head[:3] != b'ID3':
+        return 0
+    size = 0
+    for byte in head[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if head[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def is_vbr_header_frame(header: FrameHeader, frame: bytes) -> bool:
+    """判断一帧是否是Xing/Info/VBRI信息帧（不含音频）"""
+    offset = header.xing_offset
+    if frame[offset:offset + 4] in (b'Xing', b'Info'):
+        return True
+    return frame[36:40] == b'VBRI'
+
+
+def iter_frames(stream: BinaryIO) -> Iterator[Tuple[FrameHeader, bytes]]:
+    """逐帧读取MPEG音频流，跳过开头的ID3v2、结尾的ID3v1/APE标签和无法识别的垃圾数据
+
+    只在内存里保留一个读块，适合任意长度的文件。
+    """
+    buffer = bytearray(stream.read(READ_CHUNK_SIZE))
+    eof = False
+
+    def fill(needed: int) -> bool:
+        nonlocal eof
+        while len(buffer) < needed and not eof:
+            chunk = stream.read(READ_CHUNK_SIZE)
+            if not chunk:
+                eof = True
+                break
+            buffer.extend(chunk)
+        return len(buffer) >= needed
+
+    fill(10)
+    tag_length = id3v2_length(bytes(buffer[:10]))
+    while tag_length > 0 and fill(1):
+        skip = min(tag_length, len(buffer))
+        del buffer[:skip]
+        tag_length -= skip
+
+    while fill(4):
+        header = FrameHeader.parse(bytes(buffer[:4]))
+        if header is None:
+            # 尾部的APE标签或ID3v1标签（最后128字节）之后不会再有音频帧
+            if buffer[:8] == b'APETAGEX' or (buffer[:3] == b'TAG' and not fill(129)):
+                return
+            next_sync = buffer.find(b'\xff', 1)
+            if next_sync < 0:
+                buffer.clear()
+            else:
+                del buffer[:next_sync]
+            continue
+        length = header.frame_length
+        if length < 4:
+            del buffer[:1]
+            continue
+        if not fill(length):
+            # 结尾不完整的帧直接丢掉
+            return
+        frame = bytes(buffer[:length])
+        del buffer[:length]
+        yield header, frame
+
+
+@dataclass
+class Mp3Info:
+    """MP3时长探测结果"""
+    duration_ms: int
+    bitrate: int  # bps，VBR时为平均值
+    frame_count: int
+    sample_rate: int
+    source: str  # xing / vbri / scan
+
+
+def probe_mp3(path: str) -> Optional[Mp3Info]:
+    """只读帧头获取MP3时长和比特率，不解码音频
+
+    优先读Xing/Info（含LAME编码延迟和补齐）或VBRI头；没有时逐帧扫描帧头，
+    扫描时按帧长跳读，不读取音频数据。无法识别为MPEG音频时返回None。
+    """
+    try:
+        file_size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            audio_start = id3v2_length(f.read(10))
+            f.seek(audio_start)
+            first = _find_first_frame(f)
+            if first is None:
+                return None
+            offset, header = first
+            f.seek(offset)
+            frame = f.read(header.frame_length)
+            audio_end = file_size - _trailing_tag_length(f, file_size)
+
+            info = _read_xing(header, frame, offset, audio_end) or _read_vbri(header, frame, offset, audio_end)
+            if info is not None:
+                return info
+            return _scan_frames(f, offset, audio_end, header.sample_rate)
+    except OSError:
+        return None
+
+
+def _find_first_frame(f: BinaryIO, max_search: int = 64 * 1024) -> Optional[Tuple[int, FrameHeader]]:
+    """找到第一个合法帧：要求紧跟着的下一帧也能解析，避免把垃圾数据当作帧头"""
+    start = f.tell()
+    data = f.read(max_search)
+    index = data.find(b'\xff')
+    while 0 <= index <= len(data) - 4:
+        header = FrameHeader.parse(data[index:index + 4])
+        if header is not None:
+            next_index = index + header.frame_length
+            if next_index + 4 > len(data) or FrameHeader.parse(data[next_index:next_index + 4]) is not None:
+                return start + index, header
+        index = data.find(b'\xff', index + 1)
+    return None
+
+
+def _trailing_tag_length(f: BinaryIO, file_size: int) -> int:
+    """文件末尾ID3v1标签的长度"""
+    if file_size < 128:
+        return 0
+    f.seek(file_size - 128)
+    return 128 if f.read(3) == b'TAG' else 0
+
+
+def _read_xing(header: FrameHeader, frame: bytes, offset: int, audio_end: int) -> Optional[Mp3Info]:
+    if header.layer != 3:
+        return None
+    position = header.xing_offset
+    if frame[position:position + 4] not in (b'Xing', b'Info') or len(frame) < position + 8:
+        return None
+    flags = struct.unpack('>I', frame[position + 4:position + 8])[0]
+    position += 8
+    if not flags & XING_FLAG_FRAMES:
+        return None
+    frame_count = struct.unpack('>I', frame[position:position + 4])[0]
+    position += 4
+    byte_count = None
+    if flags & XING_FLAG_BYTES:
+        byte_count = struct.unpack('>I', frame[position:position + 4])[0]
+        position += 4
+    if flags & XING_FLAG_TOC:
+        position += 100
+    if flags & XING_FLAG_QUALITY:
+        position += 4
+
+    samples = frame_count * header.samples_per_frame
+    # LAME扩展标签里记录了编码延迟和末尾补齐的采样数
+    if frame[position:position + 4] in (b'LAME', b'Lavc', b'Lavf') and len(frame) >= position + 24:
+        delay_padding = frame[position + 21:position + 24]
+        delay = (delay_padding[0] << 4) | (delay_padding[1] >> 4)
+        padding = ((delay_padding[1] & 0x0F) << 8) | delay_padding[2]
+        if 0 < delay + padding < samples:
+            samples -= delay + padding
+
+    if byte_count is None or byte_count <= 0:
+        byte_count = audio_end - offset
+    return _make_info(samples, header.sample_rate, byte_count, frame_count, "xing")
+
+
+def _read_vbri(header: FrameHeader, frame: bytes, offset: int, audio_end: int) -> Optional[Mp3Info]:
+    if frame[36:40] != b'VBRI' or len(frame) < 54:
+        return None
+    byte_count, frame_count = struct.unpack('>II', frame[46:54])
+    if byte_count <= 0:
+        byte_count = audio_end - offset
+    samples = frame_count * header.samples_per_frame
+    return _make_info(samples, header.sample_rate, byte_count, frame_count, "vbri")
+
+
+def _scan_frames(f: BinaryIO, offset: int, audio_end: int, sample_rate: int) -> Optional[Mp3Info]:
+    """逐帧累计采样数：按块读入，只解析帧头；遇到无法解析的位置逐字节重新同步"""
+    samples = 0
+    frame_count = 0
+    byte_count = 0
+    header_cache = {}
+    f.seek(offset)
+    remaining = audio_end - offset
+    data = b''
+    position = 0
+    while True:
+        # 缓冲区里始终留够一个最大帧的长度
+        if remaining > 0 and len(data) - position < 8192:
+            chunk = f.read(min(remaining, 1024 * 1024))
+            remaining = remaining - len(chunk) if chunk else 0
+            data = data[position:] + chunk
+            position = 0
+        if len(data) - position < 4:
+            break
+        raw = data[position:position + 4]
+        header = header_cache.get(raw)
+        if header is None:
+            header = FrameHeader.parse(raw)
+            if header is None or header.frame_length < 4:
+                position += 1
+                continue
+            header_cache[raw] = header
+        if position + header.frame_length > len(data):
+            break
+        samples += header.samples_per_frame
+        frame_count += 1
+        byte_count += header.frame_length
+        position += header.frame_length
+    if frame_count == 0:
+        return None
+    return _make_info(samples, sample_rate, byte_count, frame_count, "scan")
+
+
+def _make_info(samples: int, sample_rate: int, byte_count: int,
+               frame_count: int, source: str) -> Mp3Info:
+    duration_ms = samples * 1000 // sample_rate
+    bitrate = byte_count * 8 * 1000 // duration_ms if duration_ms else 0
+    return Mp3Info(duration_ms, bitrate, frame_count, sample_rate, source)
+
+
+def build_info_frame(template: FrameHeader, frame_count: int, byte_count: int,
+                     is_vbr: bool) -> bytes:
+    """按模板帧头生成一个Xing/Info信息帧
+
+    选能装下标签的最小比特率，其余字段沿用模板（版本、采样率、声道），不带CRC。
+    不写TOC：拼接时不保存逐帧偏移，播放器按字节数线性定位。
+    """
+    needed = 4 + template.side_info_length + 16
+    for bitrate_index in range(1, 15):
+        candidate = bytes([
+            0xFF,
+            0xE0 | (template.version_bits << 3) | ((4 - template.layer) << 1) | 0x1,
+            (bitrate_index << 4) | (template.raw[2] & 0x0C),
+            template.raw[3],
+        ])
+        header = FrameHeader.parse(candidate)
+        if header is not None and header.frame_length >= needed:
+            break
+    else:
+        raise ValueError("找不到能容纳信息标签的帧大小")
+
+    frame = bytearray(header.frame_length)
+    frame[:4] = candidate
+    offset = header.xing_offset
+    frame[offset:offset + 4] = b'Xing' if is_vbr else b'Info'
+    frame[offset + 4:offset + 16] = struct.pack(
+        '>III', XING_FLAG_FRAMES | XING_FLAG_BYTES, frame_count, byte_count
+    )
+    return bytes(frame)
+
+
+class Mp3FrameStitcher:
+    """MP3帧级拼接器 - 不解码不重编码，把多个MP3片段按帧拼成一个文件
+
+    保留第一个片段的ID3v2标签，丢掉所有片段自带的Xing/Info/VBRI信息帧，
+    在音频前写入一个新的信息帧，finish()时回填总帧数和总字节数。
+    输出文件需要可seek；内存占用只有一个读块，与总长度无关。
+    """
+
+    def __init__(self, output_file: BinaryIO):
+        self.output_file = output_file
+        self.segment_count = 0
+        self.frame_count = 0
+        self.audio_bytes = 0
+        self.duration = 0.0
+        self._template: Optional[FrameHeader] = None
+        self._info_offset: Optional[int] = None
+        self._info_length = 0
+        self._bitrates = set()
+
+    def write(self, data: bytes) -> None:
+        """追加一个完整的MP3片段（内存中的数据）"""
+        self.add_stream(io.BytesIO(data))
+
+    def add_file(self, path: str) -> None:
+        """追加一个MP3文件，按块读取"""
+        with open(path, 'rb') as f:
+            self.add_stream(f)
+
+    def add_stream(self, stream: BinaryIO) -> None:
+        if self.segment_count == 0:
+            # 第一个片段的ID3v2标签原样保留
+            head = stream.read(10)
+            tag_length = id3v2_length(head)
+            if tag_length:
+                self.output_file.write(head)
+                remaining = tag_length - len(head)
+                while remaining > 0:
+                    chunk = stream.read(min(remaining, READ_CHUNK_SIZE))
+                    if not chunk:
+                        break
+                    self.output_file.write(chunk)
+                    remaining -= len(chunk)
+            else:
+                stream.seek(-len(head), io.SEEK_CUR)
+        self.segment_count += 1
+
+        first_frame = True
+        for header, frame in iter_frames(stream):
+            if first_frame:
+                first_frame = False
+                if header.layer == 3 and is_vbr_header_frame(header, frame):
+                    continue
+            if self._template is None:
+                self._write_info_placeholder(header)
+            self.output_file.write(frame)
+            self.frame_count += 1
+            self.audio_bytes += len(frame)
+            self.duration += header.duration
+            self._bitrates.add(header.bitrate)
+
+    def flush(self) -> None:
+        self.output_file.flush()
+
+    def finish(self) -> None:
+        """回填信息帧里的总帧数和总字节数"""
+        if self._info_offset is None:
+            return
+        info_frame = build_info_frame(
+            self._template, self.frame_count,
+            self._info_length + self.audio_bytes, len(self._bitrates) > 1
+        )
+        end = self.output_file.tell()
+        self.output_file.seek(self._info_offset)
+        self.output_file.write(info_frame)
+        self.output_file.seek(end)
+        self.output_file.flush()
+
+    def _write_info_placeholder(self, header: FrameHeader) -> None:
+        self._template = header
+        placeholder = b''
+        if header.layer == 3:
+            placeholder = build_info_frame(header, 0, 0, False)
+        self._info_offset = self.output_file.tell() if placeholder else None
+        self._info_length = len(placeholder)
+        self.output_file.write(placeholder)
+
+
+def stitch_files(input_paths: List[str], output_path: str) -> Mp3FrameStitcher:
+    """把多个MP3文件按顺序帧级拼接到output_path，返回拼接器（含帧数、时长等统计）"""
+    with open(output_path, 'wb') as output_file:
+        stitcher = Mp3FrameStitcher(output_file)
+        for path in input_paths:
+            stitcher.add_file(path)
+        stitcher.finish()
+    return stitcher
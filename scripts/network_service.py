@@ -0,0 +1,172 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set
+
+import certifi
+from PyQt5.QtCore import QObject, QCoreApplication, QTimer, pyqtSignal
+
+from http_sessions import HttpSessionPool
+from pdf_download import SegmentedDownloader, DownloadCancelled
+from mirror_selector import MirrorSelector
+
+
+class NetworkReply(QObject):
+    """一次后台网络任务的句柄 - 结果通过信号回到GUI线程
+
+    任务结束时只会发出finished_signal、error_signal、cancelled_signal三者之一，
+    而且总是在GUI线程里、在提交任务的那次调用返回之后发出，调用方拿到reply后再连接信号不会错过。
+    cancel()只是设置标志，任务在下一次检查时停下；已经在等待服务器响应的请求会等到超时或返回。
+    """
+
+    progress_signal = pyqtSignal(int, int, float, float)  # 已完成字节, 总字节, 速度(字节/秒), 剩余秒数
+    finished_signal = pyqtSignal(object)
+    error_signal = pyqtSignal(str)
+    cancelled_signal = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def is_done(self) -> bool:
+        return self._done.is_set()
+
+    def report_progress(self, done: int, total: int, speed: float = 0.0, eta: float = -1.0) -> None:
+        """供任务在后台线程里调用"""
+        self.progress_signal.emit(done, total, speed, eta)
+
+
+class NetworkService(QObject):
+    """后台网络服务 - 所有联网操作都在这里的线程池里执行，GUI线程不再等待网络
+
+    submit()提交任意任务，任务函数在后台线程里以NetworkReply为参数调用，返回值就是结果；
+    get()、download()是常用任务的简便写法。连接由HttpSessionPool按主机复用。
+    程序退出前取消所有未完成的任务，避免线程池等待下载结束。
+    """
+
+    MAX_WORKERS = 4
+    READ_CHUNK = 64 * 1024
+    TIMEOUT = 15
+
+    _task_done = pyqtSignal(object, object, tuple)  # reply, 要发出的信号, 参数
+
+    _instance = None
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS, thread_name_prefix="network")
+        # 未完成的任务；持有引用，保证任务结束前NetworkReply不被回收
+        self._replies: Set[NetworkReply] = set()
+        self._keyed: Dict[str, NetworkReply] = {}
+        # 任务线程通过这个信号把结果交回GUI线程，再由GUI线程发出reply的信号
+        self._task_done.connect(self._finish)
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.cancel_all)
+
+    @classmethod
+    def shared(cls) -> "NetworkService":
+        """进程内共用一个实例，需在GUI线程里首次调用"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def submit(self, task: Callable[[NetworkReply], Any], key: Optional[str] = None) -> NetworkReply:
+        """
+        在后台执行task(reply)
+
+        Args:
+            task: 任务函数，抛出DownloadCancelled或在reply已取消时结束都算取消
+            key: 相同key的任务还没结束时直接返回那个任务的NetworkReply，不重复执行；
+                结果在GUI线程里发出，之后再连接的调用方同样能收到
+        """
+        if key is not None:
+            running = self._keyed.get(key)
+            if running is not None and not running.is_done():
+                return running
+        reply = NetworkReply()
+        self._replies.add(reply)
+        if key is not None:
+            self._keyed[key] = reply
+        # 等调用方连接好信号、回到事件循环后再开始，很快结束的任务也不会在连接前发出进度
+        QTimer.singleShot(0, lambda: self._executor.submit(self._run, task, reply))
+        return reply
+
+    def get(self, url: str, timeout: Optional[float] = None) -> NetworkReply:
+        """下载url的内容，finished_signal的结果是bytes"""
+        def task(reply: NetworkReply) -> bytes:
+            session = HttpSessionPool.shared().session_for(url)
+            with session.get(url, stream=True, verify=certifi.where(),
+                             timeout=timeout or self.TIMEOUT) as response:
+                response.raise_for_status()
+                total = int(response.headers.get('Content-Length') or 0)
+                chunks = []
+                done = 0
+                for chunk in response.iter_content(chunk_size=self.READ_CHUNK):
+                    if reply.is_cancelled():
+                        raise DownloadCancelled()
+                    chunks.append(chunk)
+                    done += len(chunk)
+                    reply.report_progress(done, total)
+                return b''.join(chunks)
+        return self.submit(task)
+
+    def download(self, url: str, dest_path: str, expected_size: Optional[int] = None,
+                 expected_sha: Optional[str] = None, acceleration: Optional[int] = None) -> NetworkReply:
+        """
+        下载到文件，finished_signal的结果是文件路径
+
+        Args:
+            acceleration: GitHub下载加速设置；为None时直接下载url，
+                否则url为GitHub原始地址，由MirrorSelector按设置选择线路
+        """
+        def task(reply: NetworkReply) -> str:
+            if acceleration is None:
+                return SegmentedDownloader().download(
+                    url, dest_path, expected_size, expected_sha,
+                    progress=reply.report_progress, is_cancelled=reply.is_cancelled
+                )
+            return MirrorSelector.shared().download(
+                url, dest_path, expected_size, expected_sha,
+                progress=reply.report_progress, is_cancelled=reply.is_cancelled,
+                acceleration=acceleration
+            )
+        return self.submit(task)
+
+    def cancel_all(self) -> None:
+        for reply in list(self._replies):
+            reply.cancel()
+
+    def _run(self, task: Callable[[NetworkReply], Any], reply: NetworkReply) -> None:
+        """在任务线程里执行"""
+        signal, args = reply.cancelled_signal, ()
+        try:
+            if not reply.is_cancelled():
+                result = task(reply)
+                if not reply.is_cancelled():
+                    signal, args = reply.finished_signal, (result,)
+        except DownloadCancelled:
+            pass
+        except Exception as e:
+            if not reply.is_cancelled():
+                signal, args = reply.error_signal, (str(e),)
+        self._task_done.emit(reply, signal, args)
+
+    def _finish(self, reply: NetworkReply, signal, args: tuple) -> None:
+        """在GUI线程里发出结果并释放任务
+
+        标记结束和发信号都在GUI线程里，submit()看到任务还没结束时，
+        调用方连接的信号一定来得及收到结果；结束之后用同一个key提交的任务会重新执行
+        """
+        reply._done.set()
+        self._replies.discard(reply)
+        for key, keyed in list(self._keyed.items()):
+            if keyed is reply:
+                del self._keyed[key]
+        signal.emit(*args)
@@ -0,0 +1,448 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from typing import Callable, Deque, List, Optional, Tuple
+
+import requests
+import certifi
+
+from http_sessions import HttpSessionPool
+
+
+# 进度回调参数：已下载字节, 总字节(未知为0), 速度(字节/秒), 剩余秒数(未知为-1)
+ProgressCallback = Callable[[int, int, float, float], None]
+
+
+class DownloadCancelled(Exception):
+    """下载被用户取消，.part文件保留，下次从断点继续"""
+
+
+class DownloadError(Exception):
+    """下载失败（重试用尽、服务器返回错误或校验不通过）"""
+
+
+def git_blob_sha(file_path: str, block_bytes: int = 1024 * 1024) -> str:
+    """计算文件的Git blob SHA，与GitHub contents API返回的sha字段一致"""
+    digest = hashlib.sha1(f"blob {os.path.getsize(file_path)}\0".encode())
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_bytes), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TransferMeter:
+    """吞吐量统计 - 按最近几秒的滑动窗口计算速度，避免开头的慢启动拖低整体估计"""
+
+    WINDOW_SECONDS = 5.0
+
+    def __init__(self):
+        self._samples: Deque[Tuple[float, int]] = deque()
+
+    def add(self, done: int) -> None:
+        now = time.monotonic()
+        self._samples.append((now, done))
+        while len(self._samples) > 2 and now - self._samples[0][0] > self.WINDOW_SECONDS:
+            self._samples.popleft()
+
+    def speed(self) -> float:
+        if len(self._samples) < 2:
+            return 0.0
+        (start_time, start_done), (end_time, end_done) = self._samples[0], self._samples[-1]
+        elapsed = end_time - start_time
+        return (end_done - start_done) / elapsed if elapsed > 0 else 0.0
+
+    def eta(self, done: int, total: int) -> float:
+        speed = self.speed()
+        if total <= 0 or speed <= 0:
+            return -1.0
+        return max(total - done, 0) / speed
+
+
+class ResumableDownloader:
+    """断点续传下载器 - 边下载边写入<目标文件>.part，不在内存里拼接整个文件
+
+    - 连接中断后用Range请求从已写入的位置继续，连续失败max_retries次才放弃
+    - 服务器不支持Range（返回200）时从头重新下载
+    - 全部下载完成后校验大小和Git blob SHA，通过后才原子地重命名为目标文件，
+      所以目标文件要么不存在，要么是完整的
+    """
+
+    CHUNK_BYTES = 256 * 1024
+    MAX_RETRIES = 5
+    RETRY_DELAY = 1.0  # 第n次重试前等待RETRY_DELAY * n秒
+    TIMEOUT = (10, 30)  # 连接超时, 读取超时
+    PROGRESS_INTERVAL = 0.1  # 进度回调的最小间隔(秒)
+    PART_SUFFIX = '.part'
+
+    RETRYABLE_ERRORS = (
+        requests.ConnectionError,
+        requests.Timeout,
+        requests.exceptions.ChunkedEncodingError,
+    )
+
+    def __init__(self, session: Optional[requests.Session] = None, max_retries: Optional[int] = None):
+        # 不指定会话时用HttpSessionPool里对应主机的会话，复用已有连接
+        self.session = session
+        # 有备用线路时可以少重试几次，尽快切换
+        self.max_retries = self.MAX_RETRIES if max_retries is None else max_retries
+
+    def _session_for(self, url: str) -> requests.Session:
+        return self.session or HttpSessionPool.shared().session_for(url)
+
+    def download(self, url: str, dest_path: str, expected_size: Optional[int] = None,
+                 expected_sha: Optional[str] = None, progress: Optional[ProgressCallback] = None,
+                 is_cancelled: Optional[Callable[[], bool]] = None) -> str:
+        """
+        下载url到dest_path，返回dest_path
+
+        Args:
+            url: 下载地址
+            dest_path: 目标文件路径
+            expected_size: 文件大小，已知时用于续传判断和完成后的校验
+            expected_sha: Git blob SHA，已知时完成后校验
+            progress: 进度回调
+            is_cancelled: 返回True时停止下载并抛出DownloadCancelled
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+        part_path = dest_path + self.PART_SUFFIX
+        meter = TransferMeter()
+        failures = 0
+
+        while True:
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            if expected_size is not None and offset > expected_size:
+                # 残留的.part比文件还大，不可能是同一个文件
+                os.remove(part_path)
+                offset = 0
+            if expected_size is not None and offset == expected_size:
+                break
+
+            before = offset
+            try:
+                if self._fetch(url, part_path, offset, expected_size, meter, progress, is_cancelled):
+                    break
+            except self.RETRYABLE_ERRORS as e:
+                written = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+                # 有进展就重新计数，只有连续失败才放弃
+                failures = 1 if written > before else failures + 1
+                if failures > self.max_retries:
+                    raise DownloadError(f"网络连接多次中断: {e}")
+                print(f"下载中断，{self.RETRY_DELAY * failures:.0f}秒后从{written}字节处继续: {e}")
+                time.sleep(self.RETRY_DELAY * failures)
+
+        self._verify(part_path, expected_size, expected_sha)
+        os.replace(part_path, dest_path)
+        return dest_path
+
+    def _fetch(self, url: str, part_path: str, offset: int, expected_size: Optional[int],
+               meter: TransferMeter, progress: Optional[ProgressCallback],
+               is_cancelled: Optional[Callable[[], bool]]) -> bool:
+        """发出一次请求并写入数据，返回True表示服务器已经发完整个文件"""
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        with self._session_for(url).get(url, headers=headers, stream=True,
+                              verify=certifi.where(), timeout=self.TIMEOUT) as response:
+            if response.status_code == 416 and offset:
+                # 请求的起点已经超出文件末尾：大小未知时说明.part已经完整，否则重新下载
+                if expected_size is None:
+                    return True
+                os.remove(part_path)
+                return False
+            response.raise_for_status()
+
+            if offset and response.status_code != 206:
+                print("服务器不支持断点续传，重新下载")
+                offset = 0
+            elif offset and self._content_range_start(response) != offset:
+                raise DownloadError("服务器返回的数据范围与请求不一致")
+
+            total = expected_size or self._total_size(response, offset)
+            done = offset
+            last_report = 0.0
+            meter.add(done)
+            with open(part_path, 'ab' if offset else 'wb') as file:
+                for chunk in response.iter_content(chunk_size=self.CHUNK_BYTES):
+                    if is_cancelled is not None and is_cancelled():
+                        raise DownloadCancelled()
+                    if not chunk:
+                        continue
+                    file.write(chunk)
+                    done += len(chunk)
+                    meter.add(done)
+                    now = time.monotonic()
+                    if progress is not None and now - last_report >= self.PROGRESS_INTERVAL:
+                        last_report = now
+                        progress(done, total, meter.speed(), meter.eta(done, total))
+            if progress is not None:
+                progress(done, total, meter.speed(), meter.eta(done, total))
+
+            # 连接被提前关闭时iter_content不一定报错，按已知大小判断是否需要续传
+            if total and done < total:
+                raise requests.exceptions.ChunkedEncodingError(f"连接提前关闭，已接收{done}/{total}字节")
+            return True
+
+    @staticmethod
+    def _content_range_start(response: requests.Response) -> int:
+        # Content-Range: bytes 100-199/1000
+        content_range = response.headers.get('Content-Range', '')
+        try:
+            return int(content_range.split()[1].split('-')[0])
+        except (IndexError, ValueError):
+            return -1
+
+    @staticmethod
+    def _total_size(response: requests.Response, offset: int) -> int:
+        content_range = response.headers.get('Content-Range', '')
+        if '/' in content_range and not content_range.endswith('/*'):
+            return int(content_range.rsplit('/', 1)[1])
+        length = response.headers.get('Content-Length')
+        # 经过gzip等编码时Content-Length不是文件大小
+        if length and not response.headers.get('Content-Encoding'):
+            return offset + int(length)
+        return 0
+
+    @staticmethod
+    def _verify(part_path: str, expected_size: Optional[int], expected_sha: Optional[str]) -> None:
+        """校验不通过时删除.part，下次从头下载"""
+        size = os.path.getsize(part_path)
+        if expected_size is not None and size != expected_size:
+            os.remove(part_path)
+            raise DownloadError(f"文件大小不符: 应为{expected_size}字节，实际{size}字节")
+        if expected_sha and git_blob_sha(part_path) != expected_sha.lower():
+            os.remove(part_path)
+            raise DownloadError("文件校验失败，下载的内容已损坏")
+
+
+
+class _SharedProgress:
+    """分段下载时各线程共用的进度和停止标志"""
+
+    def __init__(self, done: int, total: int, progress: Optional[ProgressCallback],
+                 is_cancelled: Optional[Callable[[], bool]], interval: float):
+        self.done = done
+        self.total = total
+        self.meter = TransferMeter()
+        self.meter.add(done)
+        self.stop = threading.Event()
+        self._progress = progress
+        self._is_cancelled = is_cancelled
+        self._interval = interval
+        self._last_report = 0.0
+        self._lock = threading.Lock()
+
+    def check(self) -> None:
+        """用户取消或其他分段已经失败时，让当前线程停下"""
+        if self.stop.is_set() or (self._is_cancelled is not None and self._is_cancelled()):
+            self.stop.set()
+            raise DownloadCancelled()
+
+    def add(self, count: int, force: bool = False) -> None:
+        with self._lock:
+            self.done += count
+            self.meter.add(self.done)
+            now = time.monotonic()
+            if self._progress is not None and (force or now - self._last_report >= self._interval):
+                self._last_report = now
+                self._progress(self.done, self.total, self.meter.speed(),
+                               self.meter.eta(self.done, self.total))
+
+
+class SegmentedDownloader(ResumableDownloader):
+    """分段并行下载器 - 把大文件切成若干字节范围，用几个连接同时下载
+
+    - 先用bytes=0-0的请求探测服务器是否支持Range；不支持、或文件较小时
+      退回ResumableDownloader的单连接下载
+    - .part文件预先分配到完整大小，各线程直接写到自己负责的位置；
+      各段的进度保存在.part.json里，取消或中断后只补下载缺的部分
+    - 下载过程中每隔STATE_SAVE_INTERVAL秒保存一次进度，进程被强制结束也只损失最后几秒；
+      记录的字节都已经交给操作系统，保存的进度不会超过.part里实际写入的内容
+    - 没有进度文件时不信任已有的.part：预分配的文件和完整文件一样大，看不出哪些部分写过
+    - 分段数多于连接数，快的连接会多领几段，不会被单个慢连接拖住
+    """
+
+    CONNECTIONS = 4
+    SEGMENT_BYTES = 8 * 1024 * 1024
+    MIN_SEGMENTED_BYTES = 16 * 1024 * 1024  # 小于这个大小的文件分段没有意义
+    STATE_SUFFIX = '.part.json'
+    STATE_SAVE_INTERVAL = 1.0
+
+    def __init__(self, session: Optional[requests.Session] = None, connections: Optional[int] = None,
+                 max_retries: Optional[int] = None, keep_progress: bool = False):
+        # 会话的连接池要容纳所有并发连接（HttpSessionPool.POOL_MAXSIZE），否则多出来的连接用完就被丢弃
+        self.connections = connections or self.CONNECTIONS
+        # 为True时，服务器不支持Range或文件大小对不上就抛出DownloadError，保留已有的分段进度，
+        # 让调用方换一条线路；为False时丢弃进度，从头下载
+        self.keep_progress = keep_progress
+        super().__init__(session, max_retries)
+
+    def download(self, url: str, dest_path: str, expected_size: Optional[int] = None,
+                 expected_sha: Optional[str] = None, progress: Optional[ProgressCallback] = None,
+                 is_cancelled: Optional[Callable[[], bool]] = None) -> str:
+        """参数和返回值同ResumableDownloader.download"""
+        os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+        part_path = dest_path + self.PART_SUFFIX
+        state_path = dest_path + self.STATE_SUFFIX
+
+        total = self._probe_range_support(url, expected_size) if self.connections > 1 else 0
+        if total < self.MIN_SEGMENTED_BYTES:
+            if self.keep_progress and os.path.exists(state_path):
+                raise DownloadError("这条线路不支持分段续传或文件大小不符，保留已下载的进度")
+            # 预分配过的.part不能按单连接的方式续传，否则会被当成已经下完
+            self._discard_untracked_part(part_path, state_path, expected_size)
+            return super().download(url, dest_path, expected_size, expected_sha, progress, is_cancelled)
+
+        segments = self._load_segments(state_path, part_path, total)
+        if segments is None:
+            segments = self._plan_segments(total)
+            # 先写进度文件再预分配，任何时候.part旁边都有对应的进度文件
+            self._save_segments(state_path, total, segments)
+            with open(part_path, 'wb') as file:
+                file.truncate(total)
+
+        shared = _SharedProgress(sum(segment[2] for segment in segments), total,
+                                 progress, is_cancelled, self.PROGRESS_INTERVAL)
+        remaining = [segment for segment in segments if segment[2] < segment[1] - segment[0] + 1]
+        try:
+            with ThreadPoolExecutor(max_workers=self.connections) as executor:
+                pending = {executor.submit(self._fetch_segment, url, part_path, segment, shared)
+                           for segment in remaining}
+                try:
+                    while pending:
+                        finished, pending = wait(pending, timeout=self.STATE_SAVE_INTERVAL,
+                                                 return_when=FIRST_EXCEPTION)
+                        for future in finished:
+                            future.result()
+                        self._save_segments(state_path, total, segments)
+                except BaseException:
+                    # 先失败的异常向上抛出，其余线程看到stop后各自退出
+                    shared.stop.set()
+                    raise
+        finally:
+            self._save_segments(state_path, total, segments)
+        shared.add(0, force=True)
+
+        try:
+            self._verify(part_path, expected_size if expected_size is not None else total, expected_sha)
+        except DownloadError:
+            self._remove_files(state_path)
+            raise
+        os.replace(part_path, dest_path)
+        self._remove_files(state_path)
+        return dest_path
+
+    def _discard_untracked_part(self, part_path: str, state_path: str, expected_size: Optional[int]) -> None:
+        """单连接下载前清理不能续传的.part
+
+        有进度文件说明.part是预分配的；没有进度文件但.part已经是完整大小时，
+        可能是旧版本预分配后还没来得及保存进度就被结束了，同样不能当成下完
+        """
+        if os.path.exists(state_path):
+            self._remove_files(part_path, state_path)
+        elif (expected_size is not None and os.path.exists(part_path)
+              and os.path.getsize(part_path) >= expected_size):
+            self._remove_files(part_path)
+
+    def _probe_range_support(self, url: str, expected_size: Optional[int]) -> int:
+        """服务器支持Range时返回文件大小，否则返回0；连不上时重试，仍然失败就抛出DownloadError
+
+        连不上时不能退回单连接下载，否则会丢掉已保存的分段进度
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._session_for(url).get(url, headers={'Range': 'bytes=0-0'}, stream=True,
+                                                verify=certifi.where(), timeout=self.TIMEOUT) as response:
+                    if response.status_code != 206:
+                        response.raise_for_status()
+                        return 0
+                    total = self._total_size(response, 0)
+                break
+            except self.RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise DownloadError(f"无法连接下载服务器: {e}")
+                time.sleep(self.RETRY_DELAY * (attempt + 1))
+        if expected_size is not None and total != expected_size:
+            return 0
+        return total
+
+    def _fetch_segment(self, url: str, part_path: str, segment: List[int],
+                       shared: _SharedProgress) -> None:
+        """下载一段[start, end]，segment[2]记录这一段已写入的字节数"""
+        start, end = segment[0], segment[1]
+        length = end - start + 1
+        failures = 0
+        while segment[2] < length:
+            shared.check()
+            before = segment[2]
+            position = start + segment[2]
+            try:
+                with self._session_for(url).get(url, headers={'Range': f'bytes={position}-{end}'}, stream=True,
+                                      verify=certifi.where(), timeout=self.TIMEOUT) as response:
+                    response.raise_for_status()
+                    if response.status_code != 206 or self._content_range_start(response) != position:
+                        raise DownloadError("服务器返回的数据范围与请求不一致")
+                    # 不用缓冲，写入的数据直接交给操作系统，定时保存的进度不会超过实际写入的位置
+                    with open(part_path, 'r+b', buffering=0) as file:
+                        file.seek(position)
+                        for chunk in response.iter_content(chunk_size=self.CHUNK_BYTES):
+                            shared.check()
+                            chunk = chunk[:length - segment[2]]
+                            if not chunk:
+                                continue
+                            self._write_all(file, chunk)
+                            segment[2] += len(chunk)
+                            shared.add(len(chunk))
+                if segment[2] < length:
+                    raise requests.exceptions.ChunkedEncodingError(
+                        f"连接提前关闭，分段{start}-{end}已接收{segment[2]}/{length}字节")
+            except self.RETRYABLE_ERRORS as e:
+                failures = 1 if segment[2] > before else failures + 1
+                if failures > self.max_retries:
+                    raise DownloadError(f"网络连接多次中断: {e}")
+                print(f"分段{start}-{end}下载中断，稍后继续: {e}")
+                time.sleep(self.RETRY_DELAY * failures)
+
+    @staticmethod
+    def _write_all(file, data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            view = view[file.write(view):]
+
+    @classmethod
+    def _plan_segments(cls, total: int) -> List[List[int]]:
+        """切分为[起点, 终点(含), 已下载字节数]的列表"""
+        return [[start, min(start + cls.SEGMENT_BYTES, total) - 1, 0]
+                for start in range(0, total, cls.SEGMENT_BYTES)]
+
+    @staticmethod
+    def _load_segments(state_path: str, part_path: str, total: int) -> Optional[List[List[int]]]:
+        """读取上次中断时保存的分段进度，与当前文件对不上时返回None"""
+        try:
+            with open(state_path, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+            if state.get('total') != total or os.path.getsize(part_path) != total:
+                return None
+            return [list(segment) for segment in state['segments']]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    @staticmethod
+    def _save_segments(state_path: str, total: int, segments: List[List[int]]) -> None:
+        """写临时文件再替换，保存到一半被结束也不会留下损坏的进度文件"""
+        # 下载线程还在更新计数，先复制一份
+        snapshot = [list(segment) for segment in segments]
+        temp_path = state_path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump({'total': total, 'segments': snapshot}, file)
+            os.replace(temp_path, state_path)
+        except OSError as e:
+            print(f"保存下载进度失败: {e}")
+
+    @staticmethod
+    def _remove_files(*paths: str) -> None:
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,245 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from typing import List, Optional
+
+try:
+    import fitz  # PyMuPDF
+    FITZ_AVAILABLE = True
+except ImportError:
+    FITZ_AVAILABLE = False
+
+
+class PdfLibrary:
+    """本地教材库索引 - 用SQLite记录downloaded_pdfs目录里每本PDF的信息
+
+    每本书按安全文件名（与保存时的文件名规则一致）作主键，查找只是一次主键查询加一次stat，
+    不再每次列目录、逐个跑正则。记录内容：文件大小、Git blob SHA、页数、页码标签、
+    页码偏移量（可以为负）、加入时间和最近使用时间。
+    目录总大小超过配额时，按最近使用时间删除最久没用过的书。
+    第一次建立索引时在后台线程里登记目录里已有的PDF（要逐个打开读取页码标签），不卡住界面。
+    """
+
+    DB_FILENAME = "library.sqlite3"
+    DEFAULT_QUOTA_BYTES = 2 * 1024 * 1024 * 1024
+    SCHEMA_VERSION = 1
+    ACCESS_RESOLUTION = 60.0  # 最近使用时间的精度(秒)，避免每次查找都写库
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, library_dir: str, quota_bytes: int = DEFAULT_QUOTA_BYTES):
+        self.library_dir = library_dir
+        self.quota_bytes = quota_bytes
+        os.makedirs(library_dir, exist_ok=True)
+        # 连接由锁保护，允许在后台线程里使用
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(os.path.join(library_dir, self.DB_FILENAME), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._scan_thread: Optional[threading.Thread] = None
+        self._init_schema()
+
+    @classmethod
+    def shared(cls) -> "PdfLibrary":
+        with cls._instance_lock:
+            if cls._instance is None:
+                program_dir = os.path.dirname(os.path.abspath(__file__))
+                cls._instance = cls(os.path.join(program_dir, "downloaded_pdfs"))
+            return cls._instance
+
+    @staticmethod
+    def safe_name(pdf_name: str) -> str:
+        """保存到本地时使用的文件名"""
+        return re.sub(r'[^\w\-_.]', '_', pdf_name)
+
+    def path_for(self, pdf_name: str) -> str:
+        """PDF在库目录下的保存路径"""
+        return os.path.join(self.library_dir, self.safe_name(pdf_name))
+
+    def contains_path(self, path: str) -> bool:
+        return os.path.normcase(os.path.dirname(os.path.abspath(path))) == \
+            os.path.normcase(os.path.abspath(self.library_dir))
+
+    # 查询
+    def find(self, pdf_name: str) -> Optional[str]:
+        """查找本地的PDF，找到时更新最近使用时间并返回路径
+
+        索引里有记录但文件已被删掉时清除记录；文件在但没有记录（例如手动放进目录）时补登记
+        """
+        name = self.safe_name(pdf_name)
+        with self._lock:
+            row = self._db.execute("SELECT path, last_access FROM books WHERE name = ?", (name,)).fetchone()
+            if row is not None:
+                if os.path.exists(row['path']):
+                    now = time.time()
+                    if now - row['last_access'] > self.ACCESS_RESOLUTION:
+                        self._db.execute("UPDATE books SET last_access = ? WHERE name = ?", (now, name))
+                        self._db.commit()
+                    return row['path']
+                self._db.execute("DELETE FROM books WHERE name = ?", (name,))
+                self._db.commit()
+                return None
+        path = self.path_for(pdf_name)
+        if os.path.isfile(path):
+            self.add(path, enforce_quota=False)
+            return path
+        return None
+
+    def get_sha(self, pdf_name: str) -> Optional[str]:
+        """下载时校验过的Git blob SHA，不是从仓库下载的书返回None"""
+        with self._lock:
+            row = self._db.execute("SELECT sha FROM books WHERE name = ?",
+                                   (self.safe_name(pdf_name),)).fetchone()
+        return row['sha'] if row is not None else None
+
+    def get_page_offset(self, pdf_name: str) -> Optional[int]:
+        """页码偏移量（实际页码 - 书上印的页码），没有设置过时返回None"""
+        with self._lock:
+            row = self._db.execute("SELECT page_offset FROM books WHERE name = ?",
+                                   (self.safe_name(pdf_name),)).fetchone()
+        return row['page_offset'] if row is not None else None
+
+    def set_page_offset(self, pdf_name: str, offset: int) -> bool:
+        """保存页码偏移量，书不在库里时返回False"""
+        with self._lock:
+            cursor = self._db.execute("UPDATE books SET page_offset = ? WHERE name = ?",
+                                      (int(offset), self.safe_name(pdf_name)))
+            self._db.commit()
+            return cursor.rowcount > 0
+
+    def page_index_for_label(self, pdf_name: str, label: str) -> Optional[int]:
+        """按PDF自带的页码标签找到页面索引（从0开始），PDF没有页码标签时返回None"""
+        with self._lock:
+            row = self._db.execute("SELECT page_labels FROM books WHERE name = ?",
+                                   (self.safe_name(pdf_name),)).fetchone()
+        if row is None or not row['page_labels']:
+            return None
+        return json.loads(row['page_labels']).get(label)
+
+    def total_size(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM books").fetchone()[0]
+
+    # 登记和清理
+    def add(self, path: str, sha: Optional[str] = None, source_path: str = "",
+            enforce_quota: bool = True) -> None:
+        """登记一本PDF（下载完成后调用），读取页数和页码标签；已有记录时保留偏移量"""
+        name = self.safe_name(os.path.basename(path))
+        page_count, page_labels = self._read_page_info(path)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                """INSERT INTO books (name, path, size, sha, source_path, page_count, page_labels,
+                                      added, last_access)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(name) DO UPDATE SET
+                       path = excluded.path, size = excluded.size,
+                       sha = COALESCE(excluded.sha, books.sha),
+                       source_path = COALESCE(NULLIF(excluded.source_path, ''), books.source_path),
+                       page_count = excluded.page_count, page_labels = excluded.page_labels,
+                       last_access = excluded.last_access""",
+                (name, os.path.abspath(path), os.path.getsize(path), sha, source_path,
+                 page_count, page_labels, now, now)
+            )
+            self._db.commit()
+        if enforce_quota:
+            self.enforce_quota(keep=name)
+
+    def enforce_quota(self, keep: Optional[str] = None) -> List[str]:
+        """总大小超过配额时按最近使用时间删除最久没用的书，返回被删除的文件路径；keep指定的书不删"""
+        removed = []
+        with self._lock:
+            total = self.total_size()
+            if total <= self.quota_bytes:
+                return removed
+            rows = self._db.execute(
+                "SELECT name, path, size FROM books WHERE name != ? ORDER BY last_access",
+                (keep or "",)
+            ).fetchall()
+            for row in rows:
+                if total <= self.quota_bytes:
+                    break
+                try:
+                    if os.path.exists(row['path']):
+                        os.remove(row['path'])
+                except OSError as e:
+                    print(f"清理教材失败: {e}")
+                    continue
+                self._db.execute("DELETE FROM books WHERE name = ?", (row['name'],))
+                total -= row['size']
+                removed.append(row['path'])
+            self._db.commit()
+        if removed:
+            print(f"教材库超出配额，已删除{len(removed)}本最久没用的书")
+        return removed
+
+    # 内部
+    def _init_schema(self) -> None:
+        with self._lock:
+            version = self._db.execute("PRAGMA user_version").fetchone()[0]
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS books (
+                       name TEXT PRIMARY KEY,
+                       path TEXT NOT NULL,
+                       size INTEGER NOT NULL,
+                       sha TEXT,
+                       source_path TEXT,
+                       page_count INTEGER,
+                       page_labels TEXT,
+                       page_offset INTEGER,
+                       added REAL NOT NULL,
+                       last_access REAL NOT NULL
+                   )"""
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS books_last_access ON books (last_access)")
+            self._db.commit()
+        if version == 0:
+            # 扫描完才写入版本号，扫描中途退出时下次重新扫描；扫描期间find()会自己补登记要用的书
+            self._scan_thread = threading.Thread(target=self._scan_existing, name="pdf-library-scan",
+                                                 daemon=True)
+            self._scan_thread.start()
+
+    def _scan_existing(self) -> None:
+        """第一次建立索引时登记目录里已有的PDF，在后台线程里执行"""
+        count = 0
+        for filename in os.listdir(self.library_dir):
+            path = os.path.join(self.library_dir, filename)
+            if not filename.lower().endswith('.pdf') or not os.path.isfile(path):
+                continue
+            with self._lock:
+                known = self._db.execute("SELECT 1 FROM books WHERE name = ?",
+                                         (self.safe_name(filename),)).fetchone()
+            if known:
+                continue
+            try:
+                self.add(path, enforce_quota=False)
+                count += 1
+            except Exception as e:
+                print(f"登记已有教材失败 {filename}: {e}")
+        with self._lock:
+            self._db.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            self._db.commit()
+        if count:
+            print(f"已为{count}本已下载的教材建立索引")
+
+    @staticmethod
+    def _read_page_info(path: str):
+        """返回(页数, 页码标签->页面索引的JSON)；PDF没有页码标签或读不了时相应的值为None"""
+        if not FITZ_AVAILABLE:
+            return None, None
+        try:
+            with fitz.open(path) as doc:
+                page_count = doc.page_count
+                labels = {}
+                if doc.get_page_labels():
+                    for index in range(page_count):
+                        label = doc[index].get_label()
+                        if label and label not in labels:
+                            labels[label] = index
+            return page_count, (json.dumps(labels, ensure_ascii=False) if labels else None)
+        except Exception as e:
+            print(f"读取PDF页面信息失败 {path}: {e}")
+            return None, None
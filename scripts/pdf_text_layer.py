@@ -0,0 +1,176 @@
+import re
+import unicodedata
+from typing import NamedTuple, Optional
+
+try:
+    import fitz  # PyMuPDF
+    FITZ_AVAILABLE = True
+except ImportError:
+    FITZ_AVAILABLE = False
+
+
+class PageText(NamedTuple):
+    """一页的文字层"""
+    text: str
+    superscripts: int  # 保留下来的上标（不是注释角标，多半是指数）个数
+
+
+class TextQuality(NamedTuple):
+    """文字层质量评分"""
+    chars: int  # 非空白字符数
+    cjk_ratio: float  # 汉字占非空白字符的比例
+    readable_ratio: float  # 汉字、ASCII字母数字和常用标点占的比例
+    garbage_ratio: float  # 乱码字符（替换符、私用区、控制字符）占的比例
+    formulas: int = 0  # 上标和数学符号的个数
+
+    def __str__(self):
+        return (f"{self.chars}字, 汉字{self.cjk_ratio:.0%}, "
+                f"可读{self.readable_ratio:.0%}, 乱码{self.garbage_ratio:.1%}, 公式记号{self.formulas}个")
+
+
+class PdfTextLayer:
+    """PDF文字层提取 - 电子版教材自带文字层时直接读出文字，不用渲染成图片再调用AI识别
+
+    扫描版没有文字层或只有页眉页码；部分PDF字体缺少ToUnicode映射，读出来是替换符、
+    私用区字符或Latin-1乱码。score()给文字层打分，is_usable()不通过时再交给AI识别。
+    外文页面也交给AI，识别提示词要求把外文的句号逗号转成中文，文字层做不到。
+    有公式的页面同样交给AI：提示词要求把公式读成文字，而文字层里的指数只是一个上标，
+    b²-4ac读出来是b2-4ac。上标里只去掉注释角标（页面下方有同样编号开头的注释）。
+    """
+
+    MIN_CHARS = 30
+    MIN_CJK_RATIO = 0.3
+    MIN_READABLE_RATIO = 0.9
+    MAX_GARBAGE_RATIO = 0.01
+    MAX_FORMULAS = 0
+    SUPERSCRIPT_FLAG = 1  # PyMuPDF span flags里的上标位
+
+    _CJK_RE = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]')
+    _READABLE_RE = re.compile(
+        r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff0-9A-Za-z'
+        r'\u3000-\u303f\uff01-\uff5e\u2014\u2018\u2019\u201c\u201d\u2026\u00b7'
+        r'!-/:-@\[-`{-~]'
+    )
+    _GARBAGE_RE = re.compile(r'[\ufffd\ue000-\uf8ff\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f]')
+    # 下标数字、罗马数字、带圈/带括号/带点的数字和汉字数字，转成普通数字（与AI识别提示词的要求一致）
+    _ENCLOSED_RE = re.compile(
+        r'[\u2080-\u2089\u2150-\u218f\u2460-\u24ff\u2776-\u2793'
+        r'\u3220-\u3229\u3248-\u324f\u3251-\u325f\u3280-\u3289\u32b1-\u32bf]'
+    )
+    # 注释角标：1~3位数字、带圈数字或星号/剑号
+    _MARKER_RE = re.compile(r'(\d{1,3}(?!\d)|[\u2460-\u2473\u2776-\u277f]|[*\u2020\u2021]+)')
+    # 需要读成文字的数学记号，包括没有标成上标的²³等字符
+    _MATH_RE = re.compile(r'[=\u00b1\u00d7\u00f7\u03c0\u00b2\u00b3\u00b9\u2070-\u207f\u2200-\u22ff]')
+    _CJK_EDGE_RE = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]')
+
+    @classmethod
+    def extract_page(cls, pdf_path: str, page_number: int) -> PageText:
+        """读取一页的文字层（page_number从0开始），没有文字层时文字为空字符串"""
+        if not FITZ_AVAILABLE:
+            return PageText("", 0)
+        with fitz.open(pdf_path) as doc:
+            if page_number < 0 or page_number >= doc.page_count:
+                raise ValueError(f"页码超出范围，共{doc.page_count}页")
+            page_dict = doc.load_page(page_number).get_text("dict", sort=True)
+
+        blocks = [[line.get('spans', []) for line in block.get('lines', [])]
+                  for block in page_dict.get('blocks', []) if block.get('type') == 0]  # 跳过图片块
+        # 每行开头的编号和所在高度，用来认出注释
+        line_markers = []
+        for block in blocks:
+            for spans in block:
+                match = cls._MARKER_RE.match("".join(span['text'] for span in spans).lstrip())
+                if match and spans:
+                    line_markers.append((match.group(), spans[0]['bbox'][1]))
+
+        superscripts = 0
+        paragraphs = []
+        for block in blocks:
+            lines = []
+            for spans in block:
+                parts = []
+                for span in spans:
+                    if span.get('flags', 0) & cls.SUPERSCRIPT_FLAG:
+                        if cls._is_footnote_marker(span, not "".join(parts).strip(), line_markers):
+                            continue
+                        if span['text'].strip():
+                            superscripts += 1
+                    parts.append(span['text'])
+                text = "".join(parts).strip()
+                if text:
+                    lines.append(text)
+            if lines:
+                paragraphs.append(cls._join_lines(lines))
+        return PageText(cls.normalize("\n".join(paragraphs)), superscripts)
+
+    @classmethod
+    def _is_footnote_marker(cls, span: dict, at_line_start: bool, line_markers) -> bool:
+        """上标是编号，并且在注释行开头、或者下方有以同样编号开头的注释"""
+        marker = span['text'].strip()
+        if not cls._MARKER_RE.fullmatch(marker):
+            return False
+        if at_line_start:
+            return True
+        top = span['bbox'][1]
+        return any(other == marker and other_top > top for other, other_top in line_markers)
+
+    @classmethod
+    def _join_lines(cls, lines) -> str:
+        """把一个文字块里自动换行的各行接起来：中文直接相连，西文之间补空格"""
+        result = lines[0]
+        for line in lines[1:]:
+            if result.endswith('-') and not result.endswith('--'):
+                result = result[:-1] + line
+            elif cls._CJK_EDGE_RE.match(result[-1]) or cls._CJK_EDGE_RE.match(line[0]):
+                result += line
+            else:
+                result += " " + line
+        return result
+
+    @classmethod
+    def normalize(cls, text: str) -> str:
+        return cls._ENCLOSED_RE.sub(cls._plain_number, text)
+
+    @staticmethod
+    def _plain_number(match) -> str:
+        """①⑶⒋Ⅴ❻㈦₁等按数值转成1 3 4 5 6 7 1；分数和带圈字母等按兼容分解处理"""
+        char = match.group()
+        value = unicodedata.numeric(char, None)
+        if value is not None and value == int(value):
+            return str(int(value))
+        return unicodedata.normalize('NFKC', char)
+
+    @classmethod
+    def score(cls, text: str, superscripts: int = 0) -> TextQuality:
+        compact = re.sub(r'\s+', '', text)
+        chars = len(compact)
+        if not chars:
+            return TextQuality(0, 0.0, 0.0, 0.0, superscripts)
+        return TextQuality(
+            chars,
+            len(cls._CJK_RE.findall(compact)) / chars,
+            len(cls._READABLE_RE.findall(compact)) / chars,
+            len(cls._GARBAGE_RE.findall(compact)) / chars,
+            superscripts + len(cls._MATH_RE.findall(compact)),
+        )
+
+    @classmethod
+    def is_usable(cls, quality: TextQuality) -> bool:
+        return (quality.chars >= cls.MIN_CHARS
+                and quality.cjk_ratio >= cls.MIN_CJK_RATIO
+                and quality.readable_ratio >= cls.MIN_READABLE_RATIO
+                and quality.garbage_ratio <= cls.MAX_GARBAGE_RATIO
+                and quality.formulas <= cls.MAX_FORMULAS)
+
+    @classmethod
+    def extract_usable(cls, pdf_path: str, page_number: int) -> Optional[str]:
+        """读取一页的文字层，质量合格时返回文字，否则返回None（需要AI识别）"""
+        try:
+            page = cls.extract_page(pdf_path, page_number)
+        except Exception as e:
+            print(f"读取PDF文字层失败: {e}")
+            return None
+        quality = cls.score(page.text, page.superscripts)
+        usable = cls.is_usable(quality)
+        print(f"第{page_number + 1}页文字层: {quality}，{'直接使用' if usable else '改用AI识别'}")
+        return page.text if usable else None
@@ -482,11 +482,7 @@ class AudioStretchSection(SettingsSection):
         # 更新显示标签
         self.widgets['audio_stretch_label'].setText(f"{stretch_factor:.2f}")
         
-        # 更新主窗口配置
-        if self.parent.parent_window:
-            self.parent.parent_window.config.stretch_factor = stretch_factor
-            
-        # 保存设置
+        # 保存设置（主窗口通过设置变化信号同步配置）
         success = self.settings_manager.set_stretch_factor(stretch_factor)
         if not success:
             self.parent.parent_window.notification_manager.show_message("无法保存音频拉伸设置", "E", 5000)
@@ -619,7 +615,7 @@ class SettingsPage(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent_window = parent
-        self.settings_manager = SettingsManager()
+        self.settings_manager = SettingsManager.shared()
         self.sections = []
         
         self._init_ui()
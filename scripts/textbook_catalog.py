@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import threading
+from urllib.parse import quote
+from typing import Dict, List, Optional, Tuple
+
+import requests
+import certifi
+
+from http_sessions import HttpSessionPool
+
+
+class TextbookCatalog:
+    """教材仓库目录快照 - 把ChinaTextbook仓库的完整文件树保存在本地
+
+    浏览目录完全从本地快照读取，不再每点一个文件夹就请求一次contents API。
+    刷新分两步：先带ETag条件请求分支的最新提交，没有变化时GitHub返回304；
+    有变化时再按git树的sha比较，只重新获取sha变了的子树。
+    list_dir()返回的条目字段与contents API一致（name/path/type/size/sha/download_url）。
+    """
+
+    REPO = "TapXWorld/ChinaTextbook"
+    BRANCH = "main"
+    API_ROOT = f"https://api.github.com/repos/{REPO}"
+    RAW_ROOT = f"https://raw.githubusercontent.com/{REPO}/{BRANCH}/"
+    TIMEOUT = 15
+    MAX_AGE_SECONDS = 24 * 3600  # 超过一天没检查过就在后台刷新
+    FORMAT_VERSION = 1
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, catalog_path: str, session: Optional[requests.Session] = None):
+        self.catalog_path = catalog_path
+        self.session = session or HttpSessionPool.shared().session_for(self.API_ROOT)
+        self._lock = threading.Lock()
+        # 路径 -> (类型'dir'/'file', git sha, 大小)，按git树的顺序排列
+        self._entries: Dict[str, Tuple[str, str, int]] = {}
+        self._children: Dict[str, List[str]] = {}
+        self._commit = ""
+        self._etag = ""
+        self._checked_at = 0.0
+        self._load()
+
+    @classmethod
+    def shared(cls) -> "TextbookCatalog":
+        """进程内共用一个实例，在线导入和PDF下载两个对话框共享同一份快照"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                program_dir = os.path.dirname(os.path.abspath(__file__))
+                cls._instance = cls(os.path.join(program_dir, "cache", "catalog", "ChinaTextbook.json"))
+            return cls._instance
+
+    # 查询
+    def is_empty(self) -> bool:
+        with self._lock:
+            return not self._entries
+
+    def is_stale(self) -> bool:
+        return time.time() - self._checked_at > self.MAX_AGE_SECONDS
+
+    def list_dir(self, path: str = "") -> List[dict]:
+        """列出目录下的直接子项，目录不存在时返回空列表"""
+        path = path.strip('/')
+        with self._lock:
+            return [self._make_item(child, self._entries[child])
+                    for child in self._children.get(path, ())]
+
+    def _make_item(self, path: str, entry: Tuple[str, str, int]) -> dict:
+        item_type, sha, size = entry
+        item = {
+            'name': path.rsplit('/', 1)[-1],
+            'path': path,
+            'type': item_type,
+            'sha': sha,
+            'size': size,
+        }
+        if item_type == 'file':
+            item['download_url'] = self.RAW_ROOT + quote(path)
+        return item
+
+    # 刷新
+    def refresh(self, force: bool = False) -> bool:
+        """与GitHub同步，返回目录是否有变化；网络错误直接抛出，本地快照保持不变
+
+        force为False且快照还没过期时不发请求
+        """
+        if not force and not self.is_stale() and not self.is_empty():
+            return False
+
+        headers = {'Accept': 'application/vnd.github.sha'}
+        if self._etag and not self.is_empty():
+            headers['If-None-Match'] = self._etag
+        response = self.session.get(f"{self.API_ROOT}/commits/{self.BRANCH}", headers=headers,
+                                    verify=certifi.where(), timeout=self.TIMEOUT)
+        if response.status_code == 304:
+            self._mark_checked(self._etag)
+            return False
+        response.raise_for_status()
+        commit = response.text.strip()
+        etag = response.headers.get('ETag', '')
+        if commit == self._commit and not self.is_empty():
+            self._mark_checked(etag)
+            return False
+
+        with self._lock:
+            old_entries, old_children = self._entries, self._children
+        new_entries: Dict[str, Tuple[str, str, int]] = {}
+        # 第一次下载时一次递归请求拿到整棵树；之后只展开根目录，重新获取sha变了的子树
+        fetched = self._sync_tree("", commit, old_entries, old_children, new_entries,
+                                  recursive=not old_entries)
+        print(f"教材目录已更新: 共{len(new_entries)}项，请求了{fetched}个git树")
+
+        with self._lock:
+            self._entries = new_entries
+            self._children = self._build_children(new_entries)
+            self._commit = commit
+            self._etag = etag
+            self._checked_at = time.time()
+        self._save()
+        return True
+
+    def _mark_checked(self, etag: str) -> None:
+        self._etag = etag
+        self._checked_at = time.time()
+        self._save()
+
+    def _sync_tree(self, prefix: str, sha: str, old_entries: Dict[str, Tuple[str, str, int]],
+                   old_children: Dict[str, List[str]], new_entries: Dict[str, Tuple[str, str, int]],
+                   recursive: bool = True) -> int:
+        """把prefix下的子树同步到new_entries，返回发出的请求数
+
+        recursive为True时先尝试一次递归获取整棵子树；否则（或结果被GitHub截断，
+        超过10万项时）只获取这一层，sha没变的子目录直接沿用旧快照，变了的再递归获取
+        """
+        requests_made = 0
+        if recursive:
+            data = self._fetch_tree(sha, recursive=True)
+            requests_made += 1
+            if not data.get('truncated'):
+                for node in data.get('tree', []):
+                    self._add_node(prefix, node, new_entries)
+                return requests_made
+
+        data = self._fetch_tree(sha, recursive=False)
+        requests_made += 1
+        for node in data.get('tree', []):
+            path = self._add_node(prefix, node, new_entries)
+            if node.get('type') != 'tree':
+                continue
+            old = old_entries.get(path)
+            if old is not None and old[1] == node['sha']:
+                self._copy_subtree(path, old_entries, old_children, new_entries)
+            else:
+                requests_made += self._sync_tree(path, node['sha'], old_entries, old_children, new_entries)
+        return requests_made
+
+    def _fetch_tree(self, sha: str, recursive: bool) -> dict:
+        url = f"{self.API_ROOT}/git/trees/{sha}" + ("?recursive=1" if recursive else "")
+        response = self.session.get(url, verify=certifi.where(), timeout=self.TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _add_node(prefix: str, node: dict, new_entries: Dict[str, Tuple[str, str, int]]) -> str:
+        path = f"{prefix}/{node['path']}" if prefix else node['path']
+        if node.get('type') == 'tree':
+            new_entries[path] = ('dir', node['sha'], 0)
+        elif node.get('type') == 'blob':
+            new_entries[path] = ('file', node['sha'], node.get('size', 0))
+        return path
+
+    @staticmethod
+    def _copy_subtree(path: str, old_entries: Dict[str, Tuple[str, str, int]],
+                      old_children: Dict[str, List[str]],
+                      new_entries: Dict[str, Tuple[str, str, int]]) -> None:
+        stack = list(reversed(old_children.get(path, ())))
+        while stack:
+            child = stack.pop()
+            new_entries[child] = old_entries[child]
+            stack.extend(reversed(old_children.get(child, ())))
+
+    @staticmethod
+    def _build_children(entries: Dict[str, Tuple[str, str, int]]) -> Dict[str, List[str]]:
+        children: Dict[str, List[str]] = {}
+        for path in entries:
+            parent = path.rsplit('/', 1)[0] if '/' in path else ""
+            children.setdefault(parent, []).append(path)
+        return children
+
+    # 持久化
+    def _load(self) -> None:
+        try:
+            with open(self.catalog_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != self.FORMAT_VERSION:
+                return
+            entries = {path: (item_type, sha, size) for path, item_type, sha, size in data['entries']}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if os.path.exists(self.catalog_path):
+                print(f"加载教材目录失败，将重新下载: {e}")
+            return
+        self._entries = entries
+        self._children = self._build_children(entries)
+        self._commit = data.get('commit', "")
+        self._etag = data.get('etag', "")
+        self._checked_at = data.get('checked_at', 0.0)
+
+    def _save(self) -> None:
+        with self._lock:
+            data = {
+                'version': self.FORMAT_VERSION,
+                'commit': self._commit,
+                'etag': self._etag,
+                'checked_at': self._checked_at,
+                'entries': [[path, *entry] for path, entry in self._entries.items()],
+            }
+        try:
+            os.makedirs(os.path.dirname(self.catalog_path), exist_ok=True)
+            temp_path = self.catalog_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_path, self.catalog_path)
+        except OSError as e:
+            print(f"保存教材目录失败: {e}")
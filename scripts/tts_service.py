@@ -0,0 +1,136 @@
+import atexit
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Coroutine, Optional
+
+import aiohttp
+
+
+class _SharedConnector(aiohttp.TCPConnector):
+    """共享连接器
+
+    edge-tts每次合成都会新建ClientSession，退出时顺带关闭传入的connector。
+    共享连接器忽略这种关闭，只在服务停止时真正关闭，DNS解析结果得以复用。
+    合成用的websocket每次都是新建的，用完直接关闭，不会回到连接池。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._service_closing = False
+
+    def close(self, *args, **kwargs):
+        if self._service_closing:
+            return super().close(*args, **kwargs)
+        return asyncio.sleep(0)
+
+    def shutdown(self):
+        self._service_closing = True
+        return super().close()
+
+
+class TTSService:
+    """合成服务 - 一个常驻后台线程运行的asyncio事件循环，承载所有edge-tts请求
+
+    预览、生成、批量转换共用同一个循环和连接器，避免每次请求都新建事件循环、
+    线程和重新解析DNS。submit()/submit_call()线程安全，返回concurrent.futures.Future。
+    """
+
+    DNS_CACHE_TTL = 300  # 秒
+    WORKER_THREADS = 4
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._connector: Optional[_SharedConnector] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "TTSService":
+        """进程内唯一的服务实例，首次使用时启动"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                atexit.register(cls._instance.shutdown)
+            return cls._instance
+
+    def start(self) -> None:
+        """启动后台事件循环（已启动时什么也不做）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            ready = threading.Event()
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._run_loop, args=(ready,), name="tts-service-loop", daemon=True
+            )
+            self._thread.start()
+            ready.wait()
+            self._connector = asyncio.run_coroutine_threadsafe(
+                self._create_connector(), self._loop
+            ).result()
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.WORKER_THREADS, thread_name_prefix="tts-worker"
+            )
+            print("合成服务已启动")
+
+    @property
+    def connector(self) -> aiohttp.BaseConnector:
+        """共享连接器，只能在服务循环内的协程里使用"""
+        self.start()
+        return self._connector
+
+    def submit(self, coro: Coroutine) -> Future:
+        """把协程交给服务循环执行"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """提交协程并阻塞等待结果，用来代替asyncio.run"""
+        if self.in_service_loop():
+            coro.close()
+            raise RuntimeError("不能在合成服务循环内同步等待协程")
+        return self.submit(coro).result(timeout)
+
+    def submit_call(self, func: Callable, *args, **kwargs) -> Future:
+        """在服务的工作线程池里执行阻塞函数（如完整的生成流程）"""
+        self.start()
+        return self._executor.submit(func, *args, **kwargs)
+
+    def in_service_loop(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def shutdown(self) -> None:
+        """关闭连接器、事件循环和工作线程"""
+        with self._lock:
+            if self._thread is None:
+                return
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            try:
+                asyncio.run_coroutine_threadsafe(self._close_connector(), self._loop).result(5)
+            except Exception as e:
+                print(f"关闭合成服务连接器失败: {e}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+            self._connector = None
+            self._executor = None
+
+    def _run_loop(self, ready: threading.Event) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(ready.set)
+        self._loop.run_forever()
+
+    async def _create_connector(self) -> _SharedConnector:
+        return _SharedConnector(ttl_dns_cache=self.DNS_CACHE_TTL)
+
+    async def _close_connector(self) -> None:
+        if self._connector is not None:
+            await self._connector.shutdown()
@@ -0,0 +1,139 @@
+import os
+import re
+import sys
+import time
+import threading
+import http.server
+
+import pytest
+
+# scripts下的模块互相按模块名导入，测试时同样把scripts加入搜索路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+
+class StandInServer(http.server.ThreadingHTTPServer):
+    """本地HTTP替身服务器 - 任何路径都返回同一份数据，可以注入延迟、断线和错误
+
+    - support_range: 为False时忽略Range，总是返回200和整个文件
+    - delay: 每个请求发响应头前等待的秒数
+    - chunk_delay: 每发CHUNK字节后等待的秒数，用来限速
+    - drop_after / drops: 前drops个请求只发drop_after字节就断开连接
+    - fail_after: 累计发出这么多字节后，之后的请求都返回503
+    - served: 累计发出的正文字节数；requests: 收到的Range头（没有时为None）
+    """
+
+    daemon_threads = True
+    CHUNK = 16 * 1024
+
+    def __init__(self, data: bytes):
+        super().__init__(('127.0.0.1', 0), _StandInHandler)
+        self.data = data
+        self.support_range = True
+        self.delay = 0.0
+        self.chunk_delay = 0.0
+        self.drop_after = None
+        self.drops = 0
+        self.fail_after = None
+        self.served = 0
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/book.pdf"
+
+
+class _StandInHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        data = server.data
+        range_header = self.headers.get('Range')
+        with server.lock:
+            server.requests.append(range_header)
+            failing = server.fail_after is not None and server.served >= server.fail_after
+            drop = server.drop_after is not None and server.drops > 0
+            if drop:
+                server.drops -= 1
+        if server.delay:
+            time.sleep(server.delay)
+        if failing:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        start, end = 0, len(data) - 1
+        match = re.match(r'bytes=(\d+)-(\d*)', range_header or '')
+        if match and server.support_range:
+            start = int(match.group(1))
+            if match.group(2):
+                end = min(int(match.group(2)), end)
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(data)}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(data)}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+
+        body = data[start:end + 1]
+        if drop:
+            body = body[:server.drop_after]
+        try:
+            for offset in range(0, len(body), server.CHUNK):
+                piece = body[offset:offset + server.CHUNK]
+                self.wfile.write(piece)
+                with server.lock:
+                    server.served += len(piece)
+                if server.chunk_delay:
+                    time.sleep(server.chunk_delay)
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        if drop:
+            self.wfile.flush()
+            self.connection.shutdown(2)
+
+
+@pytest.fixture
+def stand_in_server():
+    """创建替身服务器的工厂，测试结束时全部关闭"""
+    servers = []
+
+    def create(data: bytes) -> StandInServer:
+        server = StandInServer(data)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield create
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def small_segments(monkeypatch):
+    """把分段阈值调小，用几百KB的数据测试分段下载"""
+    from pdf_download import SegmentedDownloader
+    monkeypatch.setattr(SegmentedDownloader, 'SEGMENT_BYTES', 64 * 1024)
+    monkeypatch.setattr(SegmentedDownloader, 'MIN_SEGMENTED_BYTES', 128 * 1024)
+    monkeypatch.setattr(SegmentedDownloader, 'STATE_SAVE_INTERVAL', 0.02)
+
+
+def make_data(size: int) -> bytes:
+    return bytes((i * 7 + i // 251) % 256 for i in range(size))
+
+
+def blob_sha(data: bytes, tmp_path) -> str:
+    from pdf_download import git_blob_sha
+    path = tmp_path / "expected.bin"
+    path.write_bytes(data)
+    return git_blob_sha(str(path))
@@ -0,0 +1,83 @@
+import pytest
+
+pytest.importorskip("PyQt5")
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QTextCursor
+
+from misc_func import AudioConfig, BlockDigestIndex, ContentHasher
+from generation_page import TextChangeTracker
+from large_text_edit import LargeTextEdit
+
+
+BOOK = "第一章\n春天来了。\n\nThe end.\n" * 30000
+TEXT = "第一章\n春天来了。 换行符 和不换行空格\n\nThe end.\n" * 3000
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def test_tracked_digest_matches_text_digest(app):
+    edit = LargeTextEdit()
+    tracker = TextChangeTracker(edit.document())
+    edit.set_large_text(TEXT)
+    assert not edit.is_fully_loaded()
+
+    partial = edit.full_text()
+    edit.load_all()
+    assert tracker.digest() == BlockDigestIndex.digest_text(partial)
+    assert tracker.digest() == BlockDigestIndex.digest_text(edit.toPlainText())
+
+
+def test_cache_key_unchanged_after_loading_finishes(app):
+    edit = LargeTextEdit()
+    tracker = TextChangeTracker(edit.document())
+    edit.set_large_text(TEXT)
+
+    config = AudioConfig()
+    config.content = edit.full_text()
+    before = ContentHasher.get_cache_key(config)
+
+    edit.load_all()
+    config.content = edit.toPlainText()
+    config.content_digest = (config.content, tracker.digest())
+    assert ContentHasher.get_cache_key(config) == before
+
+
+def test_edit_changes_digest(app):
+    edit = LargeTextEdit()
+    tracker = TextChangeTracker(edit.document())
+    edit.set_large_text("第一段\n第二段")
+    original = tracker.digest()
+
+    cursor = QTextCursor(edit.document())
+    cursor.movePosition(QTextCursor.End)
+    cursor.insertText("。")
+    assert tracker.digest() != original
+    assert tracker.digest() == BlockDigestIndex.digest_text("第一段\n第二段。")
+
+
+def test_settled_edits_leave_the_file_source_lazy(app, tmp_path):
+    from PyQt5.QtWidgets import QWidget
+    from generation_page import TextEditSection
+
+    path = tmp_path / "book.txt"
+    path.write_bytes(BOOK.encode('utf-8'))
+    page = QWidget()
+    page.config = AudioConfig()
+    section = TextEditSection(page)
+    section.text_edit.load_file(str(path))
+
+    section.change_tracker.flush()  # 防抖结束
+    assert section.text_edit._source is not None
+    assert len(page.config.content) < len(BOOK)
+
+    section.flush_pending()  # 预览或生成前
+    assert page.config.content == BOOK
+    key = ContentHasher.get_cache_key(page.config)
+
+    section.text_edit.load_all()
+    section.change_tracker.flush()
+    assert page.config.content == BOOK
+    assert ContentHasher.get_cache_key(page.config) == key
@@ -0,0 +1,39 @@
+import pytest
+
+from import_sources import ChunkedTextReader, TextEncodingDetector
+
+
+CHINESE = "第一章 春。盼望着，盼望着，东风来了，春天的脚步近了。一切都像刚睡醒的样子，欣欣然张开了眼。\n" * 40
+
+
+@pytest.mark.parametrize("encoding", ['utf-16-le', 'utf-16-be'])
+def test_detects_all_cjk_utf16_without_bom(encoding):
+    sample = "".join(CHINESE.split())  # 去掉空白，没有一个ASCII字符
+    assert TextEncodingDetector.detect(sample.encode(encoding)) == encoding
+
+
+@pytest.mark.parametrize("encoding", ['utf-16-le', 'utf-16-be'])
+def test_detects_mixed_utf16_without_bom(encoding):
+    sample = "Chapter 1 春 (spring), 2024.\n" * 100
+    assert TextEncodingDetector.detect(sample.encode(encoding)) == encoding
+
+
+@pytest.mark.parametrize("encoding, expected", [
+    ('utf-8', 'utf-8'),
+    ('gb18030', 'gb18030'),
+    ('utf-8-sig', 'utf-8-sig'),
+    ('utf-16', 'utf-16'),
+])
+def test_detects_common_encodings(encoding, expected):
+    assert TextEncodingDetector.detect(CHINESE.encode(encoding)) == expected
+
+
+def test_ascii_is_not_mistaken_for_utf16():
+    assert TextEncodingDetector.detect(b"plain ascii text without any markers " * 50) == 'utf-8'
+
+
+def test_reads_bomless_utf16_file_in_chunks(tmp_path):
+    path = tmp_path / "book.txt"
+    path.write_bytes(CHINESE.encode('utf-16-le'))
+    text = "".join(ChunkedTextReader.iter_chunks(str(path), chunk_bytes=1001))
+    assert text == CHINESE
@@ -0,0 +1,60 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip("PyQt5")
+
+from disk_cache import ImportCache
+from import_sources import TextEncodingDetector
+from iw_import_worker import FileImportWorker
+
+
+def test_txt_cache_key_follows_detector_version(tmp_path, monkeypatch):
+    path = tmp_path / "book.txt"
+    path.write_bytes("春天来了".encode('utf-16-le'))
+    cache = ImportCache(str(tmp_path / "cache"))
+
+    cache.put_text(FileImportWorker.cache_key(cache, str(path)), "乱码")
+    monkeypatch.setattr(TextEncodingDetector, 'VERSION', TextEncodingDetector.VERSION + 1)
+    assert cache.get_text(FileImportWorker.cache_key(cache, str(path))) is None
+
+
+def test_docx_cache_key_ignores_detector_version(tmp_path, monkeypatch):
+    path = tmp_path / "book.docx"
+    path.write_bytes(b"PK")
+    cache = ImportCache(str(tmp_path / "cache"))
+
+    key = FileImportWorker.cache_key(cache, str(path))
+    monkeypatch.setattr(TextEncodingDetector, 'VERSION', TextEncodingDetector.VERSION + 1)
+    assert FileImportWorker.cache_key(cache, str(path)) == key
+
+
+def extract_slowly(file_path):
+    """替代extract_file_text：名字带slow的文件要解析很久"""
+    if 'slow' in file_path:
+        time.sleep(3)
+    return os.path.basename(file_path)
+
+
+def test_batch_cancel_does_not_wait_and_keeps_finished_results(tmp_path, monkeypatch):
+    import iw_import_worker
+    monkeypatch.setattr(iw_import_worker, 'extract_file_text', extract_slowly)
+    monkeypatch.setattr(ImportCache, 'shared', classmethod(lambda cls: cache))
+    cache = ImportCache(str(tmp_path / "cache"))
+    paths = []
+    for name in ("fast.txt", "slow.txt"):
+        (tmp_path / name).write_text(name, encoding='utf-8')
+        paths.append(str(tmp_path / name))
+
+    worker = iw_import_worker.BatchImportWorker(paths, max_workers=2)
+    chunks, cancelled = [], []
+    worker.chunk_signal.connect(lambda text: (chunks.append(text), worker.cancel()))
+    worker.cancelled_signal.connect(lambda: cancelled.append(True))
+    started = time.monotonic()
+    worker.run()
+
+    assert time.monotonic() - started < 2
+    assert chunks == ["fast.txt"] and cancelled == [True]
+    reloaded = ImportCache(str(tmp_path / "cache"))
+    assert reloaded.get_text(FileImportWorker.cache_key(reloaded, paths[0])) == "fast.txt"
@@ -0,0 +1,110 @@
+import json
+import time
+
+import pytest
+
+from conftest import make_data, blob_sha
+from mirror_selector import Mirror, MirrorSelector
+from pdf_download import ResumableDownloader, SegmentedDownloader
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(ResumableDownloader, 'RETRY_DELAY', 0.0)
+
+
+def mirror_for(name, server):
+    # 替身服务器对任何路径都返回同一份数据，原始地址拼在前缀后面也一样
+    return Mirror(name, f"http://127.0.0.1:{server.server_address[1]}/")
+
+
+def download_auto(selector, origin, dest, data, tmp_path):
+    # 自动选择的取值是线路数，测试里的线路数与默认的不同
+    return selector.download(origin.url, str(dest), len(data), blob_sha(data, tmp_path),
+                             acceleration=len(selector.mirrors))
+
+
+def test_rank_prefers_faster_mirror(stand_in_server):
+    data = make_data(256 * 1024)
+    slow, fast = stand_in_server(data), stand_in_server(data)
+    slow.delay = 0.3
+    selector = MirrorSelector([mirror_for("slow", slow), mirror_for("fast", fast)])
+
+    ranked = selector.rank(fast.url, len(data))
+
+    assert [mirror.name for mirror in ranked] == ["fast", "slow"]
+
+
+@pytest.fixture
+def saved_progress(monkeypatch):
+    """记录每次换线路开始下载时.part.json里已保存的字节数"""
+    saved = []
+    original_download = SegmentedDownloader.download
+
+    def record_state(self, url, dest_path, *args, **kwargs):
+        try:
+            with open(dest_path + self.STATE_SUFFIX, encoding='utf-8') as file:
+                saved.append(sum(segment[2] for segment in json.load(file)['segments']))
+        except OSError:
+            saved.append(0)
+        return original_download(self, url, dest_path, *args, **kwargs)
+
+    monkeypatch.setattr(SegmentedDownloader, 'download', record_state)
+    return saved
+
+
+def test_failover_resumes_from_saved_segments(stand_in_server, tmp_path, small_segments, saved_progress):
+    data = make_data(1024 * 1024)
+    origin = stand_in_server(data)
+    failing, backup = stand_in_server(data), stand_in_server(data)
+    failing.fail_after = 400 * 1024  # 发出这么多字节后开始返回503
+    backup.delay = 0.2  # 测速时排在failing后面
+    selector = MirrorSelector([mirror_for("failing", failing), mirror_for("backup", backup)])
+    dest = tmp_path / "book.pdf"
+
+    download_auto(selector, origin, dest, data, tmp_path)
+
+    assert dest.read_bytes() == data
+    # 已经写入的部分不再下载：backup除了测速和探测请求，只补上failing没下完的部分
+    assert saved_progress[1] > 0
+    assert backup.served == MirrorSelector.PROBE_BYTES + 1 + len(data) - saved_progress[1]
+    assert not selector.stats(selector.mirrors[0]).is_healthy()
+
+
+def test_mirror_without_range_is_skipped_and_progress_kept(stand_in_server, tmp_path, small_segments,
+                                                            saved_progress, monkeypatch):
+    data = make_data(1024 * 1024)
+    origin = stand_in_server(data)
+    failing, no_range, backup = stand_in_server(data), stand_in_server(data), stand_in_server(data)
+    failing.fail_after = 400 * 1024
+    no_range.support_range = False
+    selector = MirrorSelector([mirror_for("failing", failing), mirror_for("no_range", no_range),
+                               mirror_for("backup", backup)])
+    # 固定顺序，不依赖测速结果
+    monkeypatch.setattr(selector, 'rank', lambda url, size=None: list(selector.mirrors))
+    dest = tmp_path / "book.pdf"
+
+    download_auto(selector, origin, dest, data, tmp_path)
+
+    assert dest.read_bytes() == data
+    # no_range没有丢掉failing留下的进度，backup接着下载
+    assert saved_progress[1] > 0 and saved_progress[2] == saved_progress[1]
+    assert backup.served == len(data) - saved_progress[2] + 1
+
+
+def test_throughput_excludes_verification_time(stand_in_server, tmp_path, small_segments, monkeypatch):
+    data = make_data(512 * 1024)
+    server = stand_in_server(data)
+    selector = MirrorSelector([mirror_for("only", server)])
+    original_verify = SegmentedDownloader._verify
+
+    def slow_verify(*args):
+        time.sleep(0.5)
+        original_verify(*args)
+
+    monkeypatch.setattr(SegmentedDownloader, '_verify', staticmethod(slow_verify))
+
+    selector.download(server.url, str(tmp_path / "book.pdf"), len(data), acceleration=0)
+
+    # 校验时间算进去的话吞吐量不会超过1MB/s
+    assert selector.stats(selector.mirrors[0]).throughput > 4 * len(data)
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+pytest.importorskip("PyQt5")
+from PyQt5.QtCore import QCoreApplication, QEventLoop, QTimer
+
+from network_service import NetworkService
+
+
+@pytest.fixture(scope="module")
+def service():
+    app = QCoreApplication.instance() or QCoreApplication([])
+    yield NetworkService()
+    del app
+
+
+def process_events(seconds: float = 0.3) -> None:
+    loop = QEventLoop()
+    QTimer.singleShot(int(seconds * 1000), loop.quit)
+    loop.exec_()
+
+
+def test_fast_error_reaches_late_subscriber(service):
+    errors = []
+    reply = service.submit(lambda reply: 1 / 0)
+    time.sleep(0.2)  # 调用方连接信号之前又做了别的事
+    reply.error_signal.connect(errors.append)
+    process_events()
+    assert errors == ["division by zero"]
+
+
+def test_keyed_reply_delivers_to_every_subscriber(service):
+    results = []
+    first = service.submit(lambda reply: (time.sleep(0.1), "catalog")[1], key="refresh")
+    first.finished_signal.connect(lambda value: results.append(("first", value)))
+    process_events(0.02)  # 任务开始执行
+    time.sleep(0.2)  # 任务线程已经结束，但结果还没交回GUI线程
+    second = service.submit(lambda reply: "again", key="refresh")
+    second.finished_signal.connect(lambda value: results.append(("second", value)))
+    process_events()
+    assert second is first
+    assert results == [("first", "catalog"), ("second", "catalog")]
+
+
+def test_finished_key_runs_again(service):
+    results = []
+    service.submit(lambda reply: 1, key="once").finished_signal.connect(results.append)
+    process_events()
+    service.submit(lambda reply: 2, key="once").finished_signal.connect(results.append)
+    process_events()
+    assert results == [1, 2]
+
+
+def test_cancel_before_start_skips_task(service):
+    ran, cancelled = [], []
+    reply = service.submit(lambda reply: ran.append(True))
+    reply.cancel()
+    reply.cancelled_signal.connect(lambda: cancelled.append(True))
+    process_events()
+    assert not ran and cancelled == [True]
@@ -0,0 +1,112 @@
+import os
+import json
+import shutil
+
+import pytest
+
+from conftest import make_data, blob_sha
+from pdf_download import ResumableDownloader, SegmentedDownloader, DownloadCancelled, DownloadError
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(ResumableDownloader, 'RETRY_DELAY', 0.0)
+
+
+def test_single_stream_resumes_after_dropped_connections(stand_in_server, tmp_path):
+    data = make_data(1024 * 1024)
+    server = stand_in_server(data)
+    # 断开前多于一个CHUNK_BYTES，第一个块已经写进.part
+    server.drop_after, server.drops = ResumableDownloader.CHUNK_BYTES + 40 * 1024, 2
+    dest = tmp_path / "book.pdf"
+
+    ResumableDownloader().download(server.url, str(dest), len(data), blob_sha(data, tmp_path))
+
+    assert dest.read_bytes() == data
+    assert not os.path.exists(str(dest) + ".part")
+    assert server.requests[0] is None
+    assert server.requests[1] == f"bytes={ResumableDownloader.CHUNK_BYTES}-"
+
+
+def test_single_stream_restarts_when_range_is_not_supported(stand_in_server, tmp_path):
+    data = make_data(200 * 1024)
+    server = stand_in_server(data)
+    server.support_range = False
+    dest = tmp_path / "book.pdf"
+    (tmp_path / "book.pdf.part").write_bytes(b"stale" * 100)
+
+    ResumableDownloader().download(server.url, str(dest), len(data))
+
+    assert dest.read_bytes() == data
+
+
+def test_sha_mismatch_removes_part_file(stand_in_server, tmp_path):
+    server = stand_in_server(make_data(50 * 1024))
+    dest = tmp_path / "book.pdf"
+
+    with pytest.raises(DownloadError):
+        ResumableDownloader().download(server.url, str(dest), expected_sha="0" * 40)
+
+    assert not dest.exists()
+    assert not os.path.exists(str(dest) + ".part")
+
+
+def test_segmented_download_uses_ranges(stand_in_server, tmp_path, small_segments):
+    data = make_data(640 * 1024)
+    server = stand_in_server(data)
+    dest = tmp_path / "book.pdf"
+
+    SegmentedDownloader().download(server.url, str(dest), len(data), blob_sha(data, tmp_path))
+
+    assert dest.read_bytes() == data
+    assert f"bytes={64 * 1024}-{128 * 1024 - 1}" in server.requests
+    assert not os.path.exists(str(dest) + ".part")
+    assert not os.path.exists(str(dest) + ".part.json")
+
+
+def test_segmented_progress_survives_a_killed_process(stand_in_server, tmp_path, small_segments):
+    """下载途中复制.part和.part.json（相当于进程此刻被结束），用副本续传要得到完整文件"""
+    data = make_data(1024 * 1024)
+    server = stand_in_server(data)
+    server.chunk_delay = 0.01
+    dest = tmp_path / "book.pdf"
+    part_path, state_path = str(dest) + ".part", str(dest) + ".part.json"
+    snapshot = tmp_path / "snapshot"
+    snapshot.mkdir()
+
+    def progress(done, total, speed, eta):
+        if done >= total // 2 and not os.listdir(snapshot):
+            shutil.copy(state_path, snapshot / "state")
+            shutil.copy(part_path, snapshot / "part")
+
+    with pytest.raises(DownloadCancelled):
+        SegmentedDownloader().download(server.url, str(dest), len(data), progress=progress,
+                                       is_cancelled=lambda: bool(os.listdir(snapshot)))
+
+    saved = json.loads((snapshot / "state").read_text(encoding='utf-8'))
+    saved_bytes = sum(segment[2] for segment in saved['segments'])
+    assert saved_bytes > 0
+
+    shutil.copy(snapshot / "state", state_path)
+    shutil.copy(snapshot / "part", part_path)
+    served_before = server.served
+    server.chunk_delay = 0.0
+    SegmentedDownloader().download(server.url, str(dest), len(data), blob_sha(data, tmp_path))
+
+    assert dest.read_bytes() == data
+    # 续传只补下载进度文件里没记录的部分（外加探测请求的1字节）
+    assert server.served - served_before == len(data) - saved_bytes + 1
+
+
+@pytest.mark.parametrize("size", [64 * 1024, 512 * 1024])
+def test_full_size_part_without_state_is_not_trusted(stand_in_server, tmp_path, small_segments, size):
+    """没有进度文件的完整大小.part可能是预分配的空文件，不能当成已经下完"""
+    data = make_data(size)
+    server = stand_in_server(data)
+    dest = tmp_path / "book.pdf"
+    with open(str(dest) + ".part", 'wb') as file:
+        file.truncate(size)
+
+    SegmentedDownloader().download(server.url, str(dest), len(data))
+
+    assert dest.read_bytes() == data
@@ -0,0 +1,79 @@
+import os
+import time
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+from pdf_library import PdfLibrary
+
+
+def make_pdf(path, pages=12, labels=None):
+    doc = fitz.open()
+    for _ in range(pages):
+        doc.new_page()
+    if labels:
+        doc.set_page_labels(labels)
+    doc.save(str(path))
+    doc.close()
+
+
+# 4页罗马数字前言，正文从第5页开始编号，第9页起附录重新从1编号
+FRONT_MATTER_LABELS = [
+    {'startpage': 0, 'prefix': '', 'style': 'r', 'firstpagenum': 1},
+    {'startpage': 4, 'prefix': '', 'style': 'D', 'firstpagenum': 1},
+    {'startpage': 8, 'prefix': 'A-', 'style': 'D', 'firstpagenum': 1},
+]
+
+
+def open_library(directory, **kwargs) -> PdfLibrary:
+    library = PdfLibrary(str(directory), **kwargs)
+    if library._scan_thread is not None:
+        library._scan_thread.join()
+    return library
+
+
+def test_existing_books_are_indexed_in_background(tmp_path):
+    make_pdf(tmp_path / "old book.pdf", labels=FRONT_MATTER_LABELS)
+
+    library = open_library(tmp_path)
+
+    assert library.find("old book.pdf") == str(tmp_path / "old book.pdf")
+    assert library.page_index_for_label("old book.pdf", "iii") == 2
+    assert library.page_index_for_label("old book.pdf", "1") == 4
+    assert library.page_index_for_label("old book.pdf", "A-2") == 9
+    # 扫描完成后不再重复扫描
+    assert PdfLibrary(str(tmp_path))._scan_thread is None
+
+
+def test_page_offset_may_be_negative(tmp_path):
+    make_pdf(tmp_path / "book.pdf")
+    library = open_library(tmp_path)
+
+    assert library.set_page_offset("book.pdf", -3)
+    assert open_library(tmp_path).get_page_offset("book.pdf") == -3
+
+
+def test_unindexed_and_deleted_files(tmp_path):
+    library = open_library(tmp_path)
+    make_pdf(tmp_path / "manual.pdf")
+
+    assert library.find("manual.pdf") == str(tmp_path / "manual.pdf")
+    assert library.page_index_for_label("manual.pdf", "1") is None
+    os.remove(tmp_path / "manual.pdf")
+    assert library.find("manual.pdf") is None
+    assert library.total_size() == 0
+
+
+def test_quota_removes_least_recently_used(tmp_path):
+    library = open_library(tmp_path)
+    for name in ("a", "b", "c"):
+        make_pdf(tmp_path / f"{name}.pdf")
+        library.add(str(tmp_path / f"{name}.pdf"), sha="0" * 40, enforce_quota=False)
+        time.sleep(0.01)
+    library.quota_bytes = library.total_size() - 1
+
+    removed = library.enforce_quota(keep="a.pdf")
+
+    assert removed == [str(tmp_path / "b.pdf")]
+    assert library.find("b.pdf") is None and library.find("a.pdf") is not None
+    assert library.get_sha("c.pdf") == "0" * 40
@@ -0,0 +1,66 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+from pdf_text_layer import PdfTextLayer
+
+
+BODY = "物体位置随时间的变化叫做机械运动，运动和静止是相对的，描述运动要先选定参照物。"
+
+
+def make_page(tmp_path, body_html, footnote_html=None):
+    path = tmp_path / "page.pdf"
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_htmlbox(fitz.Rect(50, 50, 500, 400), body_html)
+    if footnote_html:
+        page.insert_htmlbox(fitz.Rect(50, 700, 500, 780), footnote_html)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_footnote_markers_are_dropped(tmp_path):
+    path = make_page(tmp_path, f"<p>{BODY}<sup>①</sup>{BODY}</p>",
+                     "<p><sup>①</sup>参照物：用来判断物体是否运动的另一个物体。</p>")
+
+    text = PdfTextLayer.extract_usable(path, 0)
+
+    assert text is not None
+    assert BODY + BODY in text
+    assert "参照物：用来判断" in text
+
+
+def test_exponents_send_page_to_ocr(tmp_path):
+    path = make_page(tmp_path, f"<p>{BODY}方程的判别式是b<sup>2</sup>-4ac，{BODY}</p>")
+
+    page = PdfTextLayer.extract_page(path, 0)
+
+    assert "b2-4ac" in page.text
+    assert page.superscripts == 1
+    assert PdfTextLayer.extract_usable(path, 0) is None
+
+
+def test_math_symbols_send_page_to_ocr(tmp_path):
+    path = make_page(tmp_path, f"<p>{BODY}速度v=s/t，{BODY}</p>")
+
+    assert PdfTextLayer.extract_usable(path, 0) is None
+
+
+def test_plain_chinese_page_is_used(tmp_path):
+    path = make_page(tmp_path, f"<p>{BODY}</p><p>{BODY}</p>")
+
+    assert PdfTextLayer.extract_usable(path, 0) == f"{BODY}\n{BODY}"
+
+
+@pytest.mark.parametrize("body", ["<p>12</p>", "<p>This is an English textbook page with plenty of text.</p>"])
+def test_sparse_or_foreign_pages_send_page_to_ocr(tmp_path, body):
+    assert PdfTextLayer.extract_usable(make_page(tmp_path, body), 0) is None
+
+
+def test_special_numbers_become_plain_digits():
+    assert PdfTextLayer.normalize("①②⑶⒋Ⅴ❻㈦₁⓫➊㊃ⅻ") == "12345671111412"
+
+
+def test_mojibake_scores_as_unreadable():
+    quality = PdfTextLayer.score("�¸ÃÎÄ¼þ" * 10)
+    assert not PdfTextLayer.is_usable(quality)